@@ -1,3 +1,7 @@
-"""Automatic IPA transcription and forced alignment library."""
+"""Automatic IPA transcription and forced alignment library.
+
+Modules import torch and transformers inside the functions that use them, so importing the
+package and parsing command-line arguments stay fast. Models are loaded on first use.
+"""
 
 __version__ = "0.1.0"
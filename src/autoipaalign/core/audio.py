@@ -0,0 +1,274 @@
+"""Decoding audio files into mono arrays at the sampling rate of a model.
+
+Formats that libsndfile reads natively, such as WAV, FLAC, OGG and MP3, are decoded with soundfile,
+which reads only the requested interval by seeking in the file. Other formats, such as M4A, fall back
+to librosa, which decodes them with audioread. Audio that is already at the target sampling rate is
+returned without resampling. Otherwise it is resampled with the chosen resampler: "soxr_hq" matches
+librosa's default, while "soxr_lq" and "polyphase" are faster at a small cost in quality.
+
+decode_audio returns a DecodedAudio with the samples and what is known about the file, such as its
+duration, so that transcribing a file and building its TextGrid only needs to open the file once.
+For transcribing many intervals of one file, open_for_intervals keeps the file open as an AudioFile
+and reads each interval by seeking, or decodes the whole file once if the intervals cover most of it.
+"""
+
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+import logging
+import os
+from typing import Literal
+
+import librosa
+import numpy as np
+import soundfile
+
+logger = logging.getLogger(__name__)
+
+ResampleType = Literal["soxr_vhq", "soxr_hq", "soxr_mq", "soxr_lq", "polyphase"]
+"""Resamplers supported by load_audio, from highest quality to fastest."""
+
+FULL_DECODE_COVERAGE = 0.5
+"""Fraction of a file that intervals must cover for open_for_intervals to decode the whole file at once."""
+
+
+@dataclass
+class DecodedAudio:
+    """Mono audio decoded from a file at a model's sampling rate, with information about the file."""
+
+    samples: np.ndarray
+    """Mono audio samples at sampling_rate."""
+
+    sampling_rate: int
+    """Sampling rate of the samples."""
+
+    native_sampling_rate: int
+    """Sampling rate of the file."""
+
+    native_duration: float
+    """Duration of the whole file in seconds, even if only an interval of it was decoded."""
+
+    num_channels: int
+    """Number of channels in the file, averaged into the mono samples."""
+
+    path: str | os.PathLike[str] | None = None
+    """Path of the file the audio was decoded from."""
+
+    @property
+    def duration(self) -> float:
+        """Duration of the decoded samples in seconds."""
+        return len(self.samples) / self.sampling_rate
+
+    def interval_samples(self, interval: tuple[float, float] | None) -> np.ndarray:
+        """Samples between (start, end) times in seconds from the start of the decoded audio, or all samples."""
+        if not interval:
+            return self.samples
+        start, end = interval
+        first = min(int(np.round(start * self.sampling_rate)), len(self.samples))
+        return self.samples[first : first + int(np.round((end - start) * self.sampling_rate))]
+
+
+def decode_audio(
+    audio_path: str | os.PathLike[str],
+    sampling_rate: int,
+    interval: tuple[float, float] | None = None,
+    resample_type: ResampleType = "soxr_hq",
+) -> DecodedAudio:
+    """Decode an audio file, or an interval of it, to mono at a sampling rate.
+
+    Args:
+        audio_path: Path to the audio file
+        sampling_rate: Sampling rate for audio preprocessing
+        interval: Optional tuple of (start, end) times in seconds
+        resample_type: Resampler used if the file has a different sampling rate
+
+    Returns:
+        The decoded audio with the file's native sampling rate, duration and number of channels
+    """
+    if interval:
+        logger.debug("Loading interval %s from audio %s", interval, audio_path)
+    else:
+        logger.debug("Loading audio %s", audio_path)
+
+    try:
+        with soundfile.SoundFile(audio_path) as f:
+            y, native_rate, native_duration, num_channels = _read_soundfile(f, interval)
+    except soundfile.SoundFileRuntimeError as e:
+        logger.debug("Decoding %s with librosa, soundfile can't read it: %s", audio_path, e)
+        y, native_rate, native_duration, num_channels = _read_librosa(audio_path, interval)
+
+    y = _resample(y, native_rate, sampling_rate, resample_type)
+    return DecodedAudio(y, sampling_rate, native_rate, native_duration, num_channels, audio_path)
+
+
+def load_audio(
+    audio_path: str | os.PathLike[str],
+    sampling_rate: int,
+    interval: tuple[float, float] | None = None,
+    resample_type: ResampleType = "soxr_hq",
+) -> np.ndarray:
+    """Load audio file with optional interval extraction.
+
+    Args:
+        audio_path: Path to the audio file
+        sampling_rate: Sampling rate for audio preprocessing
+        interval: Optional tuple of (start, end) times in seconds
+        resample_type: Resampler used if the file has a different sampling rate
+
+    Returns:
+        Mono audio array loaded at the specified sampling rate
+    """
+    return decode_audio(audio_path, sampling_rate, interval, resample_type).samples
+
+
+def audio_duration(audio: "str | os.PathLike[str] | DecodedAudio") -> float:
+    """Duration of an audio file in seconds, read from its header where possible instead of decoding it."""
+    if isinstance(audio, DecodedAudio):
+        return audio.native_duration
+    try:
+        info = soundfile.info(audio)
+        return info.frames / info.samplerate
+    except soundfile.SoundFileRuntimeError:
+        return librosa.get_duration(path=audio, sr=None)
+
+
+class AudioFile:
+    """An audio file kept open to read intervals of it by seeking, resampled to a model's sampling rate.
+
+    Only formats that soundfile reads can be opened. Use as a context manager, or call close.
+
+    Args:
+        audio_path: Path to the audio file
+        sampling_rate: Sampling rate for audio preprocessing
+        resample_type: Resampler used if the file has a different sampling rate
+    """
+
+    def __init__(self, audio_path: str | os.PathLike[str], sampling_rate: int, resample_type: ResampleType = "soxr_hq"):
+        self.path = audio_path
+        self.sampling_rate = sampling_rate
+        self.resample_type = resample_type
+        self._file = soundfile.SoundFile(audio_path)
+
+    @property
+    def native_sampling_rate(self) -> int:
+        """Sampling rate of the file."""
+        return self._file.samplerate
+
+    @property
+    def native_duration(self) -> float:
+        """Duration of the file in seconds."""
+        return self._file.frames / self._file.samplerate
+
+    @property
+    def duration(self) -> float:
+        """Duration of the file in seconds."""
+        return self.native_duration
+
+    def read(self, interval: tuple[float, float] | None = None) -> np.ndarray:
+        """Mono samples at sampling_rate between (start, end) times in seconds, or of the whole file."""
+        logger.debug("Reading interval %s from audio %s", interval, self.path)
+        y, native_rate, _, _ = _read_soundfile(self._file, interval)
+        return _resample(y, native_rate, self.sampling_rate, self.resample_type)
+
+    def decode(self) -> DecodedAudio:
+        """Decode the whole file."""
+        return DecodedAudio(
+            self.read(),
+            self.sampling_rate,
+            self.native_sampling_rate,
+            self.native_duration,
+            self._file.channels,
+            self.path,
+        )
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "AudioFile":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def open_for_intervals(
+    audio_path: str | os.PathLike[str],
+    intervals: Sequence[tuple[float, float]],
+    sampling_rate: int,
+    resample_type: ResampleType = "soxr_hq",
+) -> Iterator[AudioFile | DecodedAudio]:
+    """Open an audio file once for reading many intervals of it.
+
+    If the intervals cover at least FULL_DECODE_COVERAGE of the file, the whole file is decoded once and
+    intervals are sliced from memory. Otherwise the file is kept open and each interval is read by seeking
+    to it. Formats that soundfile can't read are always decoded whole, since librosa can't seek in them.
+
+    Args:
+        audio_path: Path to the audio file
+        intervals: (start, end) times in seconds of the intervals that will be read
+        sampling_rate: Sampling rate for audio preprocessing
+        resample_type: Resampler used if the file has a different sampling rate
+
+    Yields:
+        The open file or the decoded audio, either of which ASRPipeline accepts in place of the path
+    """
+    try:
+        audio_file = AudioFile(audio_path, sampling_rate, resample_type)
+    except soundfile.SoundFileRuntimeError:
+        audio_file = None
+    if audio_file is None:
+        yield decode_audio(audio_path, sampling_rate, resample_type=resample_type)
+        return
+
+    with audio_file:
+        duration = audio_file.native_duration
+        covered = sum(max(min(end, duration) - max(start, 0), 0) for start, end in intervals)
+        if covered >= FULL_DECODE_COVERAGE * duration:
+            logger.debug("Intervals cover %.0f%% of %s, decoding it whole", 100 * covered / duration, audio_path)
+            yield audio_file.decode()
+        else:
+            yield audio_file
+
+
+def _resample(y: np.ndarray, native_rate: int, sampling_rate: int, resample_type: ResampleType) -> np.ndarray:
+    if native_rate == sampling_rate:
+        return y
+    return librosa.resample(y, orig_sr=native_rate, target_sr=sampling_rate, res_type=resample_type)
+
+
+def _read_soundfile(f: soundfile.SoundFile, interval: tuple[float, float] | None) -> tuple[np.ndarray, int, float, int]:
+    """Read audio at its native sampling rate from an open file, seeking to the start of the interval.
+
+    Returns:
+        Mono samples, native sampling rate, duration of the file in seconds and number of channels
+    """
+    start, num_samples = 0, -1
+    if interval:
+        # Rounded the same way as librosa.load's offset and duration
+        start = min(int(np.round(interval[0] * f.samplerate)), f.frames)
+        num_samples = int(np.round((interval[1] - interval[0]) * f.samplerate))
+    f.seek(start)
+    y = f.read(frames=num_samples, dtype="float32", always_2d=True)
+    y = np.mean(y, axis=1) if y.shape[1] > 1 else y[:, 0]
+    return y, f.samplerate, f.frames / f.samplerate, f.channels
+
+
+def _read_librosa(
+    audio_path: str | os.PathLike[str], interval: tuple[float, float] | None
+) -> tuple[np.ndarray, int, float, int]:
+    """Decode audio at its native sampling rate with librosa, for formats soundfile can't read.
+
+    Returns:
+        Mono samples, native sampling rate, duration of the file in seconds and number of channels
+    """
+    if interval:
+        start, end = interval
+        y, sr = librosa.load(audio_path, sr=None, mono=False, offset=start, duration=end - start)
+        # Only part of the file was decoded, so its duration has to be read separately
+        native_duration = librosa.get_duration(path=audio_path, sr=None)
+    else:
+        y, sr = librosa.load(audio_path, sr=None, mono=False)
+        native_duration = y.shape[-1] / sr
+    num_channels = y.shape[0] if y.ndim > 1 else 1
+    return librosa.to_mono(y), sr, native_duration, num_channels
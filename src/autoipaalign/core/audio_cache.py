@@ -0,0 +1,165 @@
+"""On-disk cache of audio decoded at a model's sampling rate.
+
+Comparing models runs the same recordings through the model again and again, and decoding and
+resampling every file takes a noticeable share of each run. AudioCache stores the mono float32
+samples of each decoded file as a .npy file, with a small .json file of what is known about the
+source file, such as its duration. Entries are keyed by the file's path, modification time and
+size, and the sampling rate and resampler, so editing or replacing a file creates a new entry.
+
+Entries are read back memory-mapped, so only the pages of the intervals that are read are loaded,
+and runs and worker processes that read the same file share its pages through the operating
+system's page cache instead of each holding a private copy. The least recently used entries are
+deleted when the cache grows past its size limit. Entries are written to temporary files and
+renamed into place, so several processes can share a cache directory.
+"""
+
+from collections.abc import Iterator
+from dataclasses import fields
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+import numpy as np
+
+from autoipaalign.core.audio import DecodedAudio, ResampleType, decode_audio
+
+logger = logging.getLogger(__name__)
+
+SAMPLES_SUFFIX = ".npy"
+
+INFO_SUFFIX = ".json"
+
+
+class AudioCache:
+    """Least recently used cache of decoded audio in a directory.
+
+    Args:
+        cache_dir: Directory to store entries in. Created if it doesn't exist.
+        max_bytes: Total size of entries above which the least recently used ones are deleted, or None for no
+            limit, such as for a temporary cache that is deleted after use.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike[str], max_bytes: int | None):
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def key(self, audio_path: str | os.PathLike[str], sampling_rate: int, resample_type: ResampleType) -> str:
+        """Build a cache key from a file's path, modification time and size and the decoding settings.
+
+        Args:
+            audio_path: Path to the audio file
+            sampling_rate: Sampling rate the audio is decoded at
+            resample_type: Resampler used if the file has a different sampling rate
+
+        Returns:
+            Hex digest identifying the entry
+        """
+        stat = os.stat(audio_path)
+        payload = json.dumps(
+            [os.fspath(Path(audio_path).resolve()), stat.st_mtime_ns, stat.st_size, sampling_rate, resample_type]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def decode(
+        self, audio_path: str | os.PathLike[str], sampling_rate: int, resample_type: ResampleType = "soxr_hq"
+    ) -> DecodedAudio:
+        """Decoded audio of a whole file, from the cache if possible, or decoded and stored in the cache.
+
+        Args:
+            audio_path: Path to the audio file
+            sampling_rate: Sampling rate for audio preprocessing
+            resample_type: Resampler used if the file has a different sampling rate
+
+        Returns:
+            The decoded audio. Samples read from the cache are a read-only memory-mapped array.
+        """
+        key = self.key(audio_path, sampling_rate, resample_type)
+        audio = self.get(key, audio_path)
+        if audio is None:
+            audio = decode_audio(audio_path, sampling_rate, resample_type=resample_type)
+            self.put(key, audio)
+        return audio
+
+    def get(self, key: str, audio_path: str | os.PathLike[str] | None = None) -> DecodedAudio | None:
+        """Decoded audio stored under key, or None if there is no entry.
+
+        Reading an entry marks it as recently used.
+
+        Args:
+            key: Key of the entry
+            audio_path: Path to set on the returned audio. Defaults to the path the entry was stored from.
+        """
+        samples_path, info_path = self._paths(key)
+        try:
+            info = json.loads(info_path.read_text())
+            samples = np.load(samples_path, mmap_mode="r")
+            os.utime(samples_path)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Ignoring unreadable audio cache entry %s: %s", samples_path, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        info["path"] = audio_path if audio_path is not None else info["path"]
+        return DecodedAudio(samples=samples, **info)
+
+    def put(self, key: str, audio: DecodedAudio):
+        """Store decoded audio under key and evict old entries if the cache is over its size limit."""
+        samples_path, info_path = self._paths(key)
+        info = {f.name: getattr(audio, f.name) for f in fields(audio) if f.name != "samples"}
+        info["path"] = os.fspath(audio.path) if audio.path is not None else None
+        # The info is written first, so an entry is only found once its samples are complete
+        self._write(info_path, lambda f: f.write(json.dumps(info).encode()))
+        self._write(samples_path, lambda f: np.save(f, np.asarray(audio.samples, dtype=np.float32)))
+        self._total_bytes += samples_path.stat().st_size
+        if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under its size limit."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for samples_path, size, _ in entries:
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            samples_path.unlink(missing_ok=True)
+            samples_path.with_suffix(INFO_SUFFIX).unlink(missing_ok=True)
+            total -= size
+            logger.debug("Evicted audio cache entry %s", samples_path)
+        self._total_bytes = total
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self._total_bytes} bytes in {self.cache_dir}"
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.cache_dir / f"{key}{SAMPLES_SUFFIX}", self.cache_dir / f"{key}{INFO_SUFFIX}"
+
+    def _write(self, path: Path, write):
+        """Write a file through a temporary file renamed into place."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _entries(self) -> Iterator[tuple[Path, int, int]]:
+        """(samples path, size, last used time) of each entry."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(SAMPLES_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield Path(entry.path), stat.st_size, stat.st_mtime_ns
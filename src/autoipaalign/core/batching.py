@@ -0,0 +1,139 @@
+"""Scheduling of audio inputs into batches for model inference.
+
+Audio inputs of very different lengths waste most of a batched forward pass on padding,
+because every input is padded to the length of the longest one in its batch. The helpers
+here sort inputs by length and group them under a budget of total padded samples, then
+keep track of how much of each batch was real audio.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PaddingStats:
+    """Running totals of real and padded audio samples for batches passed through the model."""
+
+    num_batches: int = 0
+    """Number of batches seen."""
+
+    num_items: int = 0
+    """Number of audio inputs across all batches."""
+
+    real_samples: int = 0
+    """Number of audio samples before padding."""
+
+    padded_samples: int = 0
+    """Number of audio samples after padding each batch to its longest input."""
+
+    def add_batch(self, lengths: Sequence[int]):
+        """Record one batch.
+
+        Args:
+            lengths: Length in samples of each audio input in the batch
+        """
+        if not lengths:
+            return
+        self.num_batches += 1
+        self.num_items += len(lengths)
+        self.real_samples += sum(lengths)
+        self.padded_samples += len(lengths) * max(lengths)
+
+    def merge(self, other: "PaddingStats"):
+        """Add the totals of another PaddingStats, such as one kept by a worker process."""
+        self.num_batches += other.num_batches
+        self.num_items += other.num_items
+        self.real_samples += other.real_samples
+        self.padded_samples += other.padded_samples
+
+    @property
+    def efficiency(self) -> float:
+        """Fraction of padded samples that are real audio. 1.0 means no padding was needed."""
+        if self.padded_samples == 0:
+            return 1.0
+        return self.real_samples / self.padded_samples
+
+    def __str__(self) -> str:
+        return (
+            f"{self.num_items} inputs in {self.num_batches} batches, "
+            f"padding efficiency {self.efficiency:.1%} ({self.real_samples} of {self.padded_samples} samples)"
+        )
+
+
+def fixed_size_batches(num_items: int, batch_size: int) -> list[list[int]]:
+    """Group item indices in input order into batches of at most batch_size items.
+
+    Args:
+        num_items: Number of items to batch
+        batch_size: Maximum number of items per batch. Values below 1 are treated as 1.
+
+    Returns:
+        Lists of item indices, one list per batch
+    """
+    batch_size = max(batch_size, 1)
+    return [list(range(start, min(start + batch_size, num_items))) for start in range(0, num_items, batch_size)]
+
+
+def bucket_by_length(
+    lengths: Sequence[int],
+    max_batch_samples: int,
+    max_batch_size: int | None = None,
+) -> list[list[int]]:
+    """Sort items by length and group them into batches under a budget of total padded samples.
+
+    Items are taken longest first, so the batch with the largest memory footprint runs first.
+    A batch is closed when adding the next item would make the batch size times the longest
+    length in the batch exceed max_batch_samples. An item that is longer than the budget by
+    itself gets a batch of its own.
+
+    Args:
+        lengths: Length in samples of each item
+        max_batch_samples: Maximum number of samples in a batch after padding
+        max_batch_size: Optional maximum number of items in a batch
+
+    Returns:
+        Lists of item indices, one list per batch. Use restore_order to put
+        per-batch results back into the original item order.
+    """
+    if max_batch_samples < 1:
+        raise ValueError(f"max_batch_samples must be positive, got {max_batch_samples}")
+
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    current = []
+    current_max = 0
+    for i in order:
+        batch_max = max(current_max, lengths[i])
+        is_full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (is_full or (len(current) + 1) * batch_max > max_batch_samples):
+            batches.append(current)
+            current = []
+            batch_max = lengths[i]
+        current.append(i)
+        current_max = batch_max
+    if current:
+        batches.append(current)
+    return batches
+
+
+def restore_order(batches: Sequence[Sequence[int]], batch_results: Sequence[Sequence]) -> list:
+    """Put results computed batch by batch back into the original item order.
+
+    Args:
+        batches: Lists of item indices, as returned by bucket_by_length or fixed_size_batches
+        batch_results: Results for each batch, in the same order as the indices within that batch
+
+    Returns:
+        A list with one result per item, in original item order
+    """
+    num_items = sum(len(batch) for batch in batches)
+    results = [None] * num_items
+    for batch, batch_result in zip(batches, batch_results):
+        if len(batch) != len(batch_result):
+            raise ValueError(f"Batch of {len(batch)} items has {len(batch_result)} results")
+        for i, result in zip(batch, batch_result):
+            results[i] = result
+    return results
@@ -1,13 +1,47 @@
 """Command-line interface for automatic IPA transcription and forced alignment."""
 
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass, field
+import functools
 import logging
 from pathlib import Path
+import queue
+from typing import Annotated
 
 import tyro
 
-from autoipaalign.core.textgrid_io import TextGridContainer, write_textgrids_to_target
-from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.batching import PaddingStats
+from autoipaalign.core.evaluation import benchmark_quantization
+from autoipaalign.core.inputs import (
+    InputAudio,
+    check_unique_names,
+    iter_audio_inputs,
+    iter_blocks,
+    iter_inputs,
+    pair_with_textgrids,
+    read_manifest,
+)
+from autoipaalign.core.journal import CompletionJournal, journal_path
+from autoipaalign.core.onnx_engine import export_onnx
+from autoipaalign.core.parallel import ProcessPoolTranscriber, pipeline_settings
+from autoipaalign.core.sharding import check_shard, select_shard, shard_target_path
+from autoipaalign.core.textgrid_io import (
+    TextGridContainer,
+    TextGridWriter,
+    merge_textgrid_targets,
+    to_textgrid_basename,
+    write_textgrids_to_target,
+)
+from autoipaalign.core.speech_recognition import (
+    ASRPipeline,
+    DEFAULT_MAX_SEGMENT_LENGTH_S,
+    DEFAULT_MODEL,
+    VALID_MODELS,
+)
+from autoipaalign.core.sweep import combine_model_text_grids, model_short_name, sweep_models
+from autoipaalign.core.vad import VadStats
 
 
 logger = logging.getLogger(__name__)
@@ -40,15 +74,29 @@ class Transcribe:
     New TextGrid files are created and written to the specified
     zip file or output directory.
 
-    Output TextGrids have the same file basename as the corresponding audio files with a .TextGrid suffix.
+    Output TextGrids have the same file basename as the corresponding audio files with a .TextGrid suffix,
+    unless a manifest gives another name. Files found in a directory or with a glob pattern keep their path
+    relative to it, so corpus/dr1/sa1.wav is written to dr1/sa1.TextGrid. Inputs that would write the same
+    TextGrid stop the run with an error when the second one is reached.
     """
 
-    audio_paths: list[Path]
-    """Paths to audio files to transcribe."""
-
     output_target: Path
     """Path to directory or zip file to save TextGrid files to."""
 
+    audio_paths: list[Path] = field(default_factory=list)
+    """Paths to audio files to transcribe, directories to search recursively for audio files, or quoted glob
+    patterns such as "corpus/**/*.wav", which avoid the command line length limit of shell expansion."""
+
+    manifest: Path | None = None
+    """CSV file with a header row, or JSON Lines file with a .jsonl suffix, listing audio files to transcribe,
+    after any audio paths. Each row has an audio_path, relative to the manifest unless absolute, and optionally
+    an output_name for its TextGrid without the .TextGrid suffix and start and end times in seconds to only
+    transcribe that interval of the file."""
+
+    input_block_size: int = 1000
+    """Number of input files to read ahead and transcribe together. Transcription starts once the first block
+    of files is found, while later directories and manifest rows are still unread."""
+
     asr: ASRPipeline = field(default_factory=ASRPipeline)
     """Transformers speech recognition pipeline."""
 
@@ -58,100 +106,521 @@ class Transcribe:
     zipped: bool = False
     """Use zipped flag to create a zip file of all TextGrids. Defaults to not zipping."""
 
+    jobs: int = 1
+    """Number of worker processes to transcribe files in parallel. Each worker loads its own copy of the model,
+    so memory use grows with the number of jobs. Defaults to transcribing in this process."""
+
+    threads_per_job: int | None = None
+    """Number of PyTorch threads for each worker process. Defaults to the available CPUs divided by jobs."""
+
+    segment: bool = False
+    """Split each file into utterances at pauses and transcribe them in batches, writing one transcription
+    interval per utterance instead of one for the whole file. Pauses are found with --asr.vad-threshold-db
+    and --asr.vad-min-silence-s."""
+
+    max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S
+    """Longest utterance in seconds with --segment. Longer stretches of speech are split evenly."""
+
+    resume: bool = False
+    """Make the run resumable, or continue an interrupted one: record each finished audio file in a journal next to
+    the output, and skip audio files that the journal shows were already transcribed with the same model and
+    settings, whose modification time and size haven't changed and whose TextGrid still exists. Other TextGrids are
+    added to the output directory or zip file without removing the ones already there. Without resume, no journal
+    is kept."""
+
+    shard_index: int = 0
+    """Index of the shard of the inputs to transcribe, from 0 to num_shards - 1."""
+
+    num_shards: int = 1
+    """Number of shards to split the inputs into, for example one per machine. Each shard takes a fixed, disjoint
+    share of the inputs with about the same total duration, and writes its TextGrids to its own target named like
+    output_target with .shard-<index>-of-<num_shards>, which the merge command combines. All inputs are listed and
+    their durations read before a shard starts."""
+
     def run(self):
         """Transcribe and write files."""
-        if self.output_target.exists():
+        if not self.audio_paths and self.manifest is None:
+            raise ValueError("Give audio paths to transcribe, a manifest, or both")
+        if self.input_block_size < 1:
+            raise ValueError(f"input_block_size must be at least 1, got {self.input_block_size}")
+        check_shard(self.shard_index, self.num_shards)
+
+        output_target = self.output_target
+        inputs = check_unique_names(iter_inputs(self.audio_paths, self.manifest))
+        if self.num_shards > 1:
+            output_target = shard_target_path(self.output_target, self.shard_index, self.num_shards, self.zipped)
+            inputs = select_shard(inputs, self.shard_index, self.num_shards)
+
+        if output_target.exists():
             if self.output.overwrite:
                 logger.warning(
                     "Target %s already exists and may be overwritten.",
-                    self.output_target,
+                    output_target,
                 )
             else:
                 logger.warning(
                     "Target %s already exists, but cannot be overwritten. Transcriptions may not be saved.",
-                    self.output_target,
+                    output_target,
                 )
 
-        logger.info(
-            "Transcribing  %s files with model %s.",
-            len(self.audio_paths),
-            self.asr.model_name,
-        )
-
-        text_grids = []
-
-        for audio_path in self.audio_paths:
-            tg = TextGridContainer.from_audio_with_predict_transcription(
-                audio_path,
-                self.output.transcription_tier_name,
-                self.asr,
-                add_phones=self.output.enable_phones,
-                phone_tier_name=self.output.phone_tier_name,
+        self.asr.padding_stats = PaddingStats()
+        self.asr.vad_stats = VadStats()
+        num_transcribed = 0
+        num_skipped = 0
+        # Each TextGrid is written and journaled as soon as it is transcribed, so finished files are kept if the run stops
+        with ExitStack() as stack:
+            writer = stack.enter_context(
+                TextGridWriter(output_target, self.zipped, self.output.overwrite, append=self.resume)
             )
-            text_grids.append(tg)
-
-        write_textgrids_to_target(
-            self.audio_paths,
-            text_grids,
-            self.output_target,
-            self.zipped,
-            self.output.overwrite,
-        )
+            journal = None
+            if self.resume:
+                journal = stack.enter_context(
+                    CompletionJournal(journal_path(output_target, self.zipped), self._journal_settings())
+                )
+            transcriber = None
+            if self.jobs > 1:
+                transcriber = stack.enter_context(ProcessPoolTranscriber(self.asr, self.jobs, self.threads_per_job))
+            logger.info("Transcribing files with model %s.", self.asr.model_name)
+
+            for block in iter_blocks(inputs, self.input_block_size):
+                if journal is not None:
+                    remaining = [
+                        block[i] for i in journal.remaining(block, lambda item: writer.has_output(item.textgrid_name))
+                    ]
+                    num_skipped += len(block) - len(remaining)
+                    block = remaining
+                if not block:
+                    continue
+
+                audio_paths = [item.audio_path for item in block]
+                intervals = [item.interval for item in block]
+                if transcriber is not None:
+                    text_grids = transcriber.iter_transcribe(
+                        audio_paths,
+                        self.output.transcription_tier_name,
+                        add_phones=self.output.enable_phones,
+                        phone_tier_name=self.output.phone_tier_name,
+                        segment=self.segment,
+                        max_segment_length_s=self.max_segment_length_s,
+                        intervals=intervals,
+                    )
+                else:
+                    text_grids = TextGridContainer.iter_audio_batch_with_predict_transcription(
+                        audio_paths,
+                        self.output.transcription_tier_name,
+                        self.asr,
+                        add_phones=self.output.enable_phones,
+                        phone_tier_name=self.output.phone_tier_name,
+                        batch_size=self.asr.batch_size,
+                        max_batch_samples=self.asr.max_batch_samples,
+                        segment=self.segment,
+                        max_segment_length_s=self.max_segment_length_s,
+                        intervals=intervals,
+                    )
+
+                for i, tg in text_grids:
+                    writer.write_named(block[i].textgrid_name, tg)
+                    if journal is not None:
+                        journal.record(block[i])
+                num_transcribed += len(block)
+
+        if self.resume:
+            logger.info("Skipped %s files already transcribed.", num_skipped)
+        logger.info("Transcribed %s files.", num_transcribed)
+        if transcriber is not None:
+            for stats in transcriber.worker_stats.values():
+                logger.info("Throughput of %s", stats)
+        else:
+            if self.asr.logit_cache is not None:
+                logger.info("Logit cache: %s", self.asr.logit_cache)
+            if self.asr.audio_cache is not None:
+                logger.info("Audio cache: %s", self.asr.audio_cache)
+        if self.asr.padding_stats.num_batches > 0:
+            logger.info("Batched inference: %s", self.asr.padding_stats)
+        if self.asr.vad_stats.num_inputs > 0:
+            logger.info("Voice activity detection: %s", self.asr.vad_stats)
+
+    def _journal_settings(self) -> dict:
+        """Settings that change the TextGrids, which a journaled file must have been transcribed with to be skipped."""
+        asr_settings = {
+            name: getattr(self.asr, name)
+            for name in [
+                "model_name",
+                "engine",
+                "quantize",
+                "sampling_rate",
+                "resample_type",
+                "chunk_length_s",
+                "stride_length_s",
+                "vad",
+                "vad_threshold_db",
+                "vad_min_silence_s",
+            ]
+        }
+        return {
+            **asr_settings,
+            "transcription_tier_name": self.output.transcription_tier_name,
+            "enable_phones": self.output.enable_phones,
+            "phone_tier_name": self.output.phone_tier_name,
+            "segment": self.segment,
+            "max_segment_length_s": self.max_segment_length_s,
+        }
 
 
 @dataclass
 class TranscribeIntervals:
-    """Transcribe intervals from an existing TextGrid file using the desired HuggingFace model.
+    """Transcribe intervals from existing TextGrid files using the desired HuggingFace model.
     Interval time frames are taken from the source tier, transcribed, and
     transcriptions are added as intervals in a new target tier.
 
-    Output TextGrids have the same file basename as the corresponding audio files with a .TextGrid suffix and are saved
-    in the output_target directory.
-    """
-
-    # TODO currently this handles one audio, textgrid pair at a time, but
-    # could be made to take multiple paths and pair files
-
-    audio_path: Path
-    """Path to the audio file"""
+    Audio files are paired with the TextGrids of the same name, such as dr1/s01.wav with dr1/s01.TextGrid, or
+    listed with their TextGrids in a manifest. All pairs are transcribed with the same loaded model, and
+    a pair that fails, for example because its TextGrid has no source tier, is skipped without stopping
+    the others, and the command then ends with an error listing the failed pairs and any audio files that
+    have no TextGrid. A single audio file and TextGrid given by path are paired whatever their names.
 
-    textgrid_path: Path
-    """Path to the existing TextGrid file"""
+    Output TextGrids have the same file basename as the corresponding audio files with a .TextGrid suffix, unless
+    a manifest gives another name, and are saved in the output_target directory or zip file. Files found in a
+    directory or with a glob pattern keep their path relative to it, as in transcribe.
+    """
 
     output_target: Path
-    """Name of directory to save TextGrid files to."""
+    """Path to directory or zip file to save TextGrid files to."""
 
     source_tier: str
     """Name of the source tier containing intervals to transcribe"""
 
+    # The aliases keep the flags of the single pair this command used to take working
+    audio_paths: Annotated[list[Path], tyro.conf.arg(aliases=("--audio-path",))] = field(default_factory=list)
+    """Paths to audio files, directories to search recursively for audio files, or quoted glob patterns."""
+
+    textgrid_paths: Annotated[list[Path], tyro.conf.arg(aliases=("--textgrid-path",))] = field(default_factory=list)
+    """Paths to existing TextGrid files, directories to search recursively for them, or quoted glob patterns.
+    Each audio file is paired with the TextGrid at the same path relative to its directory or glob pattern, or
+    else with the only TextGrid of the same basename. Defaults to the TextGrid next to each audio file."""
+
+    manifest: Path | None = None
+    """CSV file with a header row, or JSON Lines file with a .jsonl suffix, listing pairs to transcribe after any
+    audio paths. Each row has an audio_path and a textgrid_path, relative to the manifest unless absolute, and
+    optionally an output_name for the output TextGrid without the .TextGrid suffix."""
+
     asr: ASRPipeline = field(default_factory=ASRPipeline)
     """Transformers speech recognition pipeline"""
 
     output: OutputConfig = field(default_factory=OutputConfig)
     """Settings for file output and TextGrid structure"""
 
+    zipped: bool = False
+    """Use zipped flag to create a zip file of all TextGrids. Defaults to not zipping."""
+
+    full_pass: bool = False
+    """Run the model once over the whole audio file and decode each interval from the model outputs between its
+    start and end, instead of transcribing each interval on its own. Faster when the source tier covers most of
+    the file, and the model hears the audio around each interval."""
+
+    jobs: int = 1
+    """Number of pairs to transcribe at once, each in its own thread with its own pipeline, all sharing the one
+    loaded model. Defaults to one pair at a time."""
+
+    shard_index: int = 0
+    """Index of the shard of the pairs to transcribe, from 0 to num_shards - 1."""
+
+    num_shards: int = 1
+    """Number of shards to split the pairs into, for example one per machine. Each shard takes a fixed, disjoint
+    share of the pairs with about the same total duration, and writes its TextGrids to its own target named like
+    output_target with .shard-<index>-of-<num_shards>, which the merge command combines. All pairs are listed and
+    their durations read before a shard starts."""
+
     def run(self):
         """Execute interval-based transcription."""
-        logger.info("Transcribing intervals from %s.", self.textgrid_path)
-        self.output_target.mkdir(exist_ok=True, parents=True)
+        if not self.audio_paths and self.manifest is None:
+            raise ValueError("Give audio paths to transcribe, a manifest, or both")
+        if self.jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {self.jobs}")
+        check_shard(self.shard_index, self.num_shards)
+
+        pairs = check_unique_names(self._pairs())
+        output_target = self.output_target
+        if self.num_shards > 1:
+            output_target = shard_target_path(self.output_target, self.shard_index, self.num_shards, self.zipped)
+            pairs = select_shard(pairs, self.shard_index, self.num_shards)
+
+        # An ASRPipeline's stats and lazily loaded decoder aren't safe to share between threads, so each pair takes
+        # a pipeline no other thread is using. The pipelines share one loaded model through MODEL_REGISTRY.
+        pipelines = [self.asr] + [ASRPipeline(**pipeline_settings(self.asr)) for _ in range(self.jobs - 1)]
+        idle_pipelines = queue.SimpleQueue()
+        for asr in pipelines:
+            idle_pipelines.put(asr)
+
+        transcribe_pair = functools.partial(self._transcribe_pair, idle_pipelines=idle_pipelines)
+
+        failed = []
+        with (
+            TextGridWriter(output_target, self.zipped, self.output.overwrite) as writer,
+            ThreadPoolExecutor(max_workers=self.jobs) as pool,
+        ):
+            # A few blocks of pairs are in flight at a time, so pairs are read as they are needed
+            for block in iter_blocks(pairs, 4 * self.jobs):
+                for item, tg in zip(block, pool.map(transcribe_pair, block)):
+                    if tg is None:
+                        failed.append(item)
+                    else:
+                        writer.write_named(item.textgrid_name, tg)
+
+        logger.info("Transcribed intervals of %s pairs.", writer.num_written)
+        for asr in pipelines:
+            if asr.logit_cache is not None:
+                logger.info("Logit cache: %s", asr.logit_cache)
+            if asr.audio_cache is not None:
+                logger.info("Audio cache: %s", asr.audio_cache)
+        if failed:
+            # Raised after the other pairs are written, so the command exits with an error status
+            raise RuntimeError(
+                f"Could not transcribe {len(failed)} pairs: "
+                + ", ".join(
+                    f"{item.audio_path} with {item.textgrid_path}"
+                    if item.textgrid_path is not None
+                    else f"{item.audio_path}, which has no TextGrid"
+                    for item in failed
+                )
+            )
 
-        tg = TextGridContainer.from_textgrid_with_predict_intervals(
-            self.audio_path,
-            self.textgrid_path,
-            self.source_tier,
-            self.output.transcription_tier_name,
+    def _pairs(self) -> Iterator[InputAudio]:
+        """Pairs of the audio and TextGrid paths, where audio files without a TextGrid have a textgrid_path of
+        None, followed by those of the manifest."""
+        if (
+            len(self.audio_paths) == 1
+            and len(self.textgrid_paths) == 1
+            and self.audio_paths[0].is_file()
+            and self.textgrid_paths[0].is_file()
+        ):
+            # A single audio file and TextGrid, as this command used to take, are a pair whatever their names
+            yield InputAudio(self.audio_paths[0], textgrid_path=self.textgrid_paths[0])
+        else:
+            yield from pair_with_textgrids(iter_audio_inputs(self.audio_paths), self.textgrid_paths)
+        if self.manifest is not None:
+            yield from self._manifest_pairs()
+
+    def _manifest_pairs(self) -> Iterator[InputAudio]:
+        """Pairs listed in the manifest, which must all have a TextGrid."""
+        for item in read_manifest(self.manifest):
+            if item.textgrid_path is None:
+                raise ValueError(f"Manifest {self.manifest} row for {item.audio_path} has no textgrid_path")
+            if item.interval is not None:
+                logger.warning("Ignoring start and end of %s in manifest %s", item.audio_path, self.manifest)
+            yield item
+
+    def _transcribe_pair(self, item: InputAudio, idle_pipelines: queue.SimpleQueue) -> TextGridContainer | None:
+        """Transcribe the intervals of one pair with a pipeline taken from idle_pipelines and put back after, or
+        return None if it failed or the audio file has no TextGrid."""
+        if item.textgrid_path is None:
+            return None
+        logger.info("Transcribing intervals from %s.", item.textgrid_path)
+        asr = idle_pipelines.get()
+        try:
+            return TextGridContainer.from_textgrid_with_predict_intervals(
+                item.audio_path,
+                item.textgrid_path,
+                self.source_tier,
+                self.output.transcription_tier_name,
+                asr,
+                add_phones=self.output.enable_phones,
+                phone_tier_name=self.output.phone_tier_name,
+                batch_size=asr.batch_size,
+                max_batch_samples=asr.max_batch_samples,
+                full_pass=self.full_pass,
+            )
+        except Exception as e:
+            logger.warning("Error transcribing intervals of %s from %s: %s", item.audio_path, item.textgrid_path, e)
+            return None
+        finally:
+            idle_pipelines.put(asr)
+
+
+@dataclass
+class TranscribeSweep:
+    """Transcribe multiple audio files with each of several HuggingFace models, decoding each file once.
+    Every model uses the --asr settings other than --asr.model-name.
+
+    By default, one TextGrid is written per audio file with a copy of the transcription tier (and phone tier)
+    for each model, named with the last part of the model name, such as
+    ipa_full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa. With per_model_targets, each model's TextGrids
+    are written to their own directory or zip file in output_target instead.
+    """
+
+    audio_paths: list[Path]
+    """Paths to audio files to transcribe."""
+
+    output_target: Path
+    """Path to directory or zip file to save TextGrid files to. A directory of per-model targets with
+    --per-model-targets."""
+
+    model_names: list[str] = field(default_factory=lambda: [DEFAULT_MODEL])
+    """Names of the HuggingFace models or local model directories to transcribe with."""
+
+    all_valid_models: bool = False
+    """Transcribe with every model that is available in the web app instead of model_names."""
+
+    asr: ASRPipeline = field(default_factory=ASRPipeline)
+    """Transformers speech recognition pipeline settings shared by all models."""
+
+    output: OutputConfig = field(default_factory=OutputConfig)
+    """Settings for file output and TextGrid structure."""
+
+    zipped: bool = False
+    """Use zipped flag to create a zip file of all TextGrids, or one per model with --per-model-targets."""
+
+    per_model_targets: bool = False
+    """Write each model's TextGrids to output_target/<model> (or output_target/<model>.zip) instead of
+    combining the tiers of all models into one TextGrid per audio file."""
+
+    model_jobs: int = 1
+    """Number of models to run at once, each in its own thread. Each running model is loaded in memory."""
+
+    max_rss_mb: float | None = None
+    """Memory budget in megabytes for the models running at once. After the first model, fewer than model_jobs
+    models run at once if they would not fit. Defaults to no budget."""
+
+    segment: bool = False
+    """Split each file into utterances at pauses, as in transcribe --segment."""
+
+    max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S
+    """Longest utterance in seconds with --segment. Longer stretches of speech are split evenly."""
+
+    def run(self):
+        """Transcribe with every model and write files."""
+        model_names = VALID_MODELS if self.all_valid_models else self.model_names
+        logger.info("Transcribing %s files with %s models.", len(self.audio_paths), len(model_names))
+
+        text_grids_by_model = sweep_models(
+            self.audio_paths,
+            model_names,
             self.asr,
+            self.output.transcription_tier_name,
             add_phones=self.output.enable_phones,
             phone_tier_name=self.output.phone_tier_name,
+            segment=self.segment,
+            max_segment_length_s=self.max_segment_length_s,
+            model_jobs=self.model_jobs,
+            max_rss_mb=self.max_rss_mb,
+        )
+
+        if not self.per_model_targets:
+            write_textgrids_to_target(
+                self.audio_paths,
+                combine_model_text_grids(text_grids_by_model),
+                self.output_target,
+                self.zipped,
+                self.output.overwrite,
+            )
+            return
+
+        self.output_target.mkdir(parents=True, exist_ok=True)
+        for model_name, text_grids in text_grids_by_model.items():
+            target = self.output_target / model_short_name(model_name)
+            write_textgrids_to_target(
+                self.audio_paths,
+                text_grids,
+                target.with_name(f"{target.name}.zip") if self.zipped else target,
+                self.zipped,
+                self.output.overwrite,
+            )
+
+
+@dataclass
+class Merge:
+    """Combine the TextGrids of several directories or zip files, such as the shard targets written with
+    --shard-index and --num-shards, into one directory or zip file.
+    """
+
+    shard_targets: list[Path]
+    """Directories or zip files with TextGrids to combine, such as output.shard-0-of-4 output.shard-1-of-4 ..."""
+
+    output_target: Path
+    """Path to directory or zip file to save TextGrid files to."""
+
+    zipped: bool = False
+    """Use zipped flag to create a zip file of all TextGrids. Defaults to not zipping."""
+
+    overwrite: bool = False
+    """Allow overwriting existing output files."""
+
+    def run(self):
+        """Copy the TextGrids of every shard target into the output target."""
+        num_copied = merge_textgrid_targets(self.shard_targets, self.output_target, self.zipped, self.overwrite)
+        logger.info(
+            "Merged %s TextGrids from %s targets into %s", num_copied, len(self.shard_targets), self.output_target
         )
 
-        tg.write_textgrid(self.output_target, self.audio_path, self.output.overwrite)
+
+@dataclass
+class ExportOnnx:
+    """Export HuggingFace models to ONNX for CPU inference with ONNX Runtime (--asr.engine onnx).
+    Each export is saved in an onnx folder next to the model's files in the HuggingFace cache,
+    or in the model directory for local models, and is reused until the model changes.
+    """
+
+    model_names: list[str] = field(default_factory=lambda: [DEFAULT_MODEL])
+    """Names of the HuggingFace models or local model directories to export."""
+
+    all_valid_models: bool = False
+    """Export every model that is available in the web app instead of model_names."""
+
+    overwrite: bool = False
+    """Export again even if an up to date export exists."""
+
+    def run(self):
+        """Export models, continuing with the next model if one fails."""
+        model_names = VALID_MODELS if self.all_valid_models else self.model_names
+        failed = []
+        for model_name in model_names:
+            try:
+                path = export_onnx(model_name, overwrite=self.overwrite)
+                logger.info("ONNX export of %s: %s", model_name, path)
+            except Exception as e:
+                logger.warning("Error exporting %s to ONNX: %s", model_name, e)
+                failed.append(model_name)
+        if failed:
+            raise RuntimeError(f"Failed to export {len(failed)} of {len(model_names)} models: {', '.join(failed)}")
+
+
+@dataclass
+class BenchmarkQuantization:
+    """Compare dynamic int8 quantized CPU inference (--asr.quantize) against the full precision model.
+    Reports the model size, transcription time and, when reference TextGrids are given, the character
+    error rate of both models on the audio files. Quantized weights are cached for later runs.
+    """
+
+    audio_paths: list[Path]
+    """Paths to audio files to transcribe."""
+
+    model_name: str = DEFAULT_MODEL
+    """The name of the HuggingFace model used to transcribe speech."""
+
+    reference_dir: Path | None = None
+    """Directory of reference TextGrids with the same basenames as the audio files."""
+
+    reference_tier: str = DEFAULT_TRANSCRIPTION_TIER_NAME
+    """Name of the tier with reference transcriptions. The text of its non-empty intervals is joined in time order."""
+
+    def run(self):
+        """Transcribe with both models and log the report."""
+        references = None
+        if self.reference_dir is not None:
+            references = []
+            for audio_path in self.audio_paths:
+                tg = TextGridContainer.from_textgrid_file(self.reference_dir / to_textgrid_basename(audio_path))
+                tier = tg.text_grid.get_tier_by_name(self.reference_tier)
+                references.append(" ".join(interval.text for interval in tier.intervals if interval.text.strip()))
+
+        report = benchmark_quantization(self.model_name, self.audio_paths, references)
+        logger.info("Quantization report:\n%s", report)
 
 
 def main():
     """Main entry point for the CLI."""
     logging.basicConfig(level=logging.INFO, format="%(name)s : %(levelname)s : %(message)s")
-    cli = tyro.cli(Transcribe | TranscribeIntervals)
+    cli = tyro.cli(Transcribe | TranscribeIntervals | TranscribeSweep | Merge | ExportOnnx | BenchmarkQuantization)
     try:
         cli.run()
     except Exception as e:
@@ -0,0 +1,271 @@
+"""Direct inference with CTC speech recognition models, without transformers.pipeline.
+
+The transformers automatic speech recognition pipeline converts inputs, runs the model and
+decodes outputs one call at a time with generic pre- and postprocessing. CTCEngine calls the
+feature extractor and CTC model directly on padded batches and does greedy CTC decoding with
+vectorized NumPy over the whole batch. Decoded text and character timestamps are the same as
+the pipeline's for Wav2Vec2-style tokenizers.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+import logging
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from autoipaalign.core.model_files import directory_revision
+from autoipaalign.core.quantization import load_quantized_model
+
+if TYPE_CHECKING:
+    import transformers
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CollapsedCTC:
+    """Greedy CTC output for one input after merging repeated tokens and removing blanks."""
+
+    token_ids: np.ndarray
+    """Token id of each emitted character."""
+
+    start_frames: np.ndarray
+    """Index of the first frame of each emitted character."""
+
+    end_frames: np.ndarray
+    """Index one past the last frame of each emitted character."""
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+
+def greedy_ctc_collapse(token_ids: Sequence[np.ndarray], blank_id: int) -> list[CollapsedCTC]:
+    """Merge runs of repeated tokens and drop blanks for a batch of frame-level token id sequences.
+
+    All sequences are concatenated and processed at once, so the cost is a few NumPy operations
+    for the whole batch rather than a Python loop over frames.
+
+    Args:
+        token_ids: Argmax token id of every frame, one array per input
+        blank_id: Id of the CTC blank token
+
+    Returns:
+        CollapsedCTC for each input, with frame indices relative to the start of that input
+    """
+    lengths = np.array([len(ids) for ids in token_ids], dtype=np.int64)
+    if lengths.sum() == 0:
+        empty = np.array([], dtype=np.int64)
+        return [CollapsedCTC(empty, empty, empty) for _ in token_ids]
+
+    flat = np.concatenate([np.asarray(ids, dtype=np.int64) for ids in token_ids])
+    row_ends = np.cumsum(lengths)
+    row_starts = row_ends - lengths
+
+    # A new run starts wherever the token changes or a new input begins
+    is_run_start = np.ones(len(flat), dtype=bool)
+    is_run_start[1:] = flat[1:] != flat[:-1]
+    is_run_start[row_starts[lengths > 0]] = True
+    run_starts = np.flatnonzero(is_run_start)
+    run_ends = np.append(run_starts[1:], len(flat))
+
+    is_kept = flat[run_starts] != blank_id
+    run_starts = run_starts[is_kept]
+    run_ends = run_ends[is_kept]
+    rows = np.searchsorted(row_ends, run_starts, side="right")
+
+    ids = flat[run_starts]
+    starts = run_starts - row_starts[rows]
+    ends = run_ends - row_starts[rows]
+    splits = np.cumsum(np.bincount(rows, minlength=len(lengths)))[:-1]
+    return [
+        CollapsedCTC(token_ids=i, start_frames=s, end_frames=e)
+        for i, s, e in zip(np.split(ids, splits), np.split(starts, splits), np.split(ends, splits))
+    ]
+
+
+def token_strings(tokenizer, vocab_size: int) -> np.ndarray:
+    """Lookup table from token id to the string the tokenizer decodes it to.
+
+    Args:
+        tokenizer: CTC tokenizer for the model's vocabulary
+        vocab_size: Number of model outputs. Outputs past the end of the tokenizer's vocabulary decode as unknown.
+
+    Returns:
+        Object array of strings indexed by token id
+    """
+    tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+    tokens += [tokenizer.unk_token] * (vocab_size - len(tokens))
+    word_delimiter = getattr(tokenizer, "word_delimiter_token", None)
+    replace_char = getattr(tokenizer, "replace_word_delimiter_char", " ")
+    return np.array([replace_char if t == word_delimiter else t for t in tokens], dtype=object)
+
+
+class CTCEngine:
+    """Runs a CTC model with its feature extractor and decodes the outputs greedily.
+
+    Args:
+        model: CTC model, such as a Wav2Vec2ForCTC, or None for an engine that only decodes
+        feature_extractor: Feature extractor for the model's audio inputs
+        tokenizer: CTC tokenizer for the model's vocabulary
+        config: Configuration of the model. Defaults to model.config.
+    """
+
+    backend = "torch"
+    """Name of the runtime that executes the model. Outputs of different backends may differ slightly."""
+
+    def __init__(self, model, feature_extractor, tokenizer, config=None):
+        self.model = model
+        self.config = config if config is not None else model.config
+        self.feature_extractor = feature_extractor
+        self.tokenizer = tokenizer
+        self._token_strings = token_strings(tokenizer, getattr(self.config, "vocab_size", 0))
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, device: int | str = -1, quantize: bool = False) -> "CTCEngine":
+        """Load the model, feature extractor and tokenizer for a HuggingFace model.
+
+        Args:
+            model_name: HuggingFace model name or local path
+            device: Device index, -1 for CPU, or a torch device string
+            quantize: Load the model with dynamic int8 quantized linear layers. Only supported on CPU.
+
+        Returns:
+            A CTCEngine with the model in evaluation mode on the device
+        """
+        import torch
+        import transformers
+
+        if isinstance(device, int):
+            device = "cpu" if device < 0 else f"cuda:{device}"
+        if quantize:
+            if torch.device(device).type != "cpu":
+                raise ValueError(f"Dynamic int8 quantization is only supported on CPU, not {device}")
+            model = load_quantized_model(model_name)
+        else:
+            model = transformers.AutoModelForCTC.from_pretrained(model_name).to(device).eval()
+        feature_extractor = transformers.AutoFeatureExtractor.from_pretrained(model_name)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        return cls(model, feature_extractor, tokenizer)
+
+    @classmethod
+    def decoder_from_pretrained(cls, model_name: str) -> "CTCEngine":
+        """Load only the configuration, feature extractor and tokenizer of a model, without its weights.
+
+        The engine decodes token ids, for example from a LogitCache, but can't run forward_batch.
+
+        Args:
+            model_name: HuggingFace model name or local path
+        """
+        import transformers
+
+        config = transformers.AutoConfig.from_pretrained(model_name)
+        feature_extractor = transformers.AutoFeatureExtractor.from_pretrained(model_name)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        return cls(None, feature_extractor, tokenizer, config=config)
+
+    @classmethod
+    def from_pipeline(cls, pipe: "transformers.Pipeline") -> "CTCEngine":
+        """Share the components already loaded by a transformers speech recognition pipeline."""
+        return cls(pipe.model, pipe.feature_extractor, pipe.tokenizer)
+
+    @property
+    def inputs_to_logits_ratio(self) -> int:
+        """Number of audio samples per CTC output frame."""
+        return getattr(self.config, "inputs_to_logits_ratio", 1)
+
+    @property
+    def sampling_rate(self) -> int:
+        """Sampling rate the model expects."""
+        return self.feature_extractor.sampling_rate
+
+    @property
+    def revision(self) -> str | None:
+        """Version of the model files: the commit hash for models from the HuggingFace Hub, or the time the
+        files were last modified for a local model directory."""
+        commit_hash = getattr(self.config, "_commit_hash", None)
+        if commit_hash is not None:
+            return commit_hash
+        name_or_path = getattr(self.config, "name_or_path", "")
+        if name_or_path and os.path.isdir(name_or_path):
+            return directory_revision(name_or_path)
+        return None
+
+    @property
+    def blank_id(self) -> int:
+        """Id of the CTC blank token, which is the tokenizer's padding token."""
+        return self.tokenizer.pad_token_id
+
+    def forward_batch(self, arrays: Sequence[np.ndarray]) -> list[np.ndarray]:
+        """Run one padded batch through the CTC model and return the argmax token ids for each input.
+
+        Inputs are right-padded to the longest one and the attention mask keeps padding out of the
+        attention layers. Frames past each input's own length are dropped, so padding never produces tokens.
+
+        Args:
+            arrays: Audio arrays at the model's sampling rate
+
+        Returns:
+            Token id of every frame, one array per input
+        """
+        import torch
+
+        processed = self._preprocess(arrays, return_tensors="pt")
+        model = self.model
+        input_values = processed[model.main_input_name].to(device=model.device, dtype=model.dtype)
+        attention_mask = processed["attention_mask"].to(model.device)
+
+        with torch.inference_mode():
+            logits = model(input_values, attention_mask=attention_mask).logits
+
+        input_lengths = attention_mask.sum(dim=-1)
+        if hasattr(model, "_get_feat_extract_output_lengths"):
+            frame_lengths = model._get_feat_extract_output_lengths(input_lengths)
+        else:
+            frame_lengths = torch.ceil(input_lengths / self.inputs_to_logits_ratio).long()
+
+        predicted_ids = logits.argmax(dim=-1).cpu().numpy()
+        return [ids[:n] for ids, n in zip(predicted_ids, frame_lengths.tolist())]
+
+    def _preprocess(self, arrays: Sequence[np.ndarray], return_tensors: str):
+        """Extract right-padded model inputs and an attention mask for a batch of audio arrays."""
+        return self.feature_extractor(
+            list(arrays),
+            sampling_rate=self.sampling_rate,
+            padding=True,
+            return_tensors=return_tensors,
+            return_attention_mask=True,
+        )
+
+    def collapse(self, token_ids: Sequence[np.ndarray]) -> list[CollapsedCTC]:
+        """Greedy CTC collapse of frame-level token ids for a batch of inputs."""
+        return greedy_ctc_collapse(token_ids, self.blank_id)
+
+    def text(self, collapsed: CollapsedCTC) -> str:
+        """Text of collapsed CTC output, built the same way as the tokenizer's decode."""
+        text = "".join(self._token_strings[collapsed.token_ids]).strip()
+        if getattr(self.tokenizer, "do_lower_case", False):
+            text = text.lower()
+        if self.tokenizer.clean_up_tokenization_spaces:
+            text = self.tokenizer.clean_up_tokenization(text)
+        return text
+
+    def chars(self, collapsed: CollapsedCTC) -> list[str]:
+        """Character or phone string of each emitted token."""
+        return self._token_strings[collapsed.token_ids].tolist()
+
+    def timestamps(self, collapsed: CollapsedCTC, frame_offset: int = 0) -> list[tuple[float, float]]:
+        """Start and end time in seconds of each emitted token.
+
+        Args:
+            collapsed: Collapsed CTC output
+            frame_offset: Index of the frame the collapsed output's frame indices are relative to
+
+        Returns:
+            (start, end) times of each token
+        """
+        ratio = self.inputs_to_logits_ratio
+        starts = (collapsed.start_frames + frame_offset) * ratio / self.sampling_rate
+        ends = (collapsed.end_frames + frame_offset) * ratio / self.sampling_rate
+        return list(zip(starts.tolist(), ends.tolist()))
@@ -0,0 +1,155 @@
+"""Measuring transcription accuracy and speed of model variants against reference transcriptions."""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+import logging
+import os
+import time
+
+from autoipaalign.core.audio import load_audio
+from autoipaalign.core.ctc_engine import CTCEngine
+from autoipaalign.core.quantization import state_dict_size_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def edit_distance(hypothesis: Sequence, reference: Sequence) -> int:
+    """Levenshtein distance between two sequences, such as strings of characters or lists of phones."""
+    previous = list(range(len(reference) + 1))
+    for i, h in enumerate(hypothesis, start=1):
+        current = [i]
+        for j, r in enumerate(reference, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (h != r)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(hypotheses: Sequence[str], references: Sequence[str]) -> float:
+    """Total character edit distance divided by total reference length, ignoring whitespace.
+
+    Args:
+        hypotheses: Predicted transcriptions
+        references: Reference transcriptions, one for each prediction
+
+    Returns:
+        Character error rate over all transcriptions
+    """
+    distance = 0
+    length = 0
+    for hypothesis, reference in zip(hypotheses, references, strict=True):
+        hypothesis, reference = "".join(hypothesis.split()), "".join(reference.split())
+        distance += edit_distance(hypothesis, reference)
+        length += len(reference)
+    return distance / max(length, 1)
+
+
+@dataclass
+class QuantizationReport:
+    """Comparison of a dynamic int8 quantized model against the full precision model."""
+
+    model_name: str
+    """The name of the HuggingFace model."""
+
+    num_files: int
+    """Number of audio files transcribed by each model."""
+
+    audio_seconds: float
+    """Total duration of the audio files."""
+
+    fp32_size_bytes: int
+    """Size of the full precision model weights."""
+
+    int8_size_bytes: int
+    """Size of the quantized model weights."""
+
+    fp32_seconds: float
+    """Time the full precision model took to transcribe all files."""
+
+    int8_seconds: float
+    """Time the quantized model took to transcribe all files."""
+
+    fp32_cer: float | None = None
+    """Character error rate of the full precision model against the references, if given."""
+
+    int8_cer: float | None = None
+    """Character error rate of the quantized model against the references, if given."""
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster the quantized model is."""
+        return self.fp32_seconds / self.int8_seconds
+
+    @property
+    def size_reduction(self) -> float:
+        """How many times smaller the quantized model weights are."""
+        return self.fp32_size_bytes / self.int8_size_bytes
+
+    def __str__(self) -> str:
+        lines = [
+            f"Dynamic int8 quantization of {self.model_name} on {self.num_files} files ({self.audio_seconds:.1f}s)",
+            f"Model size: {self.fp32_size_bytes / 1e6:.1f} MB fp32, {self.int8_size_bytes / 1e6:.1f} MB int8 "
+            f"({self.size_reduction:.2f}x smaller)",
+            f"Transcription time: {self.fp32_seconds:.2f}s fp32, {self.int8_seconds:.2f}s int8 "
+            f"({self.speedup:.2f}x faster)",
+        ]
+        if self.fp32_cer is not None and self.int8_cer is not None:
+            lines.append(
+                f"Character error rate: {self.fp32_cer:.2%} fp32, {self.int8_cer:.2%} int8 "
+                f"({self.int8_cer - self.fp32_cer:+.2%})"
+            )
+        return "\n".join(lines)
+
+
+def benchmark_quantization(
+    model_name: str,
+    audio_paths: Sequence[str | os.PathLike[str]],
+    references: Sequence[str] | None = None,
+    sampling_rate: int = 16000,
+) -> QuantizationReport:
+    """Transcribe audio files on CPU with the full precision and the dynamic int8 quantized model and compare them.
+
+    Audio is decoded once before timing, so transcription times only include the model and decoding.
+    Files are transcribed one at a time.
+
+    Args:
+        model_name: HuggingFace model name or local path
+        audio_paths: Paths to the audio files
+        references: Optional reference transcription of each audio file for measuring accuracy
+        sampling_rate: Sampling rate for audio preprocessing
+
+    Returns:
+        Sizes, transcription times and, with references, character error rates of both models
+
+    Raises:
+        ValueError: If there are no audio files, or references are given for a different number of files.
+    """
+    if not audio_paths:
+        raise ValueError("Give audio paths to benchmark")
+    if references is not None and len(references) != len(audio_paths):
+        raise ValueError(f"Got {len(references)} references for {len(audio_paths)} audio files")
+    arrays = [load_audio(audio_path, sampling_rate) for audio_path in audio_paths]
+
+    results = {}
+    for name, quantize in [("fp32", False), ("int8", True)]:
+        engine = CTCEngine.from_pretrained(model_name, "cpu", quantize=quantize)
+        # Warm up so one-time setup costs are not counted
+        engine.forward_batch([arrays[0][:sampling_rate]])
+        start = time.perf_counter()
+        transcriptions = [engine.text(engine.collapse(engine.forward_batch([y]))[0]) for y in arrays]
+        seconds = time.perf_counter() - start
+        logger.info("Transcribed %s files with the %s model in %.2fs", len(arrays), name, seconds)
+        cer = character_error_rate(transcriptions, references) if references is not None else None
+        results[name] = (state_dict_size_bytes(engine.model), seconds, cer)
+        del engine
+
+    return QuantizationReport(
+        model_name=model_name,
+        num_files=len(arrays),
+        audio_seconds=sum(len(y) for y in arrays) / sampling_rate,
+        fp32_size_bytes=results["fp32"][0],
+        int8_size_bytes=results["int8"][0],
+        fp32_seconds=results["fp32"][1],
+        int8_seconds=results["int8"][1],
+        fp32_cer=results["fp32"][2],
+        int8_cer=results["int8"][2],
+    )
@@ -0,0 +1,287 @@
+"""Discovery of the audio files to transcribe from paths, directories, glob patterns and manifests.
+
+Corpora can have more files than fit on a command line, so inputs can be directories, which are
+searched recursively for audio files, quoted glob patterns, or a manifest file listing one input per
+row. Every source is read lazily, with os.scandir for directories, so transcription can start on the
+first files while the rest of a large tree is still being listed.
+
+The TextGrid of a file found in a directory or with a glob pattern is named after its path relative to
+the directory, or to the part of the pattern before its first glob character, so the output mirrors the
+input tree and dr1/spk1/sa1.wav and dr2/spk2/sa1.wav don't both write sa1.TextGrid.
+
+A manifest is a CSV file with a header row, or a JSON Lines file with one object per line, with these
+columns or keys:
+
+- audio_path: Path to the audio file, relative to the manifest's directory unless absolute. Required.
+- output_name: Name of the output TextGrid, without the .TextGrid suffix, which may be a path such as
+  dr1/sa1. Defaults to the audio file's name.
+- start and end: Times in seconds of the only part of the file to transcribe. Defaults to the whole
+  file.
+- textgrid_path: Path to an existing TextGrid whose intervals to transcribe, relative to the manifest's
+  directory unless absolute. Only used to transcribe intervals.
+
+Audio files can also be paired with existing TextGrids of the same name, such as dr1/s01.wav with
+dr1/s01.TextGrid, to transcribe their intervals.
+"""
+
+from collections.abc import Iterable, Iterator
+import csv
+import dataclasses
+from dataclasses import dataclass
+import glob
+from itertools import islice, takewhile
+import json
+import logging
+import os
+from pathlib import Path
+
+from autoipaalign.core.textgrid_io import TEXT_GRID_SUFFIX, to_textgrid_basename
+
+logger = logging.getLogger(__name__)
+
+AUDIO_SUFFIXES = frozenset([".aac", ".aif", ".aiff", ".flac", ".m4a", ".mp3", ".ogg", ".opus", ".wav", ".wma"])
+"""File suffixes, in lower case, of the audio files found in directories."""
+
+TEXTGRID_SUFFIXES = frozenset([".textgrid"])
+"""File suffixes, in lower case, of the TextGrid files found in directories."""
+
+JSON_LINES_SUFFIXES = frozenset([".jsonl", ".ndjson"])
+"""Suffixes of manifests read as JSON Lines. Other manifests are read as CSV."""
+
+_GLOB_CHARACTERS = frozenset("*?[")
+
+
+@dataclass(frozen=True)
+class InputAudio:
+    """An audio file, or an interval of one, to transcribe into its own TextGrid."""
+
+    audio_path: Path
+    """Path to the audio file."""
+
+    output_name: str | None = None
+    """Name of the output TextGrid without the .TextGrid suffix, which may be a path relative to the output
+    target with / as separator, or None to name it after the audio file."""
+
+    interval: tuple[float, float] | None = None
+    """Start and end times in seconds of the only part of the file to transcribe, or None for the whole file."""
+
+    textgrid_path: Path | None = None
+    """Path to an existing TextGrid whose intervals to transcribe, or None."""
+
+    @property
+    def textgrid_name(self) -> str:
+        """File name of the output TextGrid, relative to the output target."""
+        if self.output_name is None:
+            return to_textgrid_basename(self.audio_path)
+        return f"{self.output_name}{TEXT_GRID_SUFFIX}"
+
+
+def iter_audio_files(
+    paths: Iterable[str | os.PathLike[str]], suffixes: frozenset[str] = AUDIO_SUFFIXES
+) -> Iterator[Path]:
+    """Audio files from paths to files, directories and glob patterns, found as they are needed.
+
+    Files are yielded as given, whatever their suffix. Directories are searched recursively for files
+    with one of suffixes, in name order within each directory, skipping hidden files and directories and
+    without following symbolic links to directories. Paths that don't exist but contain glob characters
+    are expanded as recursive glob patterns, where ** matches any number of directories.
+
+    Args:
+        paths: Paths to audio files or directories, or glob patterns
+        suffixes: Lower case suffixes of the audio files to find in directories
+
+    Yields:
+        Paths to audio files
+    """
+    return (path for path, _ in _iter_files(paths, suffixes))
+
+
+def iter_textgrid_files(paths: Iterable[str | os.PathLike[str]]) -> Iterator[Path]:
+    """TextGrid files from paths to files, directories and glob patterns, found like audio files in
+    iter_audio_files."""
+    return (path for path, _ in _iter_files(paths, TEXTGRID_SUFFIXES))
+
+
+def iter_audio_inputs(
+    paths: Iterable[str | os.PathLike[str]], suffixes: frozenset[str] = AUDIO_SUFFIXES
+) -> Iterator[InputAudio]:
+    """Inputs for the audio files found as in iter_audio_files, where each file found in a directory or with a
+    glob pattern is named after its path relative to the directory, or to the part of the pattern before its
+    first glob character."""
+    for path, output_name in _iter_files(paths, suffixes):
+        yield InputAudio(path, output_name)
+
+
+def _iter_files(paths: Iterable[str | os.PathLike[str]], suffixes: frozenset[str]) -> Iterator[tuple[Path, str | None]]:
+    """Files from paths to files, directories searched for files with one of suffixes, and glob patterns, each
+    with its path without suffix relative to the directory or pattern, or None if it was given as a file."""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            for file_path in _scan_directory(path, suffixes):
+                yield file_path, _relative_name(file_path, path)
+        elif not path.exists() and _GLOB_CHARACTERS & set(os.fspath(path)):
+            root = Path(*takewhile(lambda part: not _GLOB_CHARACTERS & set(part), path.parts))
+            for match in glob.iglob(os.fspath(path), recursive=True):
+                if not os.path.isdir(match):
+                    yield Path(match), _relative_name(Path(match), root)
+        else:
+            # Missing files are passed on, so they get an error transcription like other unreadable files
+            yield path, None
+
+
+def _relative_name(path: Path, root: Path) -> str:
+    """Path of a file relative to root, without its suffix and with / as separator."""
+    return path.relative_to(root).with_suffix("").as_posix()
+
+
+def _scan_directory(directory: Path, suffixes: frozenset[str]) -> Iterator[Path]:
+    """Files with one of suffixes in a directory and its subdirectories."""
+    try:
+        with os.scandir(directory) as scan:
+            entries = sorted((entry for entry in scan if not entry.name.startswith(".")), key=lambda e: e.name)
+    except OSError as e:
+        logger.warning("Skipping unreadable directory %s: %s", directory, e)
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scan_directory(Path(entry.path), suffixes)
+        elif Path(entry.name).suffix.lower() in suffixes:
+            yield Path(entry.path)
+
+
+def read_manifest(manifest_path: str | os.PathLike[str]) -> Iterator[InputAudio]:
+    """Inputs listed in a CSV or JSON Lines manifest, read one row at a time.
+
+    Args:
+        manifest_path: Path to the manifest. Files with a .jsonl or .ndjson suffix are read as JSON Lines and
+            others as CSV with a header row.
+
+    Yields:
+        An InputAudio for each row
+
+    Raises:
+        ValueError: If a row can't be read, has no audio_path, or has only one of start and end or times that are not
+            numbers or an end that is not after the start.
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.parent
+    with open(manifest_path, newline="") as f:
+        is_json_lines = manifest_path.suffix.lower() in JSON_LINES_SUFFIXES
+        # Line 1 of a CSV file is the header
+        rows = enumerate(f, start=1) if is_json_lines else enumerate(csv.DictReader(f), start=2)
+        for line_number, row in rows:
+            if is_json_lines and not row.strip():
+                continue
+            try:
+                yield _manifest_input(json.loads(row) if is_json_lines else row, base_dir)
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"Invalid row on line {line_number} of manifest {manifest_path}: {e}") from e
+
+
+def _manifest_input(row: dict, base_dir: Path) -> InputAudio:
+    """InputAudio from one manifest row, where empty values count as missing."""
+    values = {key: value for key, value in row.items() if value not in (None, "")}
+    if "audio_path" not in values:
+        raise ValueError("audio_path is missing")
+    interval = None
+    if "start" in values or "end" in values:
+        if "start" not in values or "end" not in values:
+            raise ValueError("start and end must be given together")
+        interval = (float(values["start"]), float(values["end"]))
+        if interval[1] <= interval[0]:
+            raise ValueError(f"end {interval[1]} is not after start {interval[0]}")
+    output_name = values.get("output_name")
+    return InputAudio(
+        audio_path=base_dir / values["audio_path"],
+        output_name=str(output_name) if output_name is not None else None,
+        interval=interval,
+        textgrid_path=base_dir / values["textgrid_path"] if "textgrid_path" in values else None,
+    )
+
+
+def iter_inputs(
+    audio_paths: Iterable[str | os.PathLike[str]] = (),
+    manifest_path: str | os.PathLike[str] | None = None,
+) -> Iterator[InputAudio]:
+    """Inputs from audio paths, directories and glob patterns, as in iter_audio_inputs, followed by those of a
+    manifest, if there is one."""
+    yield from iter_audio_inputs(audio_paths)
+    if manifest_path is not None:
+        yield from read_manifest(manifest_path)
+
+
+def check_unique_names(inputs: Iterable[InputAudio]) -> Iterator[InputAudio]:
+    """Pass inputs on as they are needed, checking that no two of them write the same TextGrid.
+
+    Raises:
+        ValueError: At the first input with the textgrid_name of an earlier one, before it is transcribed.
+    """
+    audio_paths: dict[str, Path] = {}
+    for item in inputs:
+        if item.textgrid_name in audio_paths:
+            raise ValueError(
+                f"{item.audio_path} and {audio_paths[item.textgrid_name]} would both be written to "
+                f"{item.textgrid_name}. Pass their common parent directory, or name the outputs in a manifest."
+            )
+        audio_paths[item.textgrid_name] = item.audio_path
+        yield item
+
+
+def pair_with_textgrids(
+    audio_inputs: Iterable[InputAudio], textgrid_paths: Iterable[str | os.PathLike[str]] = ()
+) -> Iterator[InputAudio]:
+    """Pair audio files with the TextGrids of the same name.
+
+    TextGrids are found in textgrid_paths as in iter_textgrid_files, all before the first pair is made, and
+    named like audio files in iter_audio_inputs. Each audio file is paired with the TextGrid of its
+    output_name, such as dr1/s01.wav with dr1/s01.TextGrid, or else with the only TextGrid of its basename.
+    Without textgrid_paths, each audio file is paired with the TextGrid next to it. Audio files without
+    a TextGrid are passed on with a warning and a textgrid_path of None.
+
+    Args:
+        audio_inputs: Audio files to pair, such as from iter_audio_inputs
+        textgrid_paths: Paths to TextGrid files or directories, or glob patterns
+
+    Yields:
+        Each input with the textgrid_path it is paired with, or None
+    """
+    textgrids: dict[str, Path] | None = None
+    by_basename: dict[str, Path | None] = {}
+    textgrid_paths = list(textgrid_paths)
+    if textgrid_paths:
+        textgrids = {}
+        for textgrid_path, name in _iter_files(textgrid_paths, TEXTGRID_SUFFIXES):
+            name = name or textgrid_path.stem
+            if name in textgrids:
+                logger.warning("Ignoring TextGrid %s with the same name as %s", textgrid_path, textgrids[name])
+                continue
+            textgrids[name] = textgrid_path
+            # A basename shared by TextGrids in different directories pairs with none of them
+            by_basename[textgrid_path.stem] = None if textgrid_path.stem in by_basename else textgrid_path
+
+    for item in audio_inputs:
+        audio_path = item.audio_path
+        if textgrids is not None:
+            textgrid_path = textgrids.get(item.output_name or audio_path.stem) or by_basename.get(audio_path.stem)
+        else:
+            textgrid_path = next(
+                (
+                    audio_path.with_suffix(suffix)
+                    for suffix in [TEXT_GRID_SUFFIX, TEXT_GRID_SUFFIX.lower()]
+                    if audio_path.with_suffix(suffix).is_file()
+                ),
+                None,
+            )
+        if textgrid_path is None:
+            logger.warning("%s has no TextGrid of the same name", audio_path)
+        yield dataclasses.replace(item, textgrid_path=textgrid_path)
+
+
+def iter_blocks(items: Iterable, block_size: int) -> Iterator[list]:
+    """Consecutive lists of block_size items, the last of which may be shorter, taking items only as needed."""
+    if block_size < 1:
+        raise ValueError(f"block_size must be at least 1, got {block_size}")
+    items = iter(items)
+    while block := list(islice(items, block_size)):
+        yield block
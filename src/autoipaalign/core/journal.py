@@ -0,0 +1,129 @@
+"""Append-only journal of the audio files whose TextGrids are finished, for resuming interrupted jobs.
+
+Each line of the journal is a JSON record of one finished input: the audio file's path, modification
+time and size, the name of its TextGrid and the interval transcribed, and a hash of the settings that
+determine the TextGrid, such as the model name and tier names. An input counts as finished when its
+latest record has the same interval and settings and the file still has the same modification time
+and size. Audio files are never read, so keeping and checking a journal only costs a stat call per
+file, and resuming a job costs about as much as the work that is left.
+
+Records are appended and flushed as each TextGrid is written, so a job that is killed loses at most
+the files it was transcribing.
+"""
+
+from collections.abc import Callable, Sequence
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from autoipaalign.core.inputs import InputAudio
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = ".autoipaalign-journal.jsonl"
+"""File name of the journal of a directory target."""
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+"""Suffix added to the name of a zip file target for its journal."""
+
+
+def journal_path(target_path: str | os.PathLike[str], is_zip: bool) -> Path:
+    """Path of the journal for an output directory, inside it, or for a zip file, next to it."""
+    target_path = Path(target_path)
+    if is_zip:
+        return target_path.with_name(f"{target_path.name}{JOURNAL_SUFFIX}")
+    return target_path / JOURNAL_NAME
+
+
+class CompletionJournal:
+    """Journal of finished audio files for one set of transcription settings.
+
+    Args:
+        path: Path of the journal file. Created if it doesn't exist.
+        settings: JSON-serializable settings that determine the TextGrids, such as model name and tier names.
+            Records made with other settings don't count as finished.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], settings: dict):
+        self.path = Path(path)
+        self.settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+        self._records: dict[tuple[str, str], dict] = {}
+        is_cut_off = False
+        if self.path.exists():
+            with open(self.path) as f:
+                for line_number, line in enumerate(f, start=1):
+                    try:
+                        record = json.loads(line)
+                        self._records[record["audio"], record["output"]] = record
+                    except (ValueError, KeyError, TypeError):
+                        # The last line of a journal whose job was killed may be cut off
+                        logger.warning("Ignoring unreadable line %s of journal %s", line_number, self.path)
+                    is_cut_off = not line.endswith("\n")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a")
+        if is_cut_off:
+            self._file.write("\n")
+
+    def is_finished(self, item: InputAudio) -> bool:
+        """Whether the input was finished with the journal's settings and its audio file's modification time and
+        size haven't changed since."""
+        record = self._records.get(_journal_key(item))
+        if record is None or record["settings"] != self.settings_hash or record["interval"] != _interval(item):
+            return False
+        try:
+            stat = os.stat(item.audio_path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == (record["mtime_ns"], record["size"])
+
+    def remaining(
+        self, inputs: Sequence[InputAudio], has_output: Callable[[InputAudio], bool] | None = None
+    ) -> list[int]:
+        """Indices of the inputs that are not finished.
+
+        Args:
+            inputs: Audio files or intervals of them
+            has_output: Optional function of an input that tells whether its TextGrid still exists.
+                Inputs without a TextGrid are not finished.
+        """
+        return [
+            i
+            for i, item in enumerate(inputs)
+            if not (self.is_finished(item) and (has_output is None or has_output(item)))
+        ]
+
+    def record(self, item: InputAudio):
+        """Record that an input is finished."""
+        stat = os.stat(item.audio_path)
+        audio, output = _journal_key(item)
+        record = {
+            "audio": audio,
+            "output": output,
+            "interval": _interval(item),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "settings": self.settings_hash,
+        }
+        self._records[audio, output] = record
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "CompletionJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _journal_key(item: InputAudio) -> tuple[str, str]:
+    return os.fspath(Path(item.audio_path).resolve()), item.textgrid_name
+
+
+def _interval(item: InputAudio) -> list[float] | None:
+    """Interval of an input as it is stored in JSON."""
+    return list(item.interval) if item.interval is not None else None
@@ -0,0 +1,159 @@
+"""On-disk cache of frame-level CTC model outputs.
+
+The forward pass through the model is by far the most expensive step of transcription, but
+its output only depends on the audio, the model and the way audio is split into windows.
+Output options, such as tier names or whether a phone tier is added, are applied afterwards
+when decoding. LogitCache stores the greedy CTC token id of every frame, which is the top-1
+of the frame's posteriors and everything greedy decoding needs, so runs that only change
+output options decode from the cache instead of running the model again.
+
+Entries are compressed .npz files named by a hash of their key. The least recently used
+entries are deleted when the cache grows past its size limit. Entries are written to a
+temporary file and renamed into place, so several processes can share a cache directory.
+"""
+
+from collections.abc import Iterator
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".npz"
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file_contents(path: str | os.PathLike[str]) -> str:
+    """SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_array(y: np.ndarray) -> str:
+    """SHA-256 hex digest of an array's dtype, shape and values."""
+    digest = hashlib.sha256()
+    digest.update(f"{y.dtype.str}{y.shape}".encode())
+    digest.update(np.ascontiguousarray(y).data)
+    return digest.hexdigest()
+
+
+class LogitCache:
+    """Least recently used cache of frame-level CTC token ids in a directory.
+
+    Args:
+        cache_dir: Directory to store entries in. Created if it doesn't exist.
+        max_bytes: Total size of entries above which the least recently used ones are deleted.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike[str], max_bytes: int):
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+        # Content hashes of files already seen, so intervals of the same file are only hashed once
+        self._file_hashes: dict[tuple[str, int, int], str] = {}
+
+    def key(self, audio: str | os.PathLike[str] | np.ndarray, **parts) -> str:
+        """Build a cache key from the audio contents and everything else that changes the model outputs.
+
+        Args:
+            audio: Path to an audio file or an audio array
+            **parts: JSON-serializable values such as model name, revision and interval
+
+        Returns:
+            Hex digest identifying the entry
+        """
+        if isinstance(audio, np.ndarray):
+            audio_hash = hash_array(audio)
+        else:
+            audio_hash = self._file_hash(audio)
+        payload = json.dumps({"audio": audio_hash, **parts}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Token ids stored under key, or None if there is no entry.
+
+        Reading an entry marks it as recently used.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                token_ids = entry["token_ids"]
+            os.utime(path)
+        except (OSError, KeyError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Ignoring unreadable logit cache entry %s: %s", path, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return token_ids
+
+    def put(self, key: str, token_ids: np.ndarray):
+        """Store token ids under key and evict old entries if the cache is over its size limit."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, token_ids=token_ids.astype(_smallest_int_dtype(token_ids)))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._total_bytes += path.stat().st_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under its size limit."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug("Evicted logit cache entry %s", path)
+        self._total_bytes = total
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self._total_bytes} bytes in {self.cache_dir}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def _entries(self) -> Iterator[tuple[Path, int, int]]:
+        """(path, size, last used time) of each entry."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield Path(entry.path), stat.st_size, stat.st_mtime_ns
+
+    def _file_hash(self, path: str | os.PathLike[str]) -> str:
+        stat = os.stat(path)
+        file_id = (os.fspath(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        if file_id not in self._file_hashes:
+            self._file_hashes[file_id] = hash_file_contents(path)
+        return self._file_hashes[file_id]
+
+
+def _smallest_int_dtype(token_ids: np.ndarray) -> type:
+    """Smallest integer type that holds all token ids. CTC vocabularies almost always fit in int16."""
+    if len(token_ids) == 0 or token_ids.max() <= np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
@@ -0,0 +1,76 @@
+"""Locating model files and artifacts derived from them, such as exports and quantized weights.
+
+Derived artifacts are saved in a subfolder of the model directory. For models from the
+HuggingFace Hub that is the local snapshot of the model revision, so each revision gets its
+own artifacts. For local model directories, an artifact is rebuilt when any model file is
+newer than it.
+"""
+
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def model_dir(model_name: str) -> Path:
+    """Local directory with the files of a model, downloading them from the HuggingFace Hub if needed.
+
+    Args:
+        model_name: HuggingFace model name or local path
+
+    Returns:
+        The local path, or the snapshot directory of the model in the HuggingFace cache
+    """
+    if os.path.isdir(model_name):
+        return Path(model_name)
+
+    import huggingface_hub
+    from huggingface_hub.errors import LocalEntryNotFoundError
+
+    try:
+        return Path(huggingface_hub.snapshot_download(model_name, local_files_only=True))
+    except LocalEntryNotFoundError:
+        logger.info("Model %s is not in the local cache, downloading it", model_name)
+        return Path(huggingface_hub.snapshot_download(model_name))
+
+
+def model_revision(model_name: str) -> str:
+    """Version of a model's files, found without loading the model.
+
+    Args:
+        model_name: HuggingFace model name or local path
+
+    Returns:
+        The commit hash of the snapshot for models from the HuggingFace Hub, or directory_revision for
+        local model directories
+    """
+    if os.path.isdir(model_name):
+        return directory_revision(model_name)
+    # Snapshot directories in the HuggingFace cache are named after the commit hash
+    return model_dir(model_name).name
+
+
+def directory_revision(directory: str | os.PathLike[str]) -> str:
+    """Version of the files in a local model directory: the time any of them was last modified."""
+    return str(max((entry.stat().st_mtime_ns for entry in os.scandir(directory) if entry.is_file()), default=0))
+
+
+def is_artifact_current(path: Path, directory: Path) -> bool:
+    """Whether a file derived from a model exists and is newer than all files in the model directory."""
+    if not path.exists():
+        return False
+    artifact_time = path.stat().st_mtime_ns
+    return all(entry.stat().st_mtime_ns <= artifact_time for entry in os.scandir(directory) if entry.is_file())
+
+
+def temporary_artifact_path(path: Path) -> Path:
+    """Create an empty temporary file next to path, to be renamed to path once it is fully written.
+
+    Writing to a temporary file first means other processes never see a partially written artifact.
+    """
+    path.parent.mkdir(exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    return Path(tmp_path)
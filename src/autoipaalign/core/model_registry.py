@@ -0,0 +1,219 @@
+"""Process-wide cache of loaded models shared by all ASRPipelines.
+
+Loading a model reads hundreds of megabytes of weights from disk, so ASRPipelines that use the
+same model on the same device with the same engine share one loaded copy from MODEL_REGISTRY.
+This makes creating an ASRPipeline for a model that was used recently, for example when a web
+app user switches back to a model, nearly free.
+
+The registry keeps models until the resident memory of the process goes over its budget, then
+unloads the least recently used ones. A model that is unloaded from the registry is only freed
+once no ASRPipeline refers to it anymore.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import gc
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING
+
+from autoipaalign.core.ctc_engine import CTCEngine
+from autoipaalign.core.onnx_engine import OnnxCTCEngine
+from autoipaalign.core.quantization import state_dict_size_bytes
+
+if TYPE_CHECKING:
+    import transformers
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> int | None:
+    """Resident memory of this process in bytes, or None if it can't be measured on this platform."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def default_max_rss_mb() -> float | None:
+    """Half of the physical memory in megabytes, or None if it can't be determined."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 / 1024 / 1024
+    except (ValueError, AttributeError, OSError):
+        return None
+
+
+@dataclass(frozen=True)
+class ModelKey:
+    """Settings that determine which model weights an ASRPipeline needs."""
+
+    model_name: str
+    """The name of the HuggingFace model or local model directory."""
+
+    device: int | str = -1
+    """Index of the device for model inference, -1 for CPU, or a torch device string."""
+
+    engine: str = "pipeline"
+    """Inference engine, as in ASRPipeline.engine."""
+
+    quantize: bool = False
+    """Whether linear layers are dynamic int8 quantized."""
+
+    def __post_init__(self):
+        if self.engine not in ("pipeline", "direct", "onnx"):
+            raise ValueError(f"Unknown engine {self.engine}, expected 'pipeline', 'direct' or 'onnx'")
+        if self.engine == "onnx" and self.quantize:
+            raise ValueError("Dynamic int8 quantization is only supported with the pipeline and direct engines")
+
+
+@dataclass
+class LoadedModel:
+    """A model loaded for an ASRPipeline."""
+
+    ctc: CTCEngine
+    """Engine for running the model directly."""
+
+    model_pipe: "transformers.Pipeline | None"
+    """Transformers speech recognition pipeline for the model, or None if the engine doesn't use one."""
+
+    size_bytes: int
+    """Memory the model took to load, measured by the growth of resident memory where possible."""
+
+
+def load_model(key: ModelKey) -> LoadedModel:
+    """Load a model without going through the registry.
+
+    Args:
+        key: Model, device and engine settings
+
+    Returns:
+        The loaded model
+    """
+    import transformers
+
+    logger.info("Loading model: %s", key.model_name)
+    rss_before = current_rss_bytes()
+    if key.engine == "onnx":
+        model_pipe = None
+        ctc = OnnxCTCEngine.from_pretrained(key.model_name, key.device)
+    elif key.engine == "direct":
+        model_pipe = None
+        ctc = CTCEngine.from_pretrained(key.model_name, key.device, quantize=key.quantize)
+    elif key.engine == "pipeline" and key.quantize:
+        ctc = CTCEngine.from_pretrained(key.model_name, key.device, quantize=True)
+        model_pipe = transformers.pipeline(
+            "automatic-speech-recognition",
+            model=ctc.model,
+            feature_extractor=ctc.feature_extractor,
+            tokenizer=ctc.tokenizer,
+        )
+    else:
+        model_pipe = transformers.pipeline("automatic-speech-recognition", model=key.model_name, device=key.device)
+        ctc = CTCEngine.from_pipeline(model_pipe)
+
+    rss_after = current_rss_bytes()
+    if rss_before is not None and rss_after is not None:
+        size_bytes = max(rss_after - rss_before, 0)
+    else:
+        size_bytes = state_dict_size_bytes(ctc.model) if ctc.model is not None else 0
+    return LoadedModel(ctc, model_pipe, size_bytes)
+
+
+class ModelRegistry:
+    """Least recently used cache of loaded models with a budget for the resident memory of the process.
+
+    After a model is loaded, least recently used models are unloaded until the resident memory,
+    minus the memory of the unloaded models, is within max_rss_mb. The model that was just loaded
+    is always kept, even if it alone goes over the budget. Where resident memory can't be measured,
+    the total size of the loaded models' weights is compared to the budget instead.
+
+    Args:
+        max_rss_mb: Resident memory budget in megabytes. None disables the budget.
+        max_models: Maximum number of models to keep loaded. None means no limit.
+    """
+
+    def __init__(self, max_rss_mb: float | None = None, max_models: int | None = None):
+        if max_models is not None and max_models < 1:
+            raise ValueError(f"max_models must be at least 1, got {max_models}")
+        self.max_rss_mb = max_rss_mb
+        self.max_models = max_models
+        self.hits = 0
+        self.misses = 0
+        self._models: OrderedDict[ModelKey, LoadedModel] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ModelKey) -> LoadedModel:
+        """Return the loaded model for key, loading it and unloading old models if needed.
+
+        Loading happens under a lock, so threads asking for the same model load it once.
+        """
+        with self._lock:
+            if key in self._models:
+                self.hits += 1
+                self._models.move_to_end(key)
+                return self._models[key]
+
+            self.misses += 1
+            self._models[key] = load_model(key)
+            self._evict(keep=key)
+            return self._models[key]
+
+    def discard(self, key: ModelKey):
+        """Unload the model for key if it is loaded."""
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return
+        logger.info("Unloading model %s", key.model_name)
+        gc.collect()
+
+    def clear(self):
+        """Unload all models."""
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def __contains__(self, key: ModelKey) -> bool:
+        return key in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __str__(self) -> str:
+        budget = f"{self.max_rss_mb:.0f} MB" if self.max_rss_mb is not None else "no"
+        return f"{len(self)} models loaded, {self.hits} hits, {self.misses} misses, {budget} memory budget"
+
+    def _used_bytes(self) -> int:
+        rss = current_rss_bytes()
+        if rss is not None:
+            return rss
+        return sum(loaded.size_bytes for loaded in self._models.values())
+
+    def _evict(self, keep: ModelKey):
+        """Unload least recently used models, other than keep, until within the budget."""
+        max_bytes = self.max_rss_mb * 1024 * 1024 if self.max_rss_mb is not None else None
+        used = self._used_bytes()
+        evicted = False
+        for key in list(self._models):
+            over_count = self.max_models is not None and len(self._models) > self.max_models
+            over_memory = max_bytes is not None and used > max_bytes
+            if not (over_count or over_memory):
+                break
+            if key == keep:
+                continue
+            loaded = self._models.pop(key)
+            used -= loaded.size_bytes
+            evicted = True
+            logger.info("Unloading least recently used model %s", key.model_name)
+        if evicted:
+            gc.collect()
+
+
+MODEL_REGISTRY = ModelRegistry(max_rss_mb=default_max_rss_mb())
+"""Registry shared by every ASRPipeline in the process."""
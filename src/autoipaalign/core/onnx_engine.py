@@ -0,0 +1,177 @@
+"""CPU inference with CTC models exported to ONNX and run with ONNX Runtime.
+
+Models are exported once from their PyTorch checkpoint to an ONNX graph that takes padded
+audio and an attention mask and returns the argmax token id and the number of valid frames
+for each input. Doing the argmax inside the graph means only token ids, rather than full
+logits, are copied out of ONNX Runtime. The graph is saved in an "onnx" folder inside the
+model directory, which for models from the HuggingFace Hub is the local snapshot of the model
+revision, so a new revision of a model is exported again.
+
+ONNX Runtime and the ONNX exporter dependencies are optional. Install them with the
+autoipaalign[onnx] extra.
+"""
+
+from collections.abc import Sequence
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from autoipaalign.core.ctc_engine import CTCEngine, token_strings
+from autoipaalign.core.model_files import is_artifact_current, model_dir, temporary_artifact_path
+
+logger = logging.getLogger(__name__)
+
+ONNX_DIR_NAME = "onnx"
+ONNX_FILE_NAME = "autoipaalign_ctc_argmax.onnx"
+ONNX_OPSET = 17
+
+
+def onnx_path(model_name: str) -> Path:
+    """Path where the ONNX export of a model is cached."""
+    return model_dir(model_name) / ONNX_DIR_NAME / ONNX_FILE_NAME
+
+
+def is_onnx_export_current(model_name: str) -> bool:
+    """Whether the model has an ONNX export that is newer than all of its other files."""
+    return is_artifact_current(onnx_path(model_name), model_dir(model_name))
+
+
+def _argmax_ctc(model):
+    """Wrap a CTC model in a module that outputs argmax token ids and the number of valid frames of each input."""
+    import torch
+
+    class ArgmaxCTC(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_values: torch.Tensor, attention_mask: torch.Tensor):
+            logits = self.model(input_values, attention_mask=attention_mask).logits
+            frame_lengths = self.model._get_feat_extract_output_lengths(attention_mask.sum(dim=-1))
+            return logits.argmax(dim=-1), frame_lengths
+
+    return ArgmaxCTC(model)
+
+
+def export_onnx(model_name: str, overwrite: bool = False) -> Path:
+    """Export a CTC model to ONNX, unless an up to date export already exists.
+
+    The PyTorch model is loaded from the model's local files, so a model that is already in
+    the HuggingFace cache is exported without network access.
+
+    Args:
+        model_name: HuggingFace model name or local path
+        overwrite: Export again even if an up to date export exists
+
+    Returns:
+        Path to the exported ONNX graph
+    """
+    path = onnx_path(model_name)
+    if not overwrite and is_onnx_export_current(model_name):
+        logger.debug("Using existing ONNX export %s", path)
+        return path
+
+    import torch
+    import transformers
+
+    logger.info("Exporting %s to ONNX at %s", model_name, path)
+    # Eager attention traces to standard ONNX operators
+    model = transformers.AutoModelForCTC.from_pretrained(model_dir(model_name), attn_implementation="eager")
+    wrapper = _argmax_ctc(model).eval()
+    example_inputs = (torch.zeros(2, 16000), torch.ones(2, 16000, dtype=torch.long))
+
+    tmp_path = temporary_artifact_path(path)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                wrapper,
+                example_inputs,
+                tmp_path,
+                input_names=["input_values", "attention_mask"],
+                output_names=["token_ids", "frame_lengths"],
+                dynamic_axes={
+                    "input_values": {0: "batch", 1: "samples"},
+                    "attention_mask": {0: "batch", 1: "samples"},
+                    "token_ids": {0: "batch", 1: "frames"},
+                    "frame_lengths": {0: "batch"},
+                },
+                opset_version=ONNX_OPSET,
+                dynamo=False,
+            )
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+class OnnxCTCEngine(CTCEngine):
+    """CTCEngine that runs the model's ONNX export with ONNX Runtime.
+
+    Args:
+        session: ONNX Runtime inference session for a graph exported with export_onnx
+        config: Configuration of the exported model
+        feature_extractor: Feature extractor for the model's audio inputs
+        tokenizer: CTC tokenizer for the model's vocabulary
+    """
+
+    backend = "onnxruntime"
+
+    def __init__(self, session, config, feature_extractor, tokenizer):
+        self.model = None
+        self.session = session
+        self.config = config
+        self.feature_extractor = feature_extractor
+        self.tokenizer = tokenizer
+        self._token_strings = token_strings(tokenizer, getattr(config, "vocab_size", 0))
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, device: int | str = -1) -> "OnnxCTCEngine":
+        """Load the ONNX export of a model, exporting it first if needed.
+
+        Args:
+            model_name: HuggingFace model name or local path
+            device: Device index, -1 for CPU, or a torch device string. ONNX Runtime uses CUDA
+                for a GPU device only if the installed onnxruntime package supports it.
+
+        Returns:
+            An OnnxCTCEngine for the model
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "The onnx engine requires onnxruntime. Install it with: pip install 'autoipaalign[onnx]'"
+            ) from e
+        import transformers
+
+        path = export_onnx(model_name)
+        providers = ["CPUExecutionProvider"]
+        if device not in (-1, "cpu") and "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        session = onnxruntime.InferenceSession(path, providers=providers)
+        config = transformers.AutoConfig.from_pretrained(model_name)
+        feature_extractor = transformers.AutoFeatureExtractor.from_pretrained(model_name)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        return cls(session, config, feature_extractor, tokenizer)
+
+    def forward_batch(self, arrays: Sequence[np.ndarray]) -> list[np.ndarray]:
+        """Run one padded batch through the ONNX graph and return the argmax token ids for each input.
+
+        Args:
+            arrays: Audio arrays at the model's sampling rate
+
+        Returns:
+            Token id of every frame, one array per input
+        """
+        processed = self._preprocess(arrays, return_tensors="np")
+        token_ids, frame_lengths = self.session.run(
+            None,
+            {
+                "input_values": processed["input_values"].astype(np.float32),
+                "attention_mask": processed["attention_mask"].astype(np.int64),
+            },
+        )
+        return [ids[:n] for ids, n in zip(token_ids, frame_lengths.tolist())]
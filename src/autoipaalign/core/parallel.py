@@ -0,0 +1,376 @@
+"""Transcription of many audio files in several worker processes.
+
+Each worker process loads its own copy of the model from the settings of an ASRPipeline and
+limits PyTorch to a share of the CPUs, so workers don't compete for the same cores. Files are
+sent to the workers in tasks of ASRPipeline.batch_size files from a shared queue, so faster
+workers take more tasks. Results are either put back in input order, or yielded as each task
+finishes so they can be written without holding the TextGrids of every file. Memory use grows with
+the number of workers, since every worker holds a full model. The workers are kept between calls
+until the transcriber is closed, so files that arrive in several groups only load the model once.
+
+A worker process that crashes, for example because it runs out of memory, breaks the whole pool.
+Workers report each task as they start it, so the tasks that were running when the pool broke are
+run again one at a time in a fresh process, and only the files that crash a worker on their own get
+an error transcription. Tasks that were still waiting go to one new pool of workers.
+"""
+
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, fields
+import itertools
+import logging
+import multiprocessing
+from multiprocessing.queues import SimpleQueue
+import os
+import time
+
+from autoipaalign.core.batching import PaddingStats, fixed_size_batches
+from autoipaalign.core.speech_recognition import ASRPipeline, DEFAULT_MAX_SEGMENT_LENGTH_S
+from autoipaalign.core.textgrid_io import TextGridContainer
+from autoipaalign.core.vad import VadStats
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on, which can be fewer than the machine has under a job scheduler."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pipeline_settings(asr: ASRPipeline) -> dict:
+    """Constructor arguments that create a new ASRPipeline with the same settings as asr."""
+    return {f.name: getattr(asr, f.name) for f in fields(asr) if f.init}
+
+
+@dataclass
+class WorkerStats:
+    """Files transcribed by one worker process and the time it spent on them."""
+
+    pid: int
+    """Process id of the worker."""
+
+    num_files: int = 0
+    """Number of audio files the worker transcribed."""
+
+    audio_seconds: float = 0.0
+    """Total duration of the audio files the worker transcribed."""
+
+    busy_seconds: float = 0.0
+    """Time the worker spent transcribing, not counting loading the model."""
+
+    padding_stats: PaddingStats = field(default_factory=PaddingStats)
+    """Real and padded audio samples for the batches the worker predicted."""
+
+    @property
+    def files_per_second(self) -> float:
+        """Transcribed files per second of work."""
+        return self.num_files / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    @property
+    def realtime_factor(self) -> float:
+        """Seconds of audio transcribed per second of work."""
+        return self.audio_seconds / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"worker {self.pid}: {self.num_files} files, {self.audio_seconds:.1f}s of audio in "
+            f"{self.busy_seconds:.1f}s ({self.files_per_second:.2f} files/s, {self.realtime_factor:.1f}x real time)"
+        )
+
+
+@dataclass
+class _TaskResult:
+    """Output of one task, sent back from a worker process."""
+
+    pid: int
+    text_grids: list[TextGridContainer]
+    seconds: float
+    padding_stats: PaddingStats
+    vad_stats: VadStats
+
+
+# State of a worker process, set by _init_worker
+_worker_asr: ASRPipeline | None = None
+_worker_error: Exception | None = None
+_worker_started: SimpleQueue | None = None
+
+
+def _init_worker(asr_settings: dict, num_threads: int, log_level: int, started: SimpleQueue):
+    """Load the worker's ASRPipeline. A failure is reported by each task instead of breaking the pool."""
+    import torch
+
+    global _worker_asr, _worker_error, _worker_started
+    logging.basicConfig(level=log_level, format="%(processName)s %(name)s : %(levelname)s : %(message)s")
+    torch.set_num_threads(num_threads)
+    _worker_started = started
+    try:
+        _worker_asr = ASRPipeline(**asr_settings)
+        # Loaded here rather than in the first task, so busy_seconds doesn't count it
+        _worker_asr.load()
+    except Exception as e:
+        _worker_error = e
+
+
+def _transcribe_task(
+    task_id: int,
+    audio_paths: list[str | os.PathLike[str]],
+    intervals: list[tuple[float, float] | None] | None,
+    textgrid_tier_name: str,
+    add_phones: bool,
+    phone_tier_name: str,
+    segment: bool,
+    max_segment_length_s: float,
+) -> _TaskResult:
+    """Transcribe one task's files in a worker process."""
+    # SimpleQueue writes straight to its pipe, so the task is reported even if the worker crashes right after
+    _worker_started.put(task_id)
+    if _worker_error is not None:
+        raise RuntimeError(f"Worker could not load the model: {_worker_error}")
+    start = time.perf_counter()
+    _worker_asr.padding_stats = PaddingStats()
+    _worker_asr.vad_stats = VadStats()
+    text_grids = TextGridContainer.from_audio_batch_with_predict_transcription(
+        audio_paths,
+        textgrid_tier_name,
+        _worker_asr,
+        add_phones=add_phones,
+        phone_tier_name=phone_tier_name,
+        batch_size=_worker_asr.batch_size,
+        max_batch_samples=_worker_asr.max_batch_samples,
+        segment=segment,
+        max_segment_length_s=max_segment_length_s,
+        intervals=intervals,
+    )
+    return _TaskResult(
+        os.getpid(), text_grids, time.perf_counter() - start, _worker_asr.padding_stats, _worker_asr.vad_stats
+    )
+
+
+class ProcessPoolTranscriber:
+    """Transcribes audio files into TextGrids with a copy of an ASRPipeline in each of several worker processes.
+
+    The worker processes are started on first use and kept for later calls. Use as a context manager, or
+    call close, to stop them.
+
+    Args:
+        asr: Pipeline whose settings the workers use. Its own model is not loaded.
+        jobs: Number of worker processes
+        threads_per_job: PyTorch intra-op threads per worker. Defaults to the available CPUs divided by jobs.
+
+    Attributes:
+        worker_stats: Throughput of each worker process that completed a task, by process id.
+    """
+
+    def __init__(self, asr: ASRPipeline, jobs: int, threads_per_job: int | None = None):
+        if jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {jobs}")
+        self.asr = asr
+        self.jobs = jobs
+        self.threads_per_job = threads_per_job or max(1, available_cpus() // jobs)
+        self.worker_stats: dict[int, WorkerStats] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self._started: SimpleQueue | None = None
+        self._task_ids = itertools.count()
+
+    def transcribe(
+        self,
+        audio_paths: Sequence[str | os.PathLike[str]],
+        textgrid_tier_name: str,
+        add_phones: bool = False,
+        phone_tier_name: str = "phone",
+        segment: bool = False,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> list[TextGridContainer]:
+        """Create TextGrids with transcription tiers for audio files, like
+        TextGridContainer.from_audio_batch_with_predict_transcription but spread over the worker processes.
+
+        Padding and voice activity detection statistics of all workers are added to the ASRPipeline's
+        padding_stats and vad_stats.
+
+        Args:
+            audio_paths: Paths to the audio files.
+            textgrid_tier_name: Name for the transcription tier.
+            add_phones: If True, also create a phone alignment tier. Defaults to False.
+            phone_tier_name: Name for the phone alignment tier. Defaults to "phone".
+            segment: If True, split each file into utterances at pauses with one transcription interval each.
+                Defaults to False.
+            max_segment_length_s: Longest utterance in seconds when segment is True.
+            intervals: Optional (start, end) times in seconds of the only part of each audio file to transcribe,
+                or None to transcribe the whole file.
+
+        Returns:
+            A TextGridContainer for each audio file, in the same order as audio_paths.
+        """
+        text_grids: list[TextGridContainer | None] = [None] * len(audio_paths)
+        for i, tg in self.iter_transcribe(
+            audio_paths, textgrid_tier_name, add_phones, phone_tier_name, segment, max_segment_length_s, intervals
+        ):
+            text_grids[i] = tg
+        return text_grids
+
+    def iter_transcribe(
+        self,
+        audio_paths: Sequence[str | os.PathLike[str]],
+        textgrid_tier_name: str,
+        add_phones: bool = False,
+        phone_tier_name: str = "phone",
+        segment: bool = False,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> Iterator[tuple[int, TextGridContainer]]:
+        """Create TextGrids for audio files like transcribe, yielding each file's TextGrid as soon as the task
+        with the file is finished, so they can be written while the workers transcribe later files.
+
+        Args:
+            Same as transcribe.
+
+        Yields:
+            Tuples of (index of the audio file in audio_paths, its TextGridContainer), in the order tasks finish.
+        """
+        if not audio_paths:
+            return
+        if intervals is None:
+            intervals = [None] * len(audio_paths)
+        options = (textgrid_tier_name, add_phones, phone_tier_name, segment, max_segment_length_s)
+        tasks = fixed_size_batches(len(audio_paths), self.asr.batch_size)
+
+        crashed = []
+        if self._pool is None:
+            logger.info("Starting %s worker processes with %s threads each", self.jobs, self.threads_per_job)
+            self._pool, self._started = self._new_pool(self.jobs)
+        yield from self._run_tasks(self._pool, self._started, audio_paths, intervals, tasks, options, crashed)
+        while crashed:
+            # The pool is broken, so its workers are replaced
+            self.close()
+            # Only tasks that had started can have crashed a worker. If none had, for example because workers
+            # crash while loading the model, every task is run on its own so that the loop ends.
+            running = [task for task, is_started in crashed if is_started] or [task for task, _ in crashed]
+            waiting = [task for task, is_started in crashed if task not in running]
+            logger.warning(
+                "A worker process crashed, running %s tasks that were in progress again one at a time", len(running)
+            )
+            crashed = []
+            if waiting:
+                logger.info("Running %s tasks that were waiting in %s new worker processes", len(waiting), self.jobs)
+                self._pool, self._started = self._new_pool(self.jobs)
+                yield from self._run_tasks(self._pool, self._started, audio_paths, intervals, waiting, options, crashed)
+            for task in running:
+                # Alone in a fresh process, a crash can only come from this task's files
+                crashed_again = []
+                pool, started = self._new_pool(1)
+                with pool:
+                    yield from self._run_tasks(pool, started, audio_paths, intervals, [task], options, crashed_again)
+                started.close()
+                if crashed_again:
+                    yield from self._error_text_grids(
+                        audio_paths, intervals, task, "Worker process crashed while transcribing this file", options
+                    )
+
+    def close(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._started.close()
+            self._pool = None
+            self._started = None
+
+    def __enter__(self) -> "ProcessPoolTranscriber":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_pool(self, max_workers: int) -> tuple[ProcessPoolExecutor, SimpleQueue]:
+        """Start a process pool, with the queue its workers report the ids of the tasks they start on."""
+        context = multiprocessing.get_context("spawn")
+        started = context.SimpleQueue()
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                pipeline_settings(self.asr),
+                self.threads_per_job,
+                logging.getLogger().getEffectiveLevel(),
+                started,
+            ),
+        )
+        return pool, started
+
+    def _run_tasks(
+        self,
+        pool: ProcessPoolExecutor,
+        started: SimpleQueue,
+        audio_paths: Sequence[str | os.PathLike[str]],
+        intervals: Sequence[tuple[float, float] | None],
+        tasks: list[list[int]],
+        options: tuple[str, bool, str, bool, float],
+        crashed: list[tuple[list[int], bool]],
+    ) -> Iterator[tuple[int, TextGridContainer]]:
+        """Run tasks in a process pool, yielding the index and TextGrid of each file of each finished task.
+
+        Tasks that did not finish because a worker process crashed are added to crashed, with whether a
+        worker had started them.
+        """
+        futures = {}
+        for task in tasks:
+            task_id = next(self._task_ids)
+            future = pool.submit(
+                _transcribe_task, task_id, [audio_paths[i] for i in task], [intervals[i] for i in task], *options
+            )
+            futures[future] = (task_id, task)
+        started_ids = set()
+        for future in as_completed(futures):
+            # Results are dropped once yielded, so memory doesn't grow with the number of finished tasks
+            task_id, task = futures.pop(future)
+            # Reading the queue as tasks finish keeps its pipe from filling up and blocking the workers
+            while not started.empty():
+                started_ids.add(started.get())
+            is_started = task_id in started_ids
+            started_ids.discard(task_id)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                crashed.append((task, is_started))
+                continue
+            except Exception as e:
+                logger.warning("Error in worker process: %s", e)
+                yield from self._error_text_grids(audio_paths, intervals, task, str(e), options)
+                continue
+
+            self._record(result)
+            yield from zip(task, result.text_grids)
+
+    def _record(self, result: _TaskResult):
+        """Add a finished task to the throughput of its worker and the pipeline's padding statistics."""
+        stats = self.worker_stats.setdefault(result.pid, WorkerStats(result.pid))
+        stats.num_files += len(result.text_grids)
+        stats.audio_seconds += sum(max((tier.end_time for tier in tg.text_grid), default=0) for tg in result.text_grids)
+        stats.busy_seconds += result.seconds
+        for padding_stats in (stats.padding_stats, self.asr.padding_stats):
+            padding_stats.merge(result.padding_stats)
+        self.asr.vad_stats.merge(result.vad_stats)
+
+    @staticmethod
+    def _error_text_grids(
+        audio_paths: Sequence[str | os.PathLike[str]],
+        intervals: Sequence[tuple[float, float] | None],
+        task: list[int],
+        message: str,
+        options: tuple[str, bool, str, bool, float],
+    ) -> Iterator[tuple[int, TextGridContainer]]:
+        """Give each file of a failed task a TextGrid with an error transcription."""
+        textgrid_tier_name, add_phones, phone_tier_name, _, _ = options
+        for i in task:
+            logger.warning("Error during transcription of %s: %s", audio_paths[i], message)
+            # The file may be the one that couldn't be read, so the TextGrid is built without needing it
+            yield (
+                i,
+                TextGridContainer._from_error(
+                    audio_paths[i], textgrid_tier_name, message, add_phones, phone_tier_name, intervals[i]
+                ),
+            )
@@ -0,0 +1,180 @@
+"""Dynamic int8 quantization of CTC models for faster CPU inference.
+
+Dynamic quantization stores the weights of the model's linear layers as 8-bit integers and
+quantizes their inputs on the fly, which makes the transformer layers that dominate the
+compute of wav2vec2 models several times cheaper on CPU at a small cost in accuracy. The
+convolutional feature encoder stays in full precision.
+
+Quantizing a large model takes several seconds, so the quantized weights are saved in a
+"quantized" folder inside the model directory (see autoipaalign.core.model_files) and loaded
+from there by later runs. The saved format depends on the version of PyTorch, which is part
+of the file name.
+"""
+
+from collections import OrderedDict
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from autoipaalign.core.model_files import is_artifact_current, model_dir, temporary_artifact_path
+
+if TYPE_CHECKING:
+    import torch
+    import transformers
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_DIR_NAME = "quantized"
+
+
+def quantized_weights_path(model_name: str) -> Path:
+    """Path where the dynamic int8 quantized weights of a model are cached."""
+    import torch
+
+    return model_dir(model_name) / QUANTIZED_DIR_NAME / f"int8_dynamic_torch-{torch.__version__}.pt"
+
+
+def quantize_dynamic_int8(model: "torch.nn.Module") -> "torch.nn.Module":
+    """Quantize the linear layers of a model to int8 with dynamic quantization.
+
+    Args:
+        model: Model in full precision on CPU. Its linear layers are replaced in place.
+
+    Returns:
+        The quantized model in evaluation mode
+    """
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_quantized_model(model_name: str, overwrite: bool = False) -> "torch.nn.Module":
+    """Load a CTC model with dynamic int8 quantized linear layers, quantizing and caching it first if needed.
+
+    Args:
+        model_name: HuggingFace model name or local path
+        overwrite: Quantize again even if up to date quantized weights exist
+
+    Returns:
+        The quantized model on CPU in evaluation mode
+    """
+    import torch
+    import transformers
+
+    path = quantized_weights_path(model_name)
+    config = transformers.AutoConfig.from_pretrained(model_name)
+    if not overwrite and is_artifact_current(path, model_dir(model_name)):
+        logger.debug("Loading quantized weights %s", path)
+        model = _quantized_skeleton(config)
+        if model is not None:
+            model.load_state_dict(_from_saved_state_dict(torch.load(path, mmap=True, weights_only=True)))
+            return model.eval()
+
+    logger.info("Quantizing %s to int8, saving weights to %s", model_name, path)
+    model = quantize_dynamic_int8(transformers.AutoModelForCTC.from_pretrained(model_name))
+    tmp_path = temporary_artifact_path(path)
+    try:
+        torch.save(_to_saved_state_dict(model.state_dict()), tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return model
+
+
+def _to_saved_state_dict(state_dict: OrderedDict) -> OrderedDict:
+    """Replace the quantized weights in a state dict with their integer values, scale and zero point.
+
+    Quantized tensors themselves don't pickle reliably, and plain tensors can be loaded with weights_only.
+    """
+    import torch
+
+    saved = OrderedDict()
+    # Module versions, which tell quantized layers how to load their weights
+    saved._metadata = state_dict._metadata
+    for name, value in state_dict.items():
+        if isinstance(value, tuple):
+            # Packed (weight, bias) of a quantized linear layer
+            weight, bias = value
+            if weight.qscheme() != torch.per_tensor_affine:
+                raise ValueError(f"Unsupported quantization scheme {weight.qscheme()} for {name}")
+            saved[f"{name}:int_repr"] = weight.int_repr()
+            saved[f"{name}:scale"] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+            saved[f"{name}:zero_point"] = torch.tensor(weight.q_zero_point())
+            if bias is not None:
+                saved[f"{name}:bias"] = bias.detach()
+        else:
+            saved[name] = value
+    return saved
+
+
+def _from_saved_state_dict(saved: OrderedDict) -> OrderedDict:
+    """Rebuild a state dict with quantized weights from _to_saved_state_dict output."""
+    import torch
+
+    state_dict = OrderedDict()
+    state_dict._metadata = saved._metadata
+    packed = {}
+    for name, value in saved.items():
+        if ":" in name:
+            name, part = name.split(":")
+            packed.setdefault(name, {})[part] = value
+        else:
+            state_dict[name] = value
+    for name, parts in packed.items():
+        weight = torch._make_per_tensor_quantized_tensor(
+            parts["int_repr"], parts["scale"].item(), parts["zero_point"].item()
+        )
+        state_dict[name] = (weight, parts.get("bias"))
+    return state_dict
+
+
+def _quantized_skeleton(config: "transformers.PretrainedConfig") -> "torch.nn.Module | None":
+    """Build an uninitialized model with quantized linear layers to load saved quantized weights into.
+
+    The model is created without allocating or initializing its full precision weights, which is
+    much faster than loading and quantizing the original model.
+
+    Returns:
+        The model, or None if it has state outside its state dict that loading would not restore
+    """
+    import torch
+    import transformers
+
+    with torch.device("meta"):
+        model = transformers.AutoModelForCTC.from_config(config)
+    saved_names = model.state_dict().keys()
+    if any(name not in saved_names for name, _ in model.named_buffers()):
+        return None
+    _replace_linear_layers(model)
+    return model.to_empty(device="cpu")
+
+
+def _replace_linear_layers(module: "torch.nn.Module"):
+    """Replace every linear layer of a module with an empty dynamic int8 quantized linear layer."""
+    import torch
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    for name, child in module.named_children():
+        if type(child) is torch.nn.Linear:
+            quantized = DynamicQuantizedLinear(
+                child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8
+            )
+            setattr(module, name, quantized)
+        else:
+            _replace_linear_layers(child)
+
+
+def state_dict_size_bytes(model: "torch.nn.Module") -> int:
+    """Number of bytes taken by a model's weights and buffers, including quantized weights."""
+    import torch
+
+    def size(value) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.nbytes
+        if isinstance(value, tuple | list):
+            return sum(size(v) for v in value)
+        return 0
+
+    return sum(size(value) for value in model.state_dict().values())
@@ -0,0 +1,104 @@
+"""Deterministic split of a corpus into shards that separate machines transcribe independently.
+
+Every machine lists the same inputs and computes the same assignment, so shards are disjoint and
+cover the corpus without any coordination between machines. Inputs are assigned longest first to the
+shard with the least audio so far, which keeps the total duration of every shard close to the same.
+Durations are read from the audio file headers, or taken from the interval of inputs with one, and the
+assignment only depends on the inputs' paths and durations, not on the order they were listed in.
+
+Each shard writes its own output target, named after the final target with the shard number, and the
+shard targets are combined afterwards with merge_textgrid_targets.
+"""
+
+from collections.abc import Iterable, Sequence
+import heapq
+import logging
+import os
+from pathlib import Path
+
+from autoipaalign.core.audio import audio_duration
+from autoipaalign.core.inputs import InputAudio
+
+logger = logging.getLogger(__name__)
+
+
+def check_shard(shard_index: int, num_shards: int):
+    """Raise a ValueError unless shard_index is one of num_shards shards."""
+    if num_shards < 1:
+        raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be from 0 to {num_shards - 1}, got {shard_index}")
+
+
+def assign_shards(durations: Sequence[float], keys: Sequence[str], num_shards: int) -> list[int]:
+    """Assign items to shards so that each shard's total duration is about the same.
+
+    Args:
+        durations: Duration of each item in seconds
+        keys: Unique key of each item, which orders items of the same duration
+        num_shards: Number of shards
+
+    Returns:
+        The shard index of each item, in the same order as durations
+    """
+    shards = [0] * len(durations)
+    # (total duration, shard index) of each shard, so ties go to the lowest shard index
+    totals = [(0.0, shard_index) for shard_index in range(num_shards)]
+    for i in sorted(range(len(durations)), key=lambda i: (-durations[i], keys[i])):
+        total, shard_index = heapq.heappop(totals)
+        shards[i] = shard_index
+        heapq.heappush(totals, (total + durations[i], shard_index))
+    return shards
+
+
+def select_shard(inputs: Iterable[InputAudio], shard_index: int, num_shards: int) -> list[InputAudio]:
+    """Inputs of one shard of a corpus.
+
+    All inputs are listed and their durations read before the shard is known, so unlike the whole
+    corpus, a shard is not transcribed while its inputs are still being found.
+
+    Args:
+        inputs: Inputs of the whole corpus
+        shard_index: Index of the shard, from 0 to num_shards - 1
+        num_shards: Number of shards
+
+    Returns:
+        The shard's inputs, in the order they were listed
+    """
+    check_shard(shard_index, num_shards)
+    inputs = list(inputs)
+    durations = [_duration(item) for item in inputs]
+    keys = [f"{Path(item.audio_path).resolve()}\t{item.textgrid_name}" for item in inputs]
+    shards = assign_shards(durations, keys, num_shards)
+    selected = [item for item, shard in zip(inputs, shards) if shard == shard_index]
+    logger.info(
+        "Shard %s of %s has %s of %s inputs, %.1f of %.1f seconds of audio",
+        shard_index,
+        num_shards,
+        len(selected),
+        len(inputs),
+        sum(duration for duration, shard in zip(durations, shards) if shard == shard_index),
+        sum(durations),
+    )
+    return selected
+
+
+def shard_target_path(target_path: str | os.PathLike[str], shard_index: int, num_shards: int, is_zip: bool) -> Path:
+    """Output target of one shard, such as output.shard-3-of-16 for the directory output or
+    output.shard-3-of-16.zip for the zip file output.zip."""
+    target_path = Path(target_path)
+    shard = f"shard-{shard_index}-of-{num_shards}"
+    if is_zip:
+        return target_path.with_name(f"{target_path.stem}.{shard}{target_path.suffix}")
+    return target_path.with_name(f"{target_path.name}.{shard}")
+
+
+def _duration(item: InputAudio) -> float:
+    """Seconds of audio to transcribe for an input, or 0 if its file can't be read."""
+    if item.interval is not None:
+        return item.interval[1] - item.interval[0]
+    try:
+        return audio_duration(item.audio_path)
+    except Exception as e:
+        logger.warning("Could not read the duration of %s: %s", item.audio_path, e)
+        return 0.0
@@ -1,7 +1,7 @@
 """Automatic Speech Recognition model support for predicting transcriptions from audio files.
 
-Note that we are using the librosa library for processing individual audio files,
-rather than the HuggingFace datasets[audio] for now, to decrease installation
+Note that we are using soundfile and librosa for processing individual audio files
+(see autoipaalign.core.audio), rather than the HuggingFace datasets[audio] for now, to decrease installation
 complexity. Per https://huggingface.co/docs/datasets/audio_load, the Datasets
 audio processing relies on ffmpeg, which is an external library that may be
 more difficult to install. However, doing so limits our batch data processing
@@ -10,18 +10,81 @@ options.
 # TODO: Add batch audio processing via an optional datasets[audio]
 """
 
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 import logging
 import os
-
-import librosa
-import transformers
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+import numpy as np
+
+from autoipaalign.core.audio import (
+    AudioFile,
+    DecodedAudio,
+    ResampleType,
+    audio_duration,
+    decode_audio,
+    load_audio,
+    open_for_intervals,
+)
+from autoipaalign.core.audio_cache import AudioCache
+from autoipaalign.core.batching import PaddingStats, bucket_by_length, fixed_size_batches, restore_order
+from autoipaalign.core.ctc_engine import CollapsedCTC, CTCEngine
+from autoipaalign.core.logit_cache import LogitCache
+from autoipaalign.core.model_files import model_revision
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel, ModelKey
+from autoipaalign.core.onnx_engine import OnnxCTCEngine
+from autoipaalign.core.vad import VadStats, speech_regions
+from autoipaalign.core.windowing import compute_windows, num_frames, window_lengths_in_samples
+
+if TYPE_CHECKING:
+    import transformers
 
 logger = logging.getLogger(__name__)
 
 
 DEFAULT_MODEL = "ginic/full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa"
 
+# Selection of models
+VALID_MODELS = [
+    "ctaguchi/wav2vec2-large-xlsr-japlmthufielta-ipa1000-ns",
+    "excalibur12/wav2vec2-large-lv60_phoneme-timit_english_timit-4k",
+    "excalibur12/wav2vec2-large-lv60_phoneme-timit_english_timit-4k_simplified",
+    "ginic/full_dataset_train_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/full_dataset_train_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/full_dataset_train_4_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/full_dataset_train_5_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/data_seed_bs64_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/data_seed_bs64_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/data_seed_bs64_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/data_seed_bs64_4_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_30_female_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_30_female_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_30_female_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_30_female_4_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_30_female_5_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_70_female_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_70_female_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_70_female_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_70_female_4_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/gender_split_70_female_5_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_old_only_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_old_only_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_old_only_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_young_only_1_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_young_only_2_wav2vec2-large-xlsr-53-buckeye-ipa",
+    "ginic/vary_individuals_young_only_3_wav2vec2-large-xlsr-53-buckeye-ipa",
+]
+
+DEFAULT_STREAM_CHUNK_LENGTH_S = 30.0
+"""Window length in seconds for streaming transcription when the pipeline has no chunk_length_s."""
+
+DEFAULT_MAX_SEGMENT_LENGTH_S = 20.0
+"""Longest segment in seconds when splitting audio into utterances at pauses."""
+
 
 @dataclass
 class TranscriptionChunk:
@@ -45,34 +108,36 @@ class TranscriptionWithTimestamps:
     """List of individual characters/phones with their timestamps."""
 
 
-def load_audio(
-    audio_path: str | os.PathLike[str],
-    sampling_rate: int,
-    interval: tuple[float, float] | None = None,
-):
-    """Load audio file with optional interval extraction.
+@dataclass
+class TranscriptionSegment:
+    """Transcription of one utterance-sized segment of speech between pauses."""
+
+    text: str
+    """The text transcribed within the segment."""
 
-    Args:
-        audio_path: Path to the audio file
-        sampling_rate: Sampling rate for audio preprocessing
-        interval: Optional tuple of (start, end) times in seconds
+    timestamp: tuple[float, float]
+    """Start and end time of the segment in seconds from the start of the audio."""
 
-    Returns:
-        Audio array loaded at the specified sampling rate
-    """
-    if interval:
-        logger.debug("Loading interval %s from audio %s", interval, audio_path)
-        start, end = interval
-        y, sr = librosa.load(audio_path, sr=sampling_rate, offset=start, duration=end - start)
-    else:
-        logger.debug("Loading audio %s", audio_path)
-        y, sr = librosa.load(audio_path, sr=sampling_rate)
-    return y
+    chunks: list[TranscriptionChunk]
+    """List of individual characters/phones in the segment, with timestamps from the start of the audio."""
+
+
+AudioSource = str | os.PathLike[str] | DecodedAudio | AudioFile
+"""Audio accepted by single prediction, either a path to an audio file, audio already decoded from a file or an
+open audio file."""
+
+AudioInput = str | os.PathLike[str] | DecodedAudio | AudioFile | np.ndarray
+"""Audio accepted by batch prediction, either a path to an audio file, decoded audio, an open audio file or an
+already loaded audio array."""
 
 
 @dataclass
 class ASRPipeline:
-    """Handles loading and configuration of the Transformer pipeline"""
+    """Handles loading and configuration of the Transformer pipeline
+
+    The model is loaded on first use, or by calling load, from autoipaalign.core.model_registry.MODEL_REGISTRY.
+    Pipelines with the same model_name, device, engine and quantize settings share one loaded copy of the model.
+    """
 
     model_name: str = field(default=DEFAULT_MODEL)
     """The name of the HuggingFace model used to transcribe speech."""
@@ -83,48 +148,229 @@ class ASRPipeline:
     sampling_rate: int = field(default=16000, kw_only=True)
     """Sampling rate for audio preprocessing. Defaults to 16K."""
 
-    _model_pipe: transformers.Pipeline = field(init=False)
+    resample_type: ResampleType = field(default="soxr_hq", kw_only=True)
+    """Resampler for audio files that are not already at sampling_rate. "soxr_lq" and "polyphase" are faster
+    than the default "soxr_hq" at a small cost in quality. Files at sampling_rate are never resampled."""
+
+    batch_size: int = field(default=1, kw_only=True)
+    """Number of audio inputs to run through the model together in one forward pass. Defaults to 1."""
+
+    max_batch_samples: int | None = field(default=None, kw_only=True)
+    """Maximum number of audio samples in one batch after padding. When set, audio inputs are sorted by length
+    and grouped under this budget instead of into fixed groups of batch_size. Defaults to None."""
+
+    chunk_length_s: float | None = field(default=None, kw_only=True)
+    """Length in seconds of the windows used to transcribe long audio. When set, audio longer than this is
+    transcribed in overlapping windows, so memory use depends on the window length instead of the audio length.
+    Defaults to None, which transcribes audio in a single pass."""
+
+    stride_length_s: float | None = field(default=None, kw_only=True)
+    """Overlap in seconds on each side of a long audio window. Model outputs in the overlap are taken from the
+    neighbouring window instead. Defaults to chunk_length_s / 6."""
+
+    engine: Literal["pipeline", "direct", "onnx"] = field(default="pipeline", kw_only=True)
+    """How single audio inputs are run through the model. "pipeline" uses the transformers speech recognition
+    pipeline. "direct" calls the feature extractor and CTC model directly and decodes with vectorized NumPy,
+    giving the same results with less overhead per call. Batched, long-form and streaming prediction always
+    run the model directly. "onnx" runs all predictions with ONNX Runtime on a copy of the model exported to
+    ONNX the first time it is used, which is faster on CPU and requires the autoipaalign[onnx] extra.
+    Defaults to "pipeline"."""
+
+    quantize: bool = field(default=False, kw_only=True)
+    """Use dynamic int8 quantization of the model's linear layers for faster CPU inference, at a small cost in
+    accuracy. Quantized weights are saved next to the model files the first time, so later runs load them
+    directly. Only supported on CPU with the pipeline and direct engines. Defaults to False."""
+
+    vad: bool = field(default=False, kw_only=True)
+    """Detect speech with energy-based voice activity detection and only run the model on speech regions.
+    Frames outside them decode as silence, and timestamps stay relative to the start of the audio. Regions
+    longer than chunk_length_s are split. Not used by stream. Defaults to False."""
+
+    vad_threshold_db: float = field(default=12.0, kw_only=True)
+    """Decibels above the recording's noise floor for audio to count as speech, with vad or predict_segments."""
+
+    vad_min_silence_s: float = field(default=0.5, kw_only=True)
+    """Pauses shorter than this many seconds are kept as part of the surrounding speech, with vad or
+    predict_segments."""
+
+    cache_dir: Path | None = field(default=None, kw_only=True)
+    """Directory for an on-disk cache of model outputs. Audio already transcribed with the same model and
+    window settings is decoded from the cache instead of running the model again, for example when only output
+    options change between runs. Defaults to None, which disables the cache."""
+
+    cache_max_mb: float = field(default=2048, kw_only=True)
+    """Size limit of the cache directory in megabytes. The least recently used entries are deleted beyond it."""
+
+    audio_cache_dir: Path | None = field(default=None, kw_only=True)
+    """Directory for an on-disk cache of decoded audio. Files are decoded and resampled once, stored whole, and
+    later read memory-mapped from the cache, for example when comparing models on the same recordings. Entries
+    are keyed by path, modification time, size, sampling rate and resampler. Defaults to None, which disables
+    the cache."""
+
+    audio_cache_max_mb: float | None = field(default=8192, kw_only=True)
+    """Size limit of the decoded audio cache directory in megabytes. The least recently used entries are deleted
+    beyond it. None means no limit."""
+
+    padding_stats: PaddingStats = field(default_factory=PaddingStats, init=False, repr=False)
+    """Real and padded audio samples for all batches predicted by this pipeline."""
+
+    vad_stats: VadStats = field(default_factory=VadStats, init=False, repr=False)
+    """Audio seen and skipped as silence by voice activity detection in this pipeline."""
+
+    logit_cache: LogitCache | None = field(default=None, init=False, repr=False)
+    """Cache of model outputs in cache_dir, or None if caching is disabled."""
+
+    audio_cache: AudioCache | None = field(default=None, init=False, repr=False)
+    """Cache of decoded audio in audio_cache_dir, or None if caching is disabled."""
+
+    _loaded_model: LoadedModel | None = field(default=None, init=False, repr=False)
+    _decoder_engine: CTCEngine | None = field(default=None, init=False, repr=False)
+    _revision: str | None = field(default=None, init=False, repr=False)
 
     def __post_init__(self):
-        logger.info("Loading model: %s", self.model_name)
-        self._model_pipe = transformers.pipeline(
-            "automatic-speech-recognition", model=self.model_name, device=self.device
-        )
+        # Check the model settings now, but only load the model when it's first needed
+        self._model_key()
+        if self.cache_dir is not None:
+            self.logit_cache = LogitCache(self.cache_dir, max_bytes=int(self.cache_max_mb * 1024 * 1024))
+        if self.audio_cache_dir is not None:
+            max_bytes = int(self.audio_cache_max_mb * 1024 * 1024) if self.audio_cache_max_mb is not None else None
+            self.audio_cache = AudioCache(self.audio_cache_dir, max_bytes=max_bytes)
+
+    def load(self) -> LoadedModel:
+        """Load the model now instead of on first use.
+
+        Returns:
+            The loaded model, shared with other pipelines that use the same model settings
+        """
+        if self._loaded_model is None:
+            self._loaded_model = MODEL_REGISTRY.get(self._model_key())
+        return self._loaded_model
+
+    @property
+    def _model_pipe(self) -> "transformers.Pipeline | None":
+        return self.load().model_pipe
+
+    @property
+    def _ctc(self) -> CTCEngine:
+        return self.load().ctc
+
+    @property
+    def _decoder(self) -> CTCEngine:
+        """Engine for decoding token ids. With a logit cache, the model's weights are only loaded once a cache
+        miss needs them, and token ids from the cache are decoded with just the tokenizer until then."""
+        if self._loaded_model is not None or self.logit_cache is None:
+            return self._ctc
+        if self._decoder_engine is None:
+            self._decoder_engine = CTCEngine.decoder_from_pretrained(self.model_name)
+        return self._decoder_engine
+
+    def _model_key(self) -> ModelKey:
+        return ModelKey(self.model_name, self.device, self.engine, self.quantize)
+
+    def decode(self, audio_path: str | os.PathLike[str]) -> DecodedAudio:
+        """Decode an audio file at the pipeline's sampling rate.
+
+        The prediction methods accept the result in place of the path, so a file that is used more than
+        once, for example to transcribe it and then size its TextGrid, is only decoded once. With
+        audio_cache_dir, the file is read from the decoded audio cache if it was decoded before.
+
+        Args:
+            audio_path: Path to the audio file
+
+        Returns:
+            The decoded audio with information about the file
+        """
+        if self.audio_cache is not None:
+            return self.audio_cache.decode(audio_path, self.sampling_rate, self.resample_type)
+        return decode_audio(audio_path, self.sampling_rate, resample_type=self.resample_type)
+
+    @contextmanager
+    def open_for_intervals(
+        self, audio_path: str | os.PathLike[str], intervals: Sequence[tuple[float, float]]
+    ) -> Iterator[AudioFile | DecodedAudio]:
+        """Open an audio file once to predict many intervals of it.
+
+        The file is either decoded whole or kept open to read each interval by seeking, whichever
+        autoipaalign.core.audio.open_for_intervals expects to be faster for the intervals. With
+        audio_cache_dir, the whole file is always decoded through the decoded audio cache instead.
+
+        Args:
+            audio_path: Path to the audio file
+            intervals: (start, end) times in seconds of the intervals that will be predicted
+
+        Yields:
+            Audio to pass to the prediction methods in place of the path
+        """
+        if self.audio_cache is not None:
+            yield self.decode(audio_path)
+            return
+        with open_for_intervals(audio_path, intervals, self.sampling_rate, self.resample_type) as audio:
+            yield audio
+
+    def _load(self, audio: AudioSource, interval: tuple[float, float] | None) -> np.ndarray:
+        """Samples of an audio file, decoded audio or open file at the pipeline's sampling rate, optionally of an
+        interval."""
+        if isinstance(audio, DecodedAudio | AudioFile):
+            if audio.sampling_rate != self.sampling_rate:
+                raise ValueError(
+                    f"Audio was opened at {audio.sampling_rate} Hz but the pipeline expects {self.sampling_rate} Hz"
+                )
+            if isinstance(audio, AudioFile):
+                return audio.read(interval)
+            return audio.interval_samples(interval)
+        if self.audio_cache is not None:
+            return self.decode(audio).interval_samples(interval)
+        return load_audio(audio, self.sampling_rate, interval, self.resample_type)
+
+    @staticmethod
+    def _label(audio: AudioInput, default: str = "decoded audio") -> object:
+        """Name of an audio input for logging."""
+        if isinstance(audio, DecodedAudio | AudioFile):
+            return audio.path if audio.path is not None else default
+        if isinstance(audio, np.ndarray):
+            return default
+        return audio
 
     def predict(
         self,
-        audio_path: str | os.PathLike[str],
+        audio_path: AudioSource,
         interval: tuple[float, float] | None = None,
     ) -> str:
         """Predict transcription for an audio file.
 
         Args:
-            audio_path: Path to the audio file
+            audio_path: Path to the audio file, or audio from decode or open_for_intervals
             interval: Optional tuple of (start, end) times in seconds
 
         Returns:
             Transcription text
         """
-        y = load_audio(audio_path, self.sampling_rate, interval)
+        if self._uses_token_ids(audio_path, interval):
+            return self._decode_token_ids(self._predict_token_ids(audio_path, interval))
+
+        y = self._load(audio_path, interval)
         logger.debug("Predicting transcription for %s with model %s", audio_path, self.model_name)
         transcription = self._model_pipe(y)["text"]
         return transcription
 
     def predict_with_timestamps(
         self,
-        audio_path: str | os.PathLike[str],
+        audio_path: AudioSource,
         interval: tuple[float, float] | None = None,
     ) -> TranscriptionWithTimestamps:
         """Predict transcription with character-level timestamps for an audio file.
 
         Args:
-            audio_path: Path to the audio file
+            audio_path: Path to the audio file, or audio from decode or open_for_intervals
             interval: Optional tuple of (start, end) times in seconds
 
         Returns:
             TranscriptionWithTimestamps containing full text and character-level chunks
         """
-        y = load_audio(audio_path, self.sampling_rate, interval)
+        if self._uses_token_ids(audio_path, interval):
+            return self._decode_token_ids_with_timestamps(self._predict_token_ids(audio_path, interval))
+
+        y = self._load(audio_path, interval)
         logger.debug(
             "Predicting transcription with timestamps for %s with model %s",
             audio_path,
@@ -141,3 +387,494 @@ class ASRPipeline:
             chunks.append(chunk)
 
         return TranscriptionWithTimestamps(text=result["text"], chunks=chunks)
+
+    def stream(self, audio_path: str | os.PathLike[str]) -> Iterator[TranscriptionChunk]:
+        """Transcribe an audio file window by window, yielding character-level chunks as they are predicted.
+
+        Audio is read and run through the model in overlapping windows of chunk_length_s seconds
+        (DEFAULT_STREAM_CHUNK_LENGTH_S if chunk_length_s is not set), so only a few windows of audio are
+        in memory at once. Chunks are yielded as soon as they can no longer be extended by the next window,
+        with timestamps in seconds from the start of the file. Together they are the same chunks that
+        predict_with_timestamps returns for long-form transcription with the same window settings.
+
+        Args:
+            audio_path: Path to the audio file
+
+        Yields:
+            TranscriptionChunk for each character or phone, in time order
+        """
+        chunk_length_s = self.chunk_length_s if self.chunk_length_s is not None else DEFAULT_STREAM_CHUNK_LENGTH_S
+        logger.debug("Streaming transcription for %s with model %s", audio_path, self.model_name)
+
+        # Token ids of the last character seen, which may continue into the next window
+        pending = np.array([], dtype=np.int64)
+        pending_start = 0
+        for first_frame, token_ids in self._iter_long_form_token_ids(
+            audio_path, chunk_length_s=chunk_length_s, stride_length_s=self.stride_length_s
+        ):
+            if len(pending) == 0:
+                pending_start = first_frame
+            pending = np.concatenate([pending, token_ids])
+            (collapsed,) = self._ctc.collapse([pending])
+            if len(collapsed) == 0:
+                pending = pending[:0]
+                continue
+
+            if collapsed.end_frames[-1] < len(pending):
+                # Followed by a blank, so the last character is complete too
+                yield from self._to_chunks(collapsed, pending_start)
+                pending = pending[:0]
+            else:
+                last_start = int(collapsed.start_frames[-1])
+                yield from self._to_chunks(collapsed, pending_start, stop=-1)
+                pending = pending[last_start:]
+                pending_start += last_start
+
+        if len(pending) > 0:
+            yield from self._to_chunks(self._ctc.collapse([pending])[0], pending_start)
+
+    def predict_segments(
+        self,
+        audio_path: AudioSource,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+    ) -> list[TranscriptionSegment]:
+        """Split an audio file into utterances at pauses and transcribe them in batches.
+
+        Speech is found with the same energy-based detection as vad, using vad_threshold_db, and pauses of at
+        least vad_min_silence_s end a segment. Segments longer than max_segment_length_s are split into pieces
+        of about equal length. The segments are run through the model in batches of batch_size, or grouped
+        under max_batch_samples, instead of in one pass over the whole file. Silence between segments is not
+        transcribed.
+
+        Args:
+            audio_path: Path to the audio file, or audio already decoded with decode
+            max_segment_length_s: Longest segment in seconds
+
+        Returns:
+            TranscriptionSegment for each segment, in time order
+        """
+        y = self._load(audio_path, None)
+        label = self._label(audio_path)
+        align_to = self._decoder.inputs_to_logits_ratio
+        regions = speech_regions(
+            y,
+            self.sampling_rate,
+            threshold_db=self.vad_threshold_db,
+            min_silence_s=self.vad_min_silence_s,
+            align_to=align_to,
+            max_length=max(int(max_segment_length_s * self.sampling_rate) // align_to, 1) * align_to,
+        )
+        logger.debug("Split %s into %s segments", label, len(regions))
+
+        labels = [
+            f"{label} from {start / self.sampling_rate:.2f}s to {end / self.sampling_rate:.2f}s"
+            for start, end in regions
+        ]
+        token_ids = self._predict_token_ids_batch([y[start:end] for start, end in regions], labels=labels, vad=False)
+        segments = []
+        for (start, end), collapsed in zip(regions, self._decoder.collapse(token_ids)):
+            segments.append(
+                TranscriptionSegment(
+                    text=self._decoder.text(collapsed),
+                    timestamp=(start / self.sampling_rate, end / self.sampling_rate),
+                    chunks=self._to_chunks(collapsed, start // align_to),
+                )
+            )
+        return segments
+
+    def predict_intervals(
+        self,
+        audio_path: AudioSource,
+        intervals: Sequence[tuple[float, float]],
+    ) -> list[TranscriptionSegment]:
+        """Transcribe many intervals of an audio file from one pass of the model over the whole file.
+
+        The model's frame-level outputs for the whole file are sliced at the frames nearest each interval's
+        start and end, and each slice is decoded separately. Compared to predicting each interval on its
+        own, the audio is run through the model once and the model hears the audio on both sides of each
+        interval. Audio longer than chunk_length_s is run in overlapping windows as in long-form prediction,
+        or in windows of DEFAULT_STREAM_CHUNK_LENGTH_S if chunk_length_s is not set, so memory use does not
+        grow with the length of the file.
+
+        Args:
+            audio_path: Path to the audio file, or audio from decode or open_for_intervals
+            intervals: (start, end) times in seconds of the intervals to transcribe
+
+        Returns:
+            TranscriptionSegment for each interval, in input order, with character timestamps from the start
+            of the audio that are within the interval
+        """
+        token_ids = self._predict_token_ids_full_pass(audio_path)
+        align_to = self._decoder.inputs_to_logits_ratio
+        frames = [
+            (round(start * self.sampling_rate / align_to), round(end * self.sampling_rate / align_to))
+            for start, end in intervals
+        ]
+        segments = []
+        for (start, end), (first, last), collapsed in zip(
+            intervals, frames, self._decoder.collapse([token_ids[first:last] for first, last in frames])
+        ):
+            chunks = [
+                TranscriptionChunk(chunk.text, (max(chunk.timestamp[0], start), min(chunk.timestamp[1], end)))
+                for chunk in self._to_chunks(collapsed, first)
+            ]
+            segments.append(
+                TranscriptionSegment(text=self._decoder.text(collapsed), timestamp=(start, end), chunks=chunks)
+            )
+        return segments
+
+    def predict_batch(
+        self,
+        audio: Sequence[AudioInput],
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> list[str]:
+        """Predict transcriptions for multiple audio inputs, running them through the model in batches.
+
+        Args:
+            audio: Paths to audio files, audio decoded with decode, or audio arrays already loaded at the pipeline's
+                sampling rate
+            intervals: Optional (start, end) times in seconds for each audio input, not used for arrays
+
+        Returns:
+            Transcription text for each audio input, in input order
+        """
+        token_ids = self._predict_token_ids_batch(audio, intervals)
+        return [self._decoder.text(c) for c in self._decoder.collapse(token_ids)]
+
+    def predict_batch_with_timestamps(
+        self,
+        audio: Sequence[AudioInput],
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> list[TranscriptionWithTimestamps]:
+        """Predict transcriptions with character-level timestamps for multiple audio inputs in batches.
+
+        Args:
+            audio: Paths to audio files, audio decoded with decode, or audio arrays already loaded at the pipeline's
+                sampling rate
+            intervals: Optional (start, end) times in seconds for each audio input, not used for arrays
+
+        Returns:
+            TranscriptionWithTimestamps for each audio input, in input order
+        """
+        token_ids = self._predict_token_ids_batch(audio, intervals)
+        return [
+            TranscriptionWithTimestamps(text=self._decoder.text(c), chunks=self._to_chunks(c))
+            for c in self._decoder.collapse(token_ids)
+        ]
+
+    def _predict_token_ids_batch(
+        self,
+        audio: Sequence[AudioInput],
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+        labels: Sequence[str] | None = None,
+        vad: bool | None = None,
+    ) -> list[np.ndarray]:
+        """Load audio inputs and return the greedy CTC token ids for each of them, in input order.
+
+        Args:
+            audio: Paths to audio files, audio decoded with decode, or audio arrays already loaded at the pipeline's
+                sampling rate
+            intervals: Optional (start, end) times in seconds for each audio input, not used for arrays
+            labels: Optional name of each audio input for logging. Defaults to the path or input index.
+            vad: Whether to only run speech regions through the model. Defaults to the pipeline's vad.
+        """
+        if vad is None:
+            vad = self.vad
+        if intervals is None:
+            intervals = [None] * len(audio)
+        if len(intervals) != len(audio):
+            raise ValueError(f"Got {len(intervals)} intervals for {len(audio)} audio inputs")
+
+        token_ids = [None] * len(audio)
+        cache_keys = [None] * len(audio)
+        if self.logit_cache is not None:
+            for i, (a, interval) in enumerate(zip(audio, intervals)):
+                cache_keys[i] = self._cache_key(a, interval, vad=vad)
+                token_ids[i] = self.logit_cache.get(cache_keys[i])
+        to_predict = [i for i, ids in enumerate(token_ids) if ids is None]
+        if not to_predict:
+            return token_ids
+
+        arrays = [
+            audio[i] if isinstance(audio[i], np.ndarray) else self._load(audio[i], intervals[i]) for i in to_predict
+        ]
+        if labels is not None:
+            labels = [labels[i] for i in to_predict]
+        else:
+            labels = [self._label(audio[i], f"audio input {i}") for i in to_predict]
+
+        for i, ids in zip(to_predict, self._forward_arrays(arrays, labels, vad=vad)):
+            token_ids[i] = ids
+            if cache_keys[i] is not None:
+                self.logit_cache.put(cache_keys[i], ids)
+        return token_ids
+
+    def _predict_token_ids(
+        self,
+        audio_path: AudioSource,
+        interval: tuple[float, float] | None = None,
+    ) -> np.ndarray:
+        """Greedy CTC token ids for every frame of an audio file, from the cache if possible."""
+        label = self._label(audio_path)
+        is_long_form = self._is_long_form(audio_path, interval)
+        cache_key = None
+        if self.logit_cache is not None:
+            cache_key = self._cache_key(audio_path, interval, is_long_form)
+            token_ids = self.logit_cache.get(cache_key)
+            if token_ids is not None:
+                logger.debug("Using cached model outputs for %s", label)
+                return token_ids
+
+        if self.vad:
+            logger.debug("Predicting transcription of speech in %s with model %s", label, self.model_name)
+            y = self._load(audio_path, interval)
+            if interval:
+                label = f"{label} from {interval[0]}s to {interval[1]}s"
+            token_ids = self._forward_arrays([y], [label])[0]
+        elif is_long_form:
+            logger.debug("Predicting long-form transcription for %s with model %s", label, self.model_name)
+            token_ids = self._predict_token_ids_long_form(audio_path, interval)
+        else:
+            logger.debug("Predicting transcription for %s with model %s", label, self.model_name)
+            token_ids = self._ctc.forward_batch([self._load(audio_path, interval)])[0]
+
+        if cache_key is not None:
+            self.logit_cache.put(cache_key, token_ids)
+        return token_ids
+
+    def _predict_token_ids_full_pass(self, audio_path: AudioSource) -> np.ndarray:
+        """Greedy CTC token ids for every frame of a whole audio file, in windows if it is long."""
+        if self.chunk_length_s is None and not self.vad and self._duration(audio_path) > DEFAULT_STREAM_CHUNK_LENGTH_S:
+            logger.debug(
+                "Predicting long-form transcription for %s with model %s", self._label(audio_path), self.model_name
+            )
+            kept_token_ids = [
+                token_ids
+                for _, token_ids in self._iter_long_form_token_ids(
+                    audio_path, chunk_length_s=DEFAULT_STREAM_CHUNK_LENGTH_S
+                )
+            ]
+            return np.concatenate(kept_token_ids)
+        return self._predict_token_ids(audio_path)
+
+    def _cache_key(
+        self,
+        audio: AudioInput,
+        interval: tuple[float, float] | None,
+        is_long_form: bool = False,
+        vad: bool | None = None,
+    ) -> str:
+        """Logit cache key for the model outputs of an audio input with this pipeline's settings."""
+        if vad is None:
+            vad = self.vad
+        if isinstance(audio, DecodedAudio):
+            # Keyed by the samples, since decoded audio may only cover part of its file
+            audio, interval = audio.interval_samples(interval), None
+        elif isinstance(audio, AudioFile):
+            audio = audio.path
+        return self.logit_cache.key(
+            audio,
+            interval=None if isinstance(audio, np.ndarray) else interval,
+            model=self.model_name,
+            revision=self._model_revision(),
+            backend=OnnxCTCEngine.backend if self.engine == "onnx" else CTCEngine.backend,
+            quantized=self.quantize,
+            sampling_rate=self.sampling_rate,
+            resample_type=self.resample_type,
+            windows=(self.chunk_length_s, self.stride_length_s) if is_long_form and not vad else None,
+            vad=(self.vad_threshold_db, self.vad_min_silence_s, self.chunk_length_s) if vad else None,
+        )
+
+    def _model_revision(self) -> str:
+        """Version of the model files, found once without loading the model."""
+        if self._revision is None:
+            self._revision = model_revision(self.model_name)
+        return self._revision
+
+    def _uses_token_ids(self, audio_path: AudioSource, interval: tuple[float, float] | None) -> bool:
+        """Whether a single prediction goes through frame-level token ids instead of the transformers pipeline."""
+        # The engine is checked first, so a cache hit doesn't load the model's pipeline
+        return (
+            self.engine != "pipeline"
+            or self.logit_cache is not None
+            or self.vad
+            or self._is_long_form(audio_path, interval)
+            or self._model_pipe is None
+        )
+
+    def _forward_arrays(
+        self, arrays: Sequence[np.ndarray], labels: Sequence[object], vad: bool | None = None
+    ) -> list[np.ndarray]:
+        """Run audio arrays through the model in batches and return the greedy CTC token ids of every frame.
+
+        With vad, only the speech regions of each array are run through the model, and the frames outside
+        them are blank, so the token ids line up with the frames of the whole array.
+
+        Args:
+            arrays: Audio arrays at the pipeline's sampling rate
+            labels: Name of each audio input for logging, such as its path
+            vad: Whether to only run speech regions through the model. Defaults to the pipeline's vad.
+
+        Returns:
+            Token ids for each array, in input order
+        """
+        if vad is None:
+            vad = self.vad
+        align_to = self._ctc.inputs_to_logits_ratio
+        max_length = None
+        if self.chunk_length_s is not None:
+            max_length = max(int(self.chunk_length_s * self.sampling_rate) // align_to, 1) * align_to
+
+        pieces = []
+        # Input index and first frame of each piece
+        placements = []
+        for i, (y, label) in enumerate(zip(arrays, labels)):
+            if vad:
+                regions = speech_regions(
+                    y,
+                    self.sampling_rate,
+                    threshold_db=self.vad_threshold_db,
+                    min_silence_s=self.vad_min_silence_s,
+                    align_to=align_to,
+                    max_length=max_length,
+                )
+                speech_samples = sum(end - start for start, end in regions)
+                self.vad_stats.add(len(y), speech_samples)
+                logger.info(
+                    "Voice activity detection skipped %.1f%% of %s",
+                    100 * (1 - speech_samples / len(y)) if len(y) else 0,
+                    label,
+                )
+            else:
+                regions = [(0, len(y))]
+            for start, end in regions:
+                pieces.append(y[start:end])
+                placements.append((i, start // align_to))
+
+        if self.max_batch_samples is not None:
+            batches = bucket_by_length([len(p) for p in pieces], self.max_batch_samples)
+        else:
+            batches = fixed_size_batches(len(pieces), self.batch_size)
+
+        batch_token_ids = []
+        for batch in batches:
+            batch_pieces = [pieces[i] for i in batch]
+            logger.debug("Predicting batch of %s audio inputs with model %s", len(batch), self.model_name)
+            batch_token_ids.append(self._ctc.forward_batch(batch_pieces))
+            self.padding_stats.add_batch([len(p) for p in batch_pieces])
+        piece_token_ids = restore_order(batches, batch_token_ids)
+        if not vad:
+            return piece_token_ids
+
+        token_ids = [np.full(num_frames(len(y), align_to), self._ctc.blank_id, dtype=np.int64) for y in arrays]
+        for (i, first_frame), ids in zip(placements, piece_token_ids):
+            ids = ids[: len(token_ids[i]) - first_frame]
+            token_ids[i][first_frame : first_frame + len(ids)] = ids
+        return token_ids
+
+    def _is_long_form(self, audio_path: AudioSource, interval: tuple[float, float] | None) -> bool:
+        """Whether the audio is longer than chunk_length_s and should be transcribed in windows."""
+        if self.chunk_length_s is None:
+            return False
+        if interval:
+            duration = interval[1] - interval[0]
+        else:
+            duration = self._duration(audio_path)
+        return duration > self.chunk_length_s
+
+    def _duration(self, audio_path: AudioSource) -> float:
+        """Duration in seconds of an audio file, or of audio decoded from one."""
+        if isinstance(audio_path, DecodedAudio | AudioFile):
+            return audio_path.duration
+        return audio_duration(audio_path)
+
+    def _predict_token_ids_long_form(
+        self,
+        audio_path: AudioSource,
+        interval: tuple[float, float] | None = None,
+    ) -> np.ndarray:
+        """Greedy CTC token ids for every frame of long audio, stitched together from overlapping windows."""
+        kept_token_ids = [token_ids for _, token_ids in self._iter_long_form_token_ids(audio_path, interval)]
+        if not kept_token_ids:
+            return np.array([], dtype=np.int64)
+        return np.concatenate(kept_token_ids)
+
+    def _iter_long_form_token_ids(
+        self,
+        audio_path: AudioSource,
+        interval: tuple[float, float] | None = None,
+        chunk_length_s: float | None = None,
+        stride_length_s: float | None = None,
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """Read long audio window by window and yield the token ids kept from each window.
+
+        Only batch_size windows of audio are loaded at a time, unless the audio was already decoded.
+
+        Args:
+            audio_path: Path to the audio file, or audio already decoded with decode
+            interval: Optional tuple of (start, end) times in seconds
+            chunk_length_s: Window length in seconds. Defaults to the pipeline's chunk_length_s.
+            stride_length_s: Window overlap in seconds. Defaults to the pipeline's stride_length_s
+                if chunk_length_s is also not given.
+
+        Yields:
+            Tuples of (index of the first kept frame, token ids of the kept frames), in time order.
+            Frame indices are relative to the start of the audio or interval.
+        """
+        align_to = self._ctc.inputs_to_logits_ratio
+        if chunk_length_s is None:
+            chunk_length_s, stride_length_s = self.chunk_length_s, self.stride_length_s
+        chunk_length, stride_length = window_lengths_in_samples(
+            chunk_length_s, stride_length_s, self.sampling_rate, align_to
+        )
+        if interval:
+            offset, end = interval
+        else:
+            offset, end = 0.0, self._duration(audio_path)
+        windows = compute_windows(round((end - offset) * self.sampling_rate), chunk_length, stride_length)
+        logger.debug("Transcribing %s in %s windows", self._label(audio_path), len(windows))
+
+        blank_id = self._ctc.blank_id
+        for batch in fixed_size_batches(len(windows), self.batch_size):
+            batch_windows = [windows[i] for i in batch]
+            arrays = [
+                self._load(audio_path, (offset + w.start / self.sampling_rate, offset + w.end / self.sampling_rate))
+                for w in batch_windows
+            ]
+            batch_token_ids = self._ctc.forward_batch(arrays)
+            self.padding_stats.add_batch([len(a) for a in arrays])
+
+            for window, token_ids in zip(batch_windows, batch_token_ids):
+                first_frame = window.stride_left // align_to
+                num_kept = num_frames(window.keep_end - window.start, align_to) - first_frame
+                kept = token_ids[first_frame : first_frame + num_kept]
+                if len(kept) < num_kept and window.stride_right > 0:
+                    # A short read must not shift the frames of later windows
+                    kept = np.pad(kept, (0, num_kept - len(kept)), constant_values=blank_id)
+                yield window.keep_start // align_to, kept
+
+    def _decode_token_ids(self, token_ids: np.ndarray) -> str:
+        """Decode frame-level greedy CTC token ids to text."""
+        return self._decoder.text(self._decoder.collapse([token_ids])[0])
+
+    def _decode_token_ids_with_timestamps(self, token_ids: np.ndarray) -> TranscriptionWithTimestamps:
+        """Decode frame-level greedy CTC token ids to text with character timestamps."""
+        collapsed = self._decoder.collapse([token_ids])[0]
+        return TranscriptionWithTimestamps(text=self._decoder.text(collapsed), chunks=self._to_chunks(collapsed))
+
+    def _to_chunks(
+        self, collapsed: CollapsedCTC, frame_offset: int = 0, stop: int | None = None
+    ) -> list[TranscriptionChunk]:
+        """Convert collapsed CTC output to TranscriptionChunks with timestamps in seconds.
+
+        Args:
+            collapsed: Collapsed CTC output
+            frame_offset: Index of the frame the collapsed output's frame indices are relative to
+            stop: Optional index of the first character to leave out
+
+        Returns:
+            A TranscriptionChunk for each character
+        """
+        chars = self._decoder.chars(collapsed)[:stop]
+        timestamps = self._decoder.timestamps(collapsed, frame_offset)[:stop]
+        return [TranscriptionChunk(text=c, timestamp=t) for c, t in zip(chars, timestamps)]
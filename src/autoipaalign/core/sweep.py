@@ -0,0 +1,171 @@
+"""Transcription of the same audio files with several models.
+
+Variation studies transcribe one corpus with many models, such as all of VALID_MODELS. Each file is
+decoded once into an AudioCache, either the ASRPipeline's audio_cache_dir or a temporary directory
+without a size limit that is removed afterwards, and every model reads it memory-mapped from there
+instead of decoding and resampling it again.
+
+Each model transcribes all files before it is unloaded, so only the models being run are in memory.
+Several models can run at once in threads with model_jobs. Models are run on their own until one
+loads, to measure the memory a model takes, and then no more models run at once than fit in
+max_rss_mb.
+"""
+
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+import tgt.core
+
+from autoipaalign.core.model_registry import MODEL_REGISTRY
+from autoipaalign.core.parallel import pipeline_settings
+from autoipaalign.core.speech_recognition import ASRPipeline, DEFAULT_MAX_SEGMENT_LENGTH_S
+from autoipaalign.core.textgrid_io import TextGridContainer
+
+logger = logging.getLogger(__name__)
+
+
+def model_short_name(model_name: str) -> str:
+    """Last part of a HuggingFace model name or local model directory, such as
+    "full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa"."""
+    return Path(model_name).name
+
+
+def model_tier_name(tier_name: str, model_name: str) -> str:
+    """Name of a model's copy of a tier in a TextGrid with tiers from several models."""
+    return f"{tier_name}_{model_short_name(model_name)}"
+
+
+def combine_model_text_grids(
+    text_grids_by_model: dict[str, list[TextGridContainer]],
+) -> list[TextGridContainer]:
+    """Combine the TextGrids of several models into one TextGrid per file, renaming each tier with model_tier_name.
+
+    Args:
+        text_grids_by_model: TextGrids of each model, in the same file order for every model
+
+    Returns:
+        A TextGridContainer for each file with the tiers of every model, in model order
+    """
+    combined = [tgt.core.TextGrid() for _ in next(iter(text_grids_by_model.values()), [])]
+    for model_name, text_grids in text_grids_by_model.items():
+        for textgrid, tg in zip(combined, text_grids):
+            for tier in tg.text_grid.tiers:
+                tier.name = model_tier_name(tier.name, model_name)
+                textgrid.add_tier(tier)
+    return [TextGridContainer(text_grid=textgrid) for textgrid in combined]
+
+
+def sweep_models(
+    audio_paths: Sequence[str | os.PathLike[str]],
+    model_names: Sequence[str],
+    asr: ASRPipeline,
+    textgrid_tier_name: str,
+    add_phones: bool = False,
+    phone_tier_name: str = "phone",
+    segment: bool = False,
+    max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+    model_jobs: int = 1,
+    max_rss_mb: float | None = None,
+) -> dict[str, list[TextGridContainer]]:
+    """Transcribe audio files with each of several models, decoding each file once.
+
+    Args:
+        audio_paths: Paths to the audio files.
+        model_names: Names of the HuggingFace models or local model directories to transcribe with.
+        asr: Pipeline whose settings, other than model_name, every model uses. Its own model is not loaded.
+        textgrid_tier_name: Name for the transcription tier.
+        add_phones: If True, also create a phone alignment tier. Defaults to False.
+        phone_tier_name: Name for the phone alignment tier. Defaults to "phone".
+        segment: If True, split each file into utterances at pauses with one transcription interval each.
+            Defaults to False.
+        max_segment_length_s: Longest utterance in seconds when segment is True.
+        model_jobs: Largest number of models to run at once, each in its own thread. Defaults to 1.
+        max_rss_mb: Memory budget in megabytes for the models running at once. Defaults to no budget.
+
+    Returns:
+        TextGrids of each model, by model name in the order of model_names, with a TextGridContainer for
+        each audio file in the same order as audio_paths.
+    """
+    if model_jobs < 1:
+        raise ValueError(f"model_jobs must be at least 1, got {model_jobs}")
+    if not model_names:
+        return {}
+
+    options = (textgrid_tier_name, add_phones, phone_tier_name, segment, max_segment_length_s)
+    with tempfile.TemporaryDirectory(prefix="autoipaalign-audio-") as tmp_dir:
+        settings = pipeline_settings(asr)
+        if settings["audio_cache_dir"] is None:
+            logger.info("Decoding audio into temporary directory %s", tmp_dir)
+            settings["audio_cache_dir"] = Path(tmp_dir)
+            # Evicting files before the last model reads them would mean decoding them again
+            settings["audio_cache_max_mb"] = None
+
+        # The first model that loads decodes every file into the cache and shows how much memory a model takes
+        text_grids_by_model = {}
+        other_models = list(model_names)
+        size_bytes = None
+        while other_models and size_bytes is None:
+            model_name = other_models.pop(0)
+            text_grids_by_model[model_name], size_bytes = _transcribe_with_model(
+                audio_paths, model_name, settings, options
+            )
+        jobs = model_jobs
+        if max_rss_mb is not None and size_bytes:
+            jobs = max(1, min(model_jobs, int(max_rss_mb * 1024 * 1024 // size_bytes)))
+        if other_models:
+            logger.info("Running %s models at once, each using about %.0f MB", jobs, size_bytes / 1024 / 1024)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                model_name: pool.submit(_transcribe_with_model, audio_paths, model_name, settings, options)
+                for model_name in other_models
+            }
+            for model_name, future in futures.items():
+                text_grids_by_model[model_name], _ = future.result()
+    return {model_name: text_grids_by_model[model_name] for model_name in model_names}
+
+
+def _transcribe_with_model(
+    audio_paths: Sequence[str | os.PathLike[str]],
+    model_name: str,
+    settings: dict,
+    options: tuple[str, bool, str, bool, float],
+) -> tuple[list[TextGridContainer], int | None]:
+    """Transcribe all files with one model and unload it.
+
+    Returns:
+        A TextGridContainer for each audio file and the memory the model took to load in bytes, or None if it
+        could not be loaded
+    """
+    textgrid_tier_name, add_phones, phone_tier_name, segment, max_segment_length_s = options
+    model_asr = ASRPipeline(**{**settings, "model_name": model_name})
+    logger.info("Transcribing %s files with model %s", len(audio_paths), model_name)
+    try:
+        size_bytes = model_asr.load().size_bytes
+    except Exception as e:
+        logger.warning("Error loading model %s: %s", model_name, e)
+        return [
+            TextGridContainer._from_error(audio_path, textgrid_tier_name, str(e), add_phones, phone_tier_name)
+            for audio_path in audio_paths
+        ], None
+
+    text_grids = TextGridContainer.from_audio_batch_with_predict_transcription(
+        audio_paths,
+        textgrid_tier_name,
+        model_asr,
+        add_phones=add_phones,
+        phone_tier_name=phone_tier_name,
+        batch_size=model_asr.batch_size,
+        max_batch_samples=model_asr.max_batch_samples,
+        segment=segment,
+        max_segment_length_s=max_segment_length_s,
+    )
+    # Only models that are still running are kept in memory
+    model_key = model_asr._model_key()
+    del model_asr
+    MODEL_REGISTRY.discard(model_key)
+    return text_grids, size_bytes
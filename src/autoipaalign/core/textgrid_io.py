@@ -5,23 +5,38 @@ including reading from and writing to files, creating TextGrids from audio and
 transcriptions, and generating new tiers using automatic speech recognition (ASR).
 """
 
+from collections.abc import Iterator, Sequence
+from contextlib import ExitStack
 from dataclasses import dataclass
 import logging
+import math
 import os
 from pathlib import Path
+import shutil
 import warnings
 import zipfile
 
-import librosa
 import tgt.core
 import tgt.io3
 
-from autoipaalign.core.speech_recognition import ASRPipeline, TranscriptionChunk
+from autoipaalign.core.audio import DecodedAudio, audio_duration
+from autoipaalign.core.batching import bucket_by_length, fixed_size_batches
+from autoipaalign.core.speech_recognition import (
+    ASRPipeline,
+    AudioSource,
+    DEFAULT_MAX_SEGMENT_LENGTH_S,
+    TranscriptionChunk,
+    TranscriptionSegment,
+)
 
 logger = logging.getLogger(__name__)
 
 TEXT_GRID_SUFFIX = ".TextGrid"
 
+MIN_BATCHED_INTERVAL_S = 0.025
+"""Intervals shorter than this, about the audio one wav2vec2 output frame needs, are too short for the model.
+They are predicted on their own instead of in a batch, so they are excluded the same way."""
+
 
 def to_textgrid_basename(filename: Path):
     return filename.with_suffix(TEXT_GRID_SUFFIX).name
@@ -46,25 +61,194 @@ def write_textgrids_to_target(
             Defaults to False.
         is_overwrite: Boolean flag, allow overwriting existing files or not.
     """
-    if is_zip:
-        logger.info("Writing TextGrids to zip file %s", target_path)
-        if target_path.exists() and not is_overwrite:
-            raise OSError(f"{target_path} already exists and cannot be overwritten")
-
-        with zipfile.ZipFile(target_path, "w") as zipf:
-            for i, (audio_path, tg) in enumerate(zip(audio_paths, text_grids), start=1):
-                zipf.writestr(to_textgrid_basename(audio_path), tg.export_to_long_textgrid_str())
-                if i % 10 == 0:
-                    logger.info("%s TextGrids written to zip", i)
-    else:
-        if not target_path.exists():
-            logger.info("Making output directory %s", target_path)
-            target_path.mkdir(parents=True)
-        logger.info("Writing TextGrids to %s", target_path)
-        for i, (audio_path, tg) in enumerate(zip(audio_paths, text_grids), start=1):
-            tg.write_textgrid(target_path, audio_path, is_overwrite)
-            if i % 10 == 0:
-                logger.info("%s TextGrids written", i)
+    with TextGridWriter(target_path, is_zip, is_overwrite) as writer:
+        for audio_path, tg in zip(audio_paths, text_grids):
+            writer.write(audio_path, tg)
+
+
+def merge_textgrid_targets(
+    source_paths: Sequence[str | os.PathLike[str]],
+    target_path: Path,
+    is_zip: bool = False,
+    is_overwrite: bool = True,
+) -> int:
+    """Copy the TextGrids of several directories or zip files, such as the outputs of shards, into one target.
+
+    If two sources have a TextGrid with the same name, the first one is kept.
+
+    Args:
+        source_paths: Directories or zip files with TextGrids.
+        target_path: Destination path - either a directory or a zip file path.
+        is_zip: If True, write TextGrids to a zip file at target_path.
+            If False, write individual TextGrid files to the target_path directory.
+            Defaults to False.
+        is_overwrite: Boolean flag, allow overwriting existing files or not.
+
+    Returns:
+        Number of TextGrids copied.
+
+    Raises:
+        FileNotFoundError: If a source doesn't exist.
+    """
+    for source_path in source_paths:
+        if not Path(source_path).exists():
+            raise FileNotFoundError(f"{source_path} doesn't exist")
+    sources: dict[str, Path] = {}
+    with TextGridWriter(target_path, is_zip, is_overwrite) as writer:
+        for source_path in source_paths:
+            for name, data in _iter_textgrid_contents(Path(source_path)):
+                if name in sources:
+                    logger.warning("Skipping %s in %s, already copied from %s", name, source_path, sources[name])
+                    continue
+                sources[name] = Path(source_path)
+                writer.write_contents(name, data)
+    return writer.num_written
+
+
+def _iter_textgrid_contents(source_path: Path) -> Iterator[tuple[str, bytes]]:
+    """Name, relative to the directory or zip file, and contents of each TextGrid in a directory or zip file."""
+    if source_path.is_dir():
+        for path in sorted(source_path.rglob(f"*{TEXT_GRID_SUFFIX}")):
+            yield path.relative_to(source_path).as_posix(), path.read_bytes()
+        return
+    with zipfile.ZipFile(source_path) as zipf:
+        for name in zipf.namelist():
+            if name.endswith(TEXT_GRID_SUFFIX):
+                yield name, zipf.read(name)
+
+
+class TextGridWriter:
+    """Writes TextGrids to a directory or zip file one at a time, as they are produced.
+
+    Each TextGrid is on disk as soon as it is written. TextGrids can be named with a path relative to the
+    target, such as dr1/spk1/sa1.TextGrid, to write them to subdirectories. TextGrids for a zip file are first written to a
+    staging directory next to it, named like the zip file with a .partial suffix, and are moved into the
+    zip file when the writer is closed. If the process is killed before then, the staged TextGrids are
+    kept, and a later writer that appends to the zip file adds them to it. Use as a context manager, or
+    call close.
+
+    Args:
+        target_path: Destination path - either a directory or a zip file path.
+        is_zip: If True, write TextGrids to a zip file at target_path. Defaults to False.
+        is_overwrite: Boolean flag, allow overwriting existing files or not.
+        append: If True, keep the TextGrids already in the target and add to them, replacing TextGrids with
+            the same name, even if is_overwrite is False. Defaults to False.
+
+    Attributes:
+        num_written: Number of TextGrids written.
+    """
+
+    def __init__(self, target_path: Path, is_zip: bool = False, is_overwrite: bool = True, append: bool = False):
+        self.target_path = Path(target_path)
+        self.is_zip = is_zip
+        self.is_overwrite = is_overwrite or append
+        self.append = append
+        self.num_written = 0
+        self._existing: set[str] = set()
+        if is_zip:
+            logger.info("Writing TextGrids to zip file %s", self.target_path)
+            if self.target_path.exists() and not self.is_overwrite:
+                raise OSError(f"{self.target_path} already exists and cannot be overwritten")
+            self._staging_dir = self.target_path.with_name(f"{self.target_path.name}.partial")
+            if not append:
+                # Left over from a run that was killed
+                shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir.mkdir(parents=True, exist_ok=True)
+            if append:
+                self._existing = set(self._zip_names()) | set(_relative_file_names(self._staging_dir))
+        else:
+            if not self.target_path.exists():
+                logger.info("Making output directory %s", self.target_path)
+                self.target_path.mkdir(parents=True)
+            logger.info("Writing TextGrids to %s", self.target_path)
+            if append:
+                self._existing = set(_relative_file_names(self.target_path))
+
+    def has_output(self, textgrid_name: str) -> bool:
+        """Whether the target already had a TextGrid of this name when the writer was opened to append."""
+        return textgrid_name in self._existing
+
+    def write(self, audio_path: Path, tg: "TextGridContainer"):
+        """Write the TextGrid for an audio file, named like the audio file with a .TextGrid suffix."""
+        if self.is_zip:
+            tg.write_textgrid(self._staging_dir, audio_path)
+        else:
+            tg.write_textgrid(self.target_path, audio_path, self.is_overwrite)
+        self._count_written()
+
+    def write_named(self, textgrid_name: str, tg: "TextGridContainer"):
+        """Write a TextGrid under a name, which may be a path relative to the target."""
+        self.write_contents(textgrid_name, tg.export_to_long_textgrid_str().encode())
+
+    def _count_written(self):
+        self.num_written += 1
+        if self.num_written % 10 == 0:
+            logger.info("%s TextGrids written", self.num_written)
+
+    def write_contents(self, textgrid_name: str, data: bytes):
+        """Write an already exported TextGrid file, such as one copied from another target, under its name, which
+        may be a path relative to the target."""
+        directory = self._staging_dir if self.is_zip else self.target_path
+        textgrid_path = directory / textgrid_name
+        if not self.is_zip and not self.is_overwrite and textgrid_path.exists():
+            raise OSError(f"File {textgrid_path} already exists and cannot be overwritten")
+        textgrid_path.parent.mkdir(parents=True, exist_ok=True)
+        textgrid_path.write_bytes(data)
+        self._count_written()
+
+    def close(self):
+        """Move staged TextGrids into the zip file. The zip file is replaced at once, so it is never left half
+        written."""
+        if not self.is_zip or not self._staging_dir.exists():
+            return
+        staged = sorted(_relative_file_names(self._staging_dir))
+        if staged or not self.target_path.exists():
+            tmp_path = self.target_path.with_name(f"{self.target_path.name}.tmp")
+            try:
+                with zipfile.ZipFile(tmp_path, "w") as zipf:
+                    if self.append and self.target_path.exists():
+                        self._copy_existing(zipf, set(staged))
+                    for name in staged:
+                        zipf.write(self._staging_dir / name, name)
+                os.replace(tmp_path, self.target_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        shutil.rmtree(self._staging_dir)
+
+    def __enter__(self) -> "TextGridWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _zip_names(self) -> list[str]:
+        """Names in the existing zip file, or none if there is no readable zip file."""
+        if not self.target_path.exists():
+            return []
+        try:
+            with zipfile.ZipFile(self.target_path) as zipf:
+                return zipf.namelist()
+        except zipfile.BadZipFile as e:
+            logger.warning("Ignoring unreadable zip file %s: %s", self.target_path, e)
+            return []
+
+    def _copy_existing(self, zipf: zipfile.ZipFile, replaced: set[str]):
+        """Copy the TextGrids of the existing zip file that are not replaced by staged ones."""
+        try:
+            with zipfile.ZipFile(self.target_path) as existing:
+                for info in existing.infolist():
+                    if info.filename not in replaced:
+                        zipf.writestr(info, existing.read(info))
+        except zipfile.BadZipFile:
+            pass
+
+
+def _relative_file_names(directory: Path) -> Iterator[str]:
+    """Paths of the files in a directory and its subdirectories, relative to it, with / as separator."""
+    for path in directory.rglob("*"):
+        if path.is_file():
+            yield path.relative_to(directory).as_posix()
 
 
 @dataclass
@@ -119,14 +303,14 @@ class TextGridContainer:
         logger.debug("TextGrid %s written", textgrid_path)
         return textgrid_path
 
-    def validate_against_audio_duration(self, audio_path: str | os.PathLike[str], time_difference=0.01):
-        audio_duration = librosa.get_duration(path=audio_path, sr=None)
+    def validate_against_audio_duration(self, audio_path: str | os.PathLike[str] | DecodedAudio, time_difference=0.01):
+        duration = audio_duration(audio_path)
         tg_end_time = max(tier.end_time for tier in self.text_grid.tiers)
-        if tg_end_time > audio_duration:
+        if tg_end_time > duration:
             raise ValueError("TextGrid ends at {tg_end_time:.2f}s but audio is only {audio_duration:.2f}s.")
 
-        if abs(tg_end_time - audio_duration) > time_difference:
-            warning = f"TextGrid ends at {tg_end_time:.2f}s but audio is {audio_duration:.2f}s. Only the annotated portion will be transcribed."
+        if abs(tg_end_time - duration) > time_difference:
+            warning = f"TextGrid ends at {tg_end_time:.2f}s but audio is {duration:.2f}s. Only the annotated portion will be transcribed."
             warnings.warn(warning)  # So this appears in gradio
             logger.warning(warning)
 
@@ -174,11 +358,16 @@ class TextGridContainer:
         asr_pipeline: ASRPipeline,
         add_phones: bool = False,
         phone_tier_name: str = "phone",
+        segment: bool = False,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+        interval: tuple[float, float] | None = None,
     ) -> "TextGridContainer":
         """Create a TextGrid with transcription tier from audio using ASR.
 
         Uses ASR to predict transcription. Optionally also creates a phone
-        alignment tier with character-level timestamps.
+        alignment tier with character-level timestamps. The audio is decoded once
+        and used for both the prediction and the duration of the tiers.
+        With an interval, only the interval is read and transcribed.
 
         Args:
             audio_in: Path to the audio file.
@@ -186,29 +375,301 @@ class TextGridContainer:
             asr_pipeline: ASRPipeline for predicting transcriptions.
             add_phones: If True, also create a phone alignment tier. Defaults to False.
             phone_tier_name: Name for the phone alignment tier. Defaults to "phone".
+            segment: If True, split the audio into utterances at pauses with ASRPipeline.predict_segments
+                and add one transcription interval per utterance instead of one for the whole file.
+                Defaults to False.
+            max_segment_length_s: Longest utterance in seconds when segment is True.
+            interval: Optional (start, end) times in seconds of the only part of the audio to transcribe.
+                The transcription tier still spans the whole audio, with one interval at these times.
+                Can't be used with segment.
 
         Returns:
             A new TextGridContainer with transcription tier (and optionally phone tier).
         """
         if audio_in is None:
             return cls(text_grid=tgt.core.TextGrid())
+        if segment and interval is not None:
+            raise ValueError("An interval can't be transcribed with segment")
 
         chunks = []
         transcription = ""
+        audio = audio_in
 
         try:
-            if add_phones:
-                result = asr_pipeline.predict_with_timestamps(audio_in)
+            if interval is not None:
+                if add_phones:
+                    result = asr_pipeline.predict_with_timestamps(audio_in, interval)
+                    transcription = result.text
+                    chunks = _shift_chunks(result.chunks, interval[0])
+                else:
+                    transcription = asr_pipeline.predict(audio_in, interval)
+                return cls._from_transcription(
+                    audio_in, textgrid_tier_name, transcription, chunks, add_phones, phone_tier_name, interval
+                )
+            audio = asr_pipeline.decode(audio_in)
+            if segment:
+                segments = asr_pipeline.predict_segments(audio, max_segment_length_s)
+                return cls._from_segment_transcriptions(
+                    audio, textgrid_tier_name, segments, add_phones, phone_tier_name
+                )
+            elif add_phones:
+                result = asr_pipeline.predict_with_timestamps(audio)
                 transcription = result.text
                 chunks = result.chunks
             else:
-                transcription = asr_pipeline.predict(audio_in)
+                transcription = asr_pipeline.predict(audio)
         except Exception as e:
-            transcription = f"[Error]: {e}"
             logger.warning("Error during transcription of %s: %s", audio_in, e)
+            return cls._from_error(audio, textgrid_tier_name, str(e), add_phones, phone_tier_name, interval)
+
+        return cls._from_transcription(
+            audio, textgrid_tier_name, transcription, chunks, add_phones, phone_tier_name, interval
+        )
 
+    @classmethod
+    def from_audio_batch_with_predict_transcription(
+        cls,
+        audio_paths: list[str | os.PathLike[str]],
+        textgrid_tier_name: str,
+        asr_pipeline: ASRPipeline,
+        add_phones: bool = False,
+        phone_tier_name: str = "phone",
+        batch_size: int = 1,
+        max_batch_samples: int | None = None,
+        segment: bool = False,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> list["TextGridContainer"]:
+        """Create TextGrids with transcription tiers for multiple audio files, predicting them in batches.
+
+        Each group of files is transcribed together with the ASRPipeline's batch prediction. Groups are
+        either batch_size files in input order or, when max_batch_samples is set, files of similar duration
+        whose padded batch stays under max_batch_samples. If a batch fails, its files are transcribed
+        one at a time so an error only affects the file that caused it. With a batch_size of 1 and no
+        max_batch_samples, this is the same as calling from_audio_with_predict_transcription for each file.
+
+        Args:
+            audio_paths: Paths to the audio files.
+            textgrid_tier_name: Name for the transcription tier.
+            asr_pipeline: ASRPipeline for predicting transcriptions.
+            add_phones: If True, also create a phone alignment tier. Defaults to False.
+            phone_tier_name: Name for the phone alignment tier. Defaults to "phone".
+            batch_size: Number of audio files to predict together. Defaults to 1.
+            max_batch_samples: Optional budget of padded samples per batch at the ASRPipeline's sampling rate.
+                Files are sorted by duration and grouped under this budget instead of by batch_size.
+            segment: If True, split each file into utterances at pauses, as in from_audio_with_predict_transcription.
+                Each file's utterances are batched with the ASRPipeline's batch settings instead of batching files.
+                Defaults to False.
+            max_segment_length_s: Longest utterance in seconds when segment is True.
+            intervals: Optional (start, end) times in seconds of the only part of each audio file to transcribe,
+                or None to transcribe the whole file, as in from_audio_with_predict_transcription.
+
+        Returns:
+            A TextGridContainer for each audio file, in the same order as audio_paths.
+        """
+        text_grids = [None] * len(audio_paths)
+        for i, tg in cls.iter_audio_batch_with_predict_transcription(
+            audio_paths,
+            textgrid_tier_name,
+            asr_pipeline,
+            add_phones=add_phones,
+            phone_tier_name=phone_tier_name,
+            batch_size=batch_size,
+            max_batch_samples=max_batch_samples,
+            segment=segment,
+            max_segment_length_s=max_segment_length_s,
+            intervals=intervals,
+        ):
+            text_grids[i] = tg
+        return text_grids
+
+    @classmethod
+    def iter_audio_batch_with_predict_transcription(
+        cls,
+        audio_paths: Sequence[str | os.PathLike[str]],
+        textgrid_tier_name: str,
+        asr_pipeline: ASRPipeline,
+        add_phones: bool = False,
+        phone_tier_name: str = "phone",
+        batch_size: int = 1,
+        max_batch_samples: int | None = None,
+        segment: bool = False,
+        max_segment_length_s: float = DEFAULT_MAX_SEGMENT_LENGTH_S,
+        intervals: Sequence[tuple[float, float] | None] | None = None,
+    ) -> Iterator[tuple[int, "TextGridContainer"]]:
+        """Create TextGrids for multiple audio files like from_audio_batch_with_predict_transcription, yielding
+        each file's TextGrid as soon as its batch is transcribed.
+
+        Only one batch of TextGrids is held at a time, so they can be written while later files are
+        transcribed, with memory use that does not grow with the number of files.
+
+        Args:
+            Same as from_audio_batch_with_predict_transcription.
+
+        Yields:
+            Tuples of (index of the audio file in audio_paths, its TextGridContainer). With max_batch_samples,
+            files are yielded in the order of their batches instead of input order.
+        """
+        if intervals is None:
+            intervals = [None] * len(audio_paths)
+        if segment or (batch_size <= 1 and max_batch_samples is None):
+            for i, (audio_in, interval) in enumerate(zip(audio_paths, intervals)):
+                yield (
+                    i,
+                    cls.from_audio_with_predict_transcription(
+                        audio_in,
+                        textgrid_tier_name,
+                        asr_pipeline,
+                        add_phones=add_phones,
+                        phone_tier_name=phone_tier_name,
+                        segment=segment,
+                        max_segment_length_s=max_segment_length_s,
+                        interval=interval,
+                    ),
+                )
+            return
+
+        if max_batch_samples is not None:
+            # Read from the file headers, since decoding every file first would hold all of them in memory
+            lengths = [
+                math.ceil(
+                    (audio_duration(audio_in) if interval is None else interval[1] - interval[0])
+                    * asr_pipeline.sampling_rate
+                )
+                for audio_in, interval in zip(audio_paths, intervals)
+            ]
+            batches = bucket_by_length(lengths, max_batch_samples)
+        else:
+            batches = fixed_size_batches(len(audio_paths), batch_size)
+
+        for batch in batches:
+            batch_paths = [audio_paths[i] for i in batch]
+            batch_intervals = [intervals[i] for i in batch]
+            try:
+                # Only intervals are read from files with one, instead of decoding the whole file
+                batch_audio = [
+                    asr_pipeline.decode(audio_in) if interval is None else audio_in
+                    for audio_in, interval in zip(batch_paths, batch_intervals)
+                ]
+                interval_kwargs = {"intervals": batch_intervals} if any(batch_intervals) else {}
+                if add_phones:
+                    results = asr_pipeline.predict_batch_with_timestamps(batch_audio, **interval_kwargs)
+                    transcriptions = [r.text for r in results]
+                    all_chunks = [
+                        r.chunks if interval is None else _shift_chunks(r.chunks, interval[0])
+                        for r, interval in zip(results, batch_intervals)
+                    ]
+                else:
+                    transcriptions = asr_pipeline.predict_batch(batch_audio, **interval_kwargs)
+                    all_chunks = [[] for _ in batch_paths]
+            except Exception as e:
+                logger.warning("Error during batch transcription, transcribing files individually: %s", e)
+                for i, audio_in, interval in zip(batch, batch_paths, batch_intervals):
+                    yield (
+                        i,
+                        cls.from_audio_with_predict_transcription(
+                            audio_in,
+                            textgrid_tier_name,
+                            asr_pipeline,
+                            add_phones=add_phones,
+                            phone_tier_name=phone_tier_name,
+                            interval=interval,
+                        ),
+                    )
+                continue
+
+            for i, audio, transcription, chunks, interval in zip(
+                batch, batch_audio, transcriptions, all_chunks, batch_intervals
+            ):
+                yield (
+                    i,
+                    cls._from_transcription(
+                        audio, textgrid_tier_name, transcription, chunks, add_phones, phone_tier_name, interval
+                    ),
+                )
+
+    @classmethod
+    def _from_transcription(
+        cls,
+        audio_in: str | os.PathLike[str] | DecodedAudio,
+        textgrid_tier_name: str,
+        transcription: str,
+        chunks: list[TranscriptionChunk],
+        add_phones: bool,
+        phone_tier_name: str,
+        interval: tuple[float, float] | None = None,
+    ) -> "TextGridContainer":
+        """Build a TextGrid with the transcription spanning the full audio, or only the interval if one is given,
+        and optional phone tier. Chunk timestamps are from the start of the audio."""
+        if interval is None:
+            return cls._from_full_audio_transcription(
+                audio_in, textgrid_tier_name, transcription, chunks, add_phones, phone_tier_name
+            )
+        return cls._from_segment_transcriptions(
+            audio_in,
+            textgrid_tier_name,
+            [TranscriptionSegment(transcription, interval, chunks)],
+            add_phones,
+            phone_tier_name,
+        )
+
+    @classmethod
+    def _from_error(
+        cls,
+        audio_in: str | os.PathLike[str] | DecodedAudio,
+        textgrid_tier_name: str,
+        message: str,
+        add_phones: bool,
+        phone_tier_name: str,
+        interval: tuple[float, float] | None = None,
+    ) -> "TextGridContainer":
+        """Build a TextGrid with the error transcription "[Error]: {message}" like _from_transcription.
+
+        If the audio can't be read to find its duration, for example because the error is that the file is
+        corrupt, the TextGrid ends at the end of the interval, or has no duration if there is none.
+        """
+        transcription = f"[Error]: {message}"
+        try:
+            return cls._from_transcription(
+                audio_in, textgrid_tier_name, transcription, [], add_phones, phone_tier_name, interval
+            )
+        except Exception as e:
+            logger.warning("Could not read the duration of %s: %s", audio_in, e)
+
+        start, end = interval if interval is not None else (0.0, 0.0)
+        transcription_tier = tgt.core.IntervalTier(start_time=0, end_time=end, name=textgrid_tier_name)
+        transcription_tier.add_annotation(tgt.core.Interval(start, end, transcription))
+        textgrid = tgt.core.TextGrid()
+        textgrid.add_tier(transcription_tier)
+        if add_phones:
+            textgrid.add_tier(tgt.core.IntervalTier(start_time=0, end_time=end, name=phone_tier_name))
+        return cls(text_grid=textgrid)
+
+    @classmethod
+    def _from_full_audio_transcription(
+        cls,
+        audio_in: str | os.PathLike[str] | DecodedAudio,
+        textgrid_tier_name: str,
+        transcription: str,
+        chunks: list[TranscriptionChunk],
+        add_phones: bool,
+        phone_tier_name: str,
+    ) -> "TextGridContainer":
+        """Build a TextGrid with the transcription spanning the full audio and optional phone tier.
+
+        Args:
+            audio_in: Path to the audio file, or audio decoded from it.
+            textgrid_tier_name: Name for the transcription tier.
+            transcription: Predicted transcription or error message.
+            chunks: Character-level chunks for the phone tier.
+            add_phones: If True, also create a phone alignment tier.
+            phone_tier_name: Name for the phone alignment tier.
+
+        Returns:
+            A new TextGridContainer with transcription tier (and optionally phone tier).
+        """
         # Create transcription tier full audio duration
-        duration = librosa.get_duration(path=audio_in, sr=None)
+        duration = audio_duration(audio_in)
         transcription_interval = tgt.core.Interval(0, duration, transcription)
         transcription_tier = tgt.core.IntervalTier(start_time=0, end_time=duration, name=textgrid_tier_name)
         transcription_tier.add_annotation(transcription_interval)
@@ -222,6 +683,42 @@ class TextGridContainer:
 
         return cls(text_grid=textgrid)
 
+    @classmethod
+    def _from_segment_transcriptions(
+        cls,
+        audio_in: str | os.PathLike[str] | DecodedAudio,
+        textgrid_tier_name: str,
+        segments: list[TranscriptionSegment],
+        add_phones: bool,
+        phone_tier_name: str,
+    ) -> "TextGridContainer":
+        """Build a TextGrid with one transcription interval per segment and optional phone tier.
+
+        Args:
+            audio_in: Path to the audio file, or audio decoded from it.
+            textgrid_tier_name: Name for the transcription tier.
+            segments: Transcribed segments in time order.
+            add_phones: If True, also create a phone alignment tier.
+            phone_tier_name: Name for the phone alignment tier.
+
+        Returns:
+            A new TextGridContainer with transcription tier (and optionally phone tier).
+        """
+        duration = audio_duration(audio_in)
+        transcription_tier = tgt.core.IntervalTier(start_time=0, end_time=duration, name=textgrid_tier_name)
+        for segment in segments:
+            start, end = segment.timestamp
+            transcription_tier.add_annotation(tgt.core.Interval(start, min(end, duration), segment.text))
+        textgrid = tgt.core.TextGrid()
+        textgrid.add_tier(transcription_tier)
+
+        if add_phones:
+            chunks = [chunk for segment in segments for chunk in segment.chunks]
+            phone_tier = cls._create_interval_tier_from_chunks(chunks, phone_tier_name)
+            textgrid.add_tier(phone_tier)
+
+        return cls(text_grid=textgrid)
+
     @classmethod
     def from_audio_and_transcription(
         cls,
@@ -246,7 +743,7 @@ class TextGridContainer:
         if audio_in is None or transcription is None:
             return cls(text_grid=tgt.core.TextGrid())
 
-        duration = librosa.get_duration(path=audio_in, sr=None)
+        duration = audio_duration(audio_in)
 
         annotation = tgt.core.Interval(0, duration, transcription)
         transcription_tier = tgt.core.IntervalTier(start_time=0, end_time=duration, name=textgrid_tier_name)
@@ -265,13 +762,17 @@ class TextGridContainer:
         asr_pipeline: ASRPipeline,
         add_phones: bool = False,
         phone_tier_name: str = "phone",
+        batch_size: int = 1,
+        max_batch_samples: int | None = None,
+        full_pass: bool = False,
     ) -> "TextGridContainer":
         """Create a TextGrid with ASR predictions for each interval in a source tier.
 
         Reads an existing TextGrid, extracts audio segments corresponding to each
         non-empty interval in the source tier, runs ASR on each segment, and adds
         the predictions to a new target tier. Optionally also creates a phone
-        alignment tier. The original tiers are preserved.
+        alignment tier. The original tiers are preserved. The audio file is opened
+        once for all intervals with ASRPipeline.open_for_intervals.
 
         Args:
             audio_in: Path to the audio file.
@@ -281,6 +782,15 @@ class TextGridContainer:
             asr_pipeline: ASRPipeline for predicting transcriptions.
             add_phones: If True, also create a phone alignment tier. Defaults to False.
             phone_tier_name: Name for the phone alignment tier. Defaults to "phone".
+            batch_size: Number of intervals to predict together. Intervals are sorted by duration first,
+                so each batch holds intervals of similar duration. Defaults to 1, which predicts intervals
+                one at a time.
+            max_batch_samples: Optional budget of padded samples per batch at the ASRPipeline's sampling rate.
+                Intervals are sorted by duration and grouped under this budget instead of by batch_size.
+            full_pass: If True, run the model once over the whole audio file and decode each interval from the
+                model outputs between its start and end, with ASRPipeline.predict_intervals. This is faster for
+                source tiers that cover most of the file and lets the model hear the audio around each interval.
+                If the pass over the whole file fails, intervals are predicted on their own. Defaults to False.
 
         Returns:
             A new TextGridContainer with all original tiers plus the new target tier
@@ -291,7 +801,9 @@ class TextGridContainer:
 
         Note:
             If ASR fails for an interval, the error message is added to that interval
-            in the target tier with the format "[Error]: {error_message}".
+            in the target tier with the format "[Error]: {error_message}". If a batch
+            fails, its intervals are predicted one at a time so errors stay with the
+            interval that caused them.
         """
         if audio_in is None:
             raise TypeError("Missing audio file")
@@ -302,46 +814,33 @@ class TextGridContainer:
         tier = source_tg.get_tier_by_name(source_tier)
         ipa_tier = tgt.core.IntervalTier(name=target_tier)
 
-        all_phone_chunks = []
-
-        for i, interval in enumerate(tier.intervals, start=1):
-            start, end = interval.start_time, interval.end_time
+        intervals = [(interval.start_time, interval.end_time) for interval in tier.intervals]
+        with ExitStack() as stack:
             try:
-                if add_phones:
-                    transcription_with_timestamps = asr_pipeline.predict_with_timestamps(audio_in, (start, end))
-                    prediction = transcription_with_timestamps.text
-
-                    for chunk in transcription_with_timestamps.chunks:
-                        chunk_start, chunk_end = chunk.timestamp
-                        adjusted_chunk = TranscriptionChunk(
-                            text=chunk.text,
-                            timestamp=(start + chunk_start, start + chunk_end),
-                        )
-                        all_phone_chunks.append(adjusted_chunk)
-
-                else:
-                    prediction = asr_pipeline.predict(audio_in, (start, end))
-
-                ipa_tier.add_annotation(tgt.core.Interval(start, end, prediction))
-            except RuntimeError as e:
-                logger.warning(
-                    "Interval is likely too short to transcribe and will be excluded. RuntimeError during transcription of interval %s in %s: %s",
-                    i,
-                    audio_in,
-                    e,
-                )
-
+                audio = stack.enter_context(asr_pipeline.open_for_intervals(audio_in, intervals))
             except Exception as e:
-                logger.warning(
-                    "Error during transcription of interval %s in %s: %s",
-                    i,
-                    audio_in,
-                    e,
+                # Read each interval from the path instead, so errors are reported per interval
+                logger.warning("Error opening %s: %s", audio_in, e)
+                audio = audio_in
+            results = None
+            if full_pass:
+                results = cls._predict_intervals_full_pass(audio, audio_in, intervals, asr_pipeline, add_phones)
+            if results is None and batch_size <= 1 and max_batch_samples is None:
+                results = [
+                    cls._predict_interval(audio, audio_in, i, interval, asr_pipeline, add_phones)
+                    for i, interval in enumerate(intervals, start=1)
+                ]
+            elif results is None:
+                results = cls._predict_intervals_batched(
+                    audio, audio_in, intervals, asr_pipeline, add_phones, batch_size, max_batch_samples
                 )
-                error_message = f"[Error]: {e}"
-                ipa_tier.add_annotation(tgt.core.Interval(start, end, error_message))
-                if add_phones:
-                    all_phone_chunks.append(TranscriptionChunk(error_message, (start, end)))
+
+        all_phone_chunks = []
+        for (start, end), (prediction, chunks) in zip(intervals, results):
+            if prediction is None:
+                continue
+            ipa_tier.add_annotation(tgt.core.Interval(start, end, prediction))
+            all_phone_chunks.extend(chunks)
 
         # Add interval tier
         source_tg.add_tier(ipa_tier)
@@ -353,3 +852,143 @@ class TextGridContainer:
             source_tg.add_tier(phone_tier)
 
         return cls(text_grid=source_tg)
+
+    @staticmethod
+    def _predict_interval(
+        audio: AudioSource,
+        audio_in: str | os.PathLike[str],
+        number: int,
+        interval: tuple[float, float],
+        asr_pipeline: ASRPipeline,
+        add_phones: bool,
+    ) -> tuple[str | None, list[TranscriptionChunk]]:
+        """Predict one interval of the audio.
+
+        Returns:
+            The transcription, or None if the interval is too short to transcribe, and the phone chunks
+            with timestamps from the start of the audio
+        """
+        start, end = interval
+        try:
+            if add_phones:
+                transcription_with_timestamps = asr_pipeline.predict_with_timestamps(audio, interval)
+                return transcription_with_timestamps.text, _shift_chunks(transcription_with_timestamps.chunks, start)
+            return asr_pipeline.predict(audio, interval), []
+        except RuntimeError as e:
+            logger.warning(
+                "Interval is likely too short to transcribe and will be excluded. RuntimeError during transcription of interval %s in %s: %s",
+                number,
+                audio_in,
+                e,
+            )
+            return None, []
+        except Exception as e:
+            logger.warning(
+                "Error during transcription of interval %s in %s: %s",
+                number,
+                audio_in,
+                e,
+            )
+            error_message = f"[Error]: {e}"
+            return error_message, [TranscriptionChunk(error_message, (start, end))] if add_phones else []
+
+    @classmethod
+    def _predict_intervals_full_pass(
+        cls,
+        audio: AudioSource,
+        audio_in: str | os.PathLike[str],
+        intervals: list[tuple[float, float]],
+        asr_pipeline: ASRPipeline,
+        add_phones: bool,
+    ) -> list[tuple[str | None, list[TranscriptionChunk]]] | None:
+        """Predict intervals of the audio from one pass over the whole file, with the same results as
+        _predict_interval.
+
+        Intervals too short for the model are predicted on their own, so they are excluded as they would be
+        without the full pass.
+
+        Returns:
+            Results for each interval, or None if the pass over the whole file failed
+        """
+        long_enough = [i for i, (start, end) in enumerate(intervals) if end - start >= MIN_BATCHED_INTERVAL_S]
+        try:
+            segments = asr_pipeline.predict_intervals(audio, [intervals[i] for i in long_enough])
+        except Exception as e:
+            logger.warning(
+                "Error during transcription of %s in one pass, transcribing intervals individually: %s", audio_in, e
+            )
+            return None
+
+        results = [None] * len(intervals)
+        for i, segment in zip(long_enough, segments):
+            results[i] = (segment.text, segment.chunks if add_phones else [])
+        return [
+            result
+            if result is not None
+            else cls._predict_interval(audio, audio_in, i, intervals[i - 1], asr_pipeline, add_phones)
+            for i, result in enumerate(results, start=1)
+        ]
+
+    @classmethod
+    def _predict_intervals_batched(
+        cls,
+        audio: AudioSource,
+        audio_in: str | os.PathLike[str],
+        intervals: list[tuple[float, float]],
+        asr_pipeline: ASRPipeline,
+        add_phones: bool,
+        batch_size: int,
+        max_batch_samples: int | None,
+    ) -> list[tuple[str | None, list[TranscriptionChunk]]]:
+        """Predict intervals of the audio in batches of similar duration, with the same results as _predict_interval.
+
+        Intervals too short for the model and the intervals of a failed batch are predicted one at a time,
+        so they are excluded or get their error message as they would without batching.
+        """
+        lengths = [round((end - start) * asr_pipeline.sampling_rate) for start, end in intervals]
+        min_length = MIN_BATCHED_INTERVAL_S * asr_pipeline.sampling_rate
+        batchable = [i for i, length in enumerate(lengths) if length >= min_length]
+        if max_batch_samples is not None:
+            batches = bucket_by_length([lengths[i] for i in batchable], max_batch_samples)
+        else:
+            batchable.sort(key=lambda i: lengths[i], reverse=True)
+            batches = fixed_size_batches(len(batchable), batch_size)
+        batches = [[batchable[j] for j in batch] for batch in batches]
+
+        results = [None] * len(intervals)
+        for batch in batches:
+            batch_intervals = [intervals[i] for i in batch]
+            try:
+                if add_phones:
+                    predictions = asr_pipeline.predict_batch_with_timestamps([audio] * len(batch), batch_intervals)
+                    batch_results = [
+                        (p.text, _shift_chunks(p.chunks, start)) for p, (start, _) in zip(predictions, batch_intervals)
+                    ]
+                else:
+                    batch_results = [
+                        (text, []) for text in asr_pipeline.predict_batch([audio] * len(batch), batch_intervals)
+                    ]
+            except Exception as e:
+                logger.warning(
+                    "Error during batch transcription of intervals in %s, transcribing them individually: %s",
+                    audio_in,
+                    e,
+                )
+                continue
+            for i, result in zip(batch, batch_results):
+                results[i] = result
+
+        return [
+            result
+            if result is not None
+            else cls._predict_interval(audio, audio_in, i, intervals[i - 1], asr_pipeline, add_phones)
+            for i, result in enumerate(results, start=1)
+        ]
+
+
+def _shift_chunks(chunks: list[TranscriptionChunk], offset: float) -> list[TranscriptionChunk]:
+    """Chunks with timestamps relative to an interval start moved to be relative to the start of the audio."""
+    return [
+        TranscriptionChunk(text=chunk.text, timestamp=(offset + chunk.timestamp[0], offset + chunk.timestamp[1]))
+        for chunk in chunks
+    ]
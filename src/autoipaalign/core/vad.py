@@ -0,0 +1,159 @@
+"""Energy-based voice activity detection for skipping silence before inference.
+
+Audio is split into 10 ms frames, and each frame's energy and zero-crossing rate are computed
+with NumPy. A frame is speech if its energy is well above the recording's noise floor, which is
+estimated from its quietest frames, or if it is at least half as far above the noise floor with
+the high zero-crossing rate of fricatives. Broadband noise also has a high zero-crossing rate, so
+fricatives must still be clearly louder than the noise. The threshold only depends on the noise
+floor, so speech is found as well in noisy field recordings as in quiet ones, except that to avoid
+keeping low noise in recordings with stretches of digital silence, it is never more than
+SILENCE_BELOW_PEAK_DB below the loudest frame. A recording whose loudest frame is within the
+threshold of its noise floor has no speech.
+
+Runs of speech frames separated by short pauses are merged, very short runs are dropped as
+clicks, and regions are padded on both sides so the model hears the onset and release of each
+sound. The result is detected speech regions in samples, aligned to the model's frame size so
+that model outputs for each region line up with the frames of the whole recording.
+"""
+
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+FRAME_LENGTH_S = 0.01
+"""Length of the frames whose energy and zero-crossing rate are compared to the thresholds."""
+
+NOISE_FLOOR_PERCENTILE = 10
+"""Percentile of frame energies taken as the noise floor of a recording."""
+
+SILENCE_BELOW_PEAK_DB = 60.0
+"""Frames more than this many decibels below the loudest frame are never speech."""
+
+MIN_SPEECH_DB = -80.0
+"""Frames quieter than this, relative to full scale, are never speech."""
+
+FRICATIVE_ZERO_CROSSING_RATE = 0.25
+"""Fraction of samples with a sign change above which a moderately loud frame is taken as a fricative."""
+
+
+@dataclass
+class VadStats:
+    """Running totals of audio seen and audio skipped as silence by voice activity detection."""
+
+    num_inputs: int = 0
+    """Number of audio inputs checked for speech."""
+
+    total_samples: int = 0
+    """Number of audio samples checked."""
+
+    speech_samples: int = 0
+    """Number of audio samples in detected speech regions, which are run through the model."""
+
+    def add(self, total_samples: int, speech_samples: int):
+        """Record one audio input."""
+        self.num_inputs += 1
+        self.total_samples += total_samples
+        self.speech_samples += speech_samples
+
+    def merge(self, other: "VadStats"):
+        """Add the totals of another VadStats, such as one kept by a worker process."""
+        self.num_inputs += other.num_inputs
+        self.total_samples += other.total_samples
+        self.speech_samples += other.speech_samples
+
+    @property
+    def skipped_fraction(self) -> float:
+        """Fraction of audio that was not run through the model."""
+        if self.total_samples == 0:
+            return 0.0
+        return 1 - self.speech_samples / self.total_samples
+
+    def __str__(self) -> str:
+        return f"{self.num_inputs} inputs, skipped {self.skipped_fraction:.1%} of audio as silence"
+
+
+def speech_regions(
+    y: np.ndarray,
+    sampling_rate: int,
+    threshold_db: float = 12.0,
+    min_silence_s: float = 0.5,
+    min_speech_s: float = 0.1,
+    pad_s: float = 0.2,
+    align_to: int = 1,
+    max_length: int | None = None,
+) -> list[tuple[int, int]]:
+    """Find the regions of an audio array that contain speech.
+
+    Args:
+        y: Mono audio array
+        sampling_rate: Sampling rate of the audio
+        threshold_db: Decibels above the noise floor for a frame to be speech
+        min_silence_s: Pauses shorter than this are kept as part of the surrounding speech region
+        min_speech_s: Speech regions shorter than this, before padding, are dropped
+        pad_s: Seconds of audio added before and after each region
+        align_to: Region boundaries are rounded out to multiples of this number of samples,
+            such as the number of samples per model output frame
+        max_length: Optional maximum region length in samples. Longer regions are split into
+            pieces of at most this length, which should be a multiple of align_to.
+
+    Returns:
+        (start, end) sample offsets of each speech region, in time order and not overlapping
+    """
+    frame_length = max(int(round(FRAME_LENGTH_S * sampling_rate)), 1)
+    num_frames = len(y) // frame_length
+    if num_frames == 0:
+        return []
+
+    frames = y[: num_frames * frame_length].reshape(num_frames, frame_length)
+    energy_db = 10 * np.log10(np.mean(np.square(frames), axis=1, dtype=np.float64) + 1e-10)
+    signs = np.signbit(frames)
+    zero_crossing_rate = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    noise_floor_db = np.percentile(energy_db, NOISE_FLOOR_PERCENTILE)
+    peak_db = energy_db.max()
+    if peak_db - noise_floor_db < threshold_db:
+        # Steady noise or silence throughout
+        return []
+    threshold = max(noise_floor_db + threshold_db, peak_db - SILENCE_BELOW_PEAK_DB)
+    # At least threshold_db / 2 above the noise floor, so noise isn't taken for fricatives
+    is_speech = (energy_db > threshold) | (
+        (energy_db > threshold - threshold_db / 2) & (zero_crossing_rate > FRICATIVE_ZERO_CROSSING_RATE)
+    )
+    is_speech &= energy_db > MIN_SPEECH_DB
+
+    edges = np.diff(is_speech.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_silence_frames = min_silence_s / FRAME_LENGTH_S
+    min_speech_frames = min_speech_s / FRAME_LENGTH_S
+    merged = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if merged and start - merged[-1][1] < min_silence_frames:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = int(round(pad_s * sampling_rate))
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech_frames:
+            continue
+        start = max(start * frame_length - pad, 0) // align_to * align_to
+        end = min(math.ceil(min(end * frame_length + pad, len(y)) / align_to) * align_to, len(y))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    if max_length is not None:
+        regions = [piece for start, end in regions for piece in _split_evenly(start, end, max_length, align_to)]
+    return regions
+
+
+def _split_evenly(start: int, end: int, max_length: int, align_to: int) -> list[tuple[int, int]]:
+    """Split a region into the fewest pieces of about equal length, aligned to align_to, of at most max_length."""
+    num_pieces = math.ceil((end - start) / max_length)
+    piece_length = math.ceil((end - start) / num_pieces / align_to) * align_to
+    return [(s, min(s + piece_length, end)) for s in range(start, end, piece_length)]
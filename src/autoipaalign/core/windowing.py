@@ -0,0 +1,113 @@
+"""Overlapping windows for transcribing long audio in pieces.
+
+Long recordings are split into fixed-length windows that overlap their neighbours by a
+stride on each side. Each window is run through the model on its own, and only the CTC
+frames outside the strides are kept, so every frame of the recording is taken from the
+window where it has the most acoustic context on both sides. This follows the chunking
+approach of the transformers automatic speech recognition pipeline, see
+https://huggingface.co/blog/asr-chunking.
+
+Window boundaries are aligned to the number of audio samples per CTC frame, so kept frames
+from consecutive windows line up exactly and timestamps stay correct across windows.
+"""
+
+from dataclasses import dataclass
+import math
+
+
+@dataclass(frozen=True)
+class AudioWindow:
+    """A window of audio with the strides whose model outputs are discarded. All values are in samples."""
+
+    start: int
+    """Offset of the first sample of the window."""
+
+    end: int
+    """Offset one past the last sample of the window."""
+
+    stride_left: int
+    """Number of samples at the start of the window whose outputs come from the previous window."""
+
+    stride_right: int
+    """Number of samples at the end of the window whose outputs come from the next window."""
+
+    @property
+    def keep_start(self) -> int:
+        """Offset of the first sample whose outputs are kept from this window."""
+        return self.start + self.stride_left
+
+    @property
+    def keep_end(self) -> int:
+        """Offset one past the last sample whose outputs are kept from this window."""
+        return self.end - self.stride_right
+
+
+def window_lengths_in_samples(
+    chunk_length_s: float,
+    stride_length_s: float | None,
+    sampling_rate: int,
+    align_to: int = 1,
+) -> tuple[int, int]:
+    """Convert window and stride lengths in seconds to samples, rounded to a multiple of align_to.
+
+    Args:
+        chunk_length_s: Length of each window in seconds
+        stride_length_s: Length of the overlap on each side of a window in seconds.
+            Defaults to chunk_length_s / 6 if None.
+        sampling_rate: Sampling rate of the audio
+        align_to: Number of audio samples per model output frame
+
+    Returns:
+        Tuple of (window length, stride length) in samples
+
+    Raises:
+        ValueError: If the strides take up the whole window
+    """
+    if stride_length_s is None:
+        stride_length_s = chunk_length_s / 6
+    chunk_length = int(round(chunk_length_s * sampling_rate / align_to)) * align_to
+    stride_length = int(round(stride_length_s * sampling_rate / align_to)) * align_to
+    if chunk_length <= 2 * stride_length:
+        raise ValueError(f"Chunk length {chunk_length_s}s must be more than twice the stride length {stride_length_s}s")
+    return chunk_length, stride_length
+
+
+def compute_windows(num_samples: int, chunk_length: int, stride_length: int) -> list[AudioWindow]:
+    """Split audio into overlapping windows whose kept regions cover the audio exactly once.
+
+    The first window has no left stride and the last window has no right stride.
+
+    Args:
+        num_samples: Total length of the audio in samples
+        chunk_length: Length of each window in samples
+        stride_length: Length of the overlap on each side of a window in samples
+
+    Returns:
+        Windows in time order. Audio no longer than chunk_length is a single window.
+    """
+    if num_samples <= 0:
+        return []
+    step = chunk_length - 2 * stride_length
+    if step <= 0:
+        raise ValueError(f"Chunk length {chunk_length} must be more than twice the stride length {stride_length}")
+
+    windows = []
+    for start in range(0, num_samples, step):
+        end = min(start + chunk_length, num_samples)
+        is_last = end >= num_samples
+        windows.append(
+            AudioWindow(
+                start=start,
+                end=end,
+                stride_left=0 if start == 0 else stride_length,
+                stride_right=0 if is_last else stride_length,
+            )
+        )
+        if is_last:
+            break
+    return windows
+
+
+def num_frames(num_samples: int, align_to: int) -> int:
+    """Number of model output frames that start within num_samples audio samples."""
+    return math.ceil(num_samples / align_to)
@@ -5,11 +5,10 @@ import tempfile
 import gradio as gr
 
 from autoipaalign.core.textgrid_io import TextGridContainer, write_textgrids_to_target
-from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.speech_recognition import ASRPipeline, DEFAULT_MODEL, VALID_MODELS
 
 # Constants
 TEXTGRID_DIR = tempfile.mkdtemp()
-DEFAULT_MODEL = "ginic/full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa"
 TEXTGRID_DOWNLOAD_TEXT = "Download TextGrid file"
 TEXTGRID_NAME_INPUT_LABEL = "TextGrid file name"
 
@@ -46,43 +45,9 @@ UMASS_MAROON = gr.themes.Color(
 THEME = gr.themes.Default(primary_hue=UMASS_MAROON)
 
 
-# Selection of models
-VALID_MODELS = [
-    "ctaguchi/wav2vec2-large-xlsr-japlmthufielta-ipa1000-ns",
-    "excalibur12/wav2vec2-large-lv60_phoneme-timit_english_timit-4k",
-    "excalibur12/wav2vec2-large-lv60_phoneme-timit_english_timit-4k_simplified",
-    "ginic/full_dataset_train_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/full_dataset_train_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/full_dataset_train_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/full_dataset_train_4_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/full_dataset_train_5_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/data_seed_bs64_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/data_seed_bs64_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/data_seed_bs64_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/data_seed_bs64_4_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_30_female_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_30_female_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_30_female_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_30_female_4_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_30_female_5_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_70_female_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_70_female_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_70_female_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_70_female_4_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/gender_split_70_female_5_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_old_only_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_old_only_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_old_only_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_young_only_1_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_young_only_2_wav2vec2-large-xlsr-53-buckeye-ipa",
-    "ginic/vary_individuals_young_only_3_wav2vec2-large-xlsr-53-buckeye-ipa",
-]
-
-
 def load_model_and_predict_full_audio(
     model_name: str,
     audio_in: str,
-    model_state: dict,
     tier_name: str,
     add_phones: bool,
     phone_tier_name: str,
@@ -90,17 +55,14 @@ def load_model_and_predict_full_audio(
     """Load model and predict transcription for full audio with optional phone alignments."""
     try:
         if audio_in is None:
-            return "", "", model_state
+            return "", ""
 
-        if model_state["model_name"] != model_name:
-            model_state = {
-                "asr_pipeline": ASRPipeline(model_name=model_name),
-                "model_name": model_name,
-            }
+        # Models are shared through the model registry, so this only loads the model the first time
+        asr_pipeline = ASRPipeline(model_name=model_name)
 
         # Use TextGridContainer to create TextGrid with optional phone alignments
         tg_container = TextGridContainer.from_audio_with_predict_transcription(
-            audio_in, tier_name, model_state["asr_pipeline"], add_phones=add_phones, phone_tier_name=phone_tier_name
+            audio_in, tier_name, asr_pipeline, add_phones=add_phones, phone_tier_name=phone_tier_name
         )
 
         # Extract the transcription text from the first tier for display
@@ -109,7 +71,7 @@ def load_model_and_predict_full_audio(
 
         textgrid_contents = tg_container.export_to_long_textgrid_str()
 
-        return prediction, textgrid_contents, model_state
+        return prediction, textgrid_contents
     except Exception as e:
         raise gr.Error(f"Failed to load model: {str(e)}")
 
@@ -132,21 +94,12 @@ def get_interactive_download_button(textgrid_contents, textgrid_filename):
     )
 
 
-def transcribe_intervals(
-    model_name, audio_in, textgrid_path, source_tier, target_tier, model_state, add_phones, phone_tier_name
-):
+def transcribe_intervals(model_name, audio_in, textgrid_path, source_tier, target_tier, add_phones, phone_tier_name):
     if audio_in is None or textgrid_path is None:
-        return "Missing audio or TextGrid input file.", model_state
+        return "Missing audio or TextGrid input file."
 
-    # Check if correct model is loaded, reload if necessary
-    if model_state["model_name"] != model_name:
-        model_state = {
-            "asr_pipeline": ASRPipeline(model_name=model_name),
-            "model_name": model_name,
-        }
-
-    # Reuse the ASRPipeline from model_state (efficient if model unchanged)
-    asr_pipeline = model_state["asr_pipeline"]
+    # Models are shared through the model registry, so this only loads the model the first time
+    asr_pipeline = ASRPipeline(model_name=model_name)
 
     tg_container = TextGridContainer.from_textgrid_with_predict_intervals(
         audio_in,
@@ -158,7 +111,7 @@ def transcribe_intervals(
         phone_tier_name=phone_tier_name,
     )
 
-    return tg_container.export_to_long_textgrid_str(), model_state
+    return tg_container.export_to_long_textgrid_str()
 
 
 def extract_tier_names(textgrid_file):
@@ -185,17 +138,13 @@ def validate_textgrid_for_intervals(audio_path, textgrid_file):
         raise gr.Error(f"Invalid TextGrid or audio file:\n{str(e)}")
 
 
-def transcribe_multiple_files(model_name, audio_files, model_state, tier_name, add_phones, phone_tier_name):
+def transcribe_multiple_files(model_name, audio_files, tier_name, add_phones, phone_tier_name):
     try:
         if not audio_files:
-            return [], None, model_state
+            return [], None
 
-        # Check if correct model is loaded, reload if necessary
-        if model_state["model_name"] != model_name:
-            model_state = {
-                "asr_pipeline": ASRPipeline(model_name=model_name),
-                "model_name": model_name,
-            }
+        # Models are shared through the model registry, so this only loads the model the first time
+        asr_pipeline = ASRPipeline(model_name=model_name)
 
         table_data = []
         text_grids = []
@@ -204,7 +153,7 @@ def transcribe_multiple_files(model_name, audio_files, model_state, tier_name, a
         for file in audio_files:
             # Use TextGridContainer to create TextGrid with optional phone alignments
             tg_container = TextGridContainer.from_audio_with_predict_transcription(
-                file, tier_name, model_state["asr_pipeline"], add_phones=add_phones, phone_tier_name=phone_tier_name
+                file, tier_name, asr_pipeline, add_phones=add_phones, phone_tier_name=phone_tier_name
             )
 
             # Extract transcription for table display
@@ -219,17 +168,15 @@ def transcribe_multiple_files(model_name, audio_files, model_state, tier_name, a
         zip_path = Path(tempfile.mkdtemp()) / "textgrids.zip"
         write_textgrids_to_target(audio_paths, text_grids, zip_path, is_zip=True, is_overwrite=True)
 
-        return table_data, str(zip_path), model_state
+        return table_data, str(zip_path)
 
     except Exception as e:
         raise gr.Error(f"Transcription failed: {str(e)}")
 
 
 def launch_demo():
-    initial_model = {
-        "asr_pipeline": ASRPipeline(model_name=DEFAULT_MODEL),
-        "model_name": DEFAULT_MODEL,
-    }
+    # Load the default model before the first request
+    ASRPipeline(model_name=DEFAULT_MODEL).load()
 
     with gr.Blocks(title=TITLE, theme=THEME) as demo:
         gr.Markdown(INTRO_BLOCK)
@@ -252,8 +199,6 @@ def launch_demo():
 
         phone_aligned = gr.Checkbox(label="Add forced-alignments for predictions in their own TextGrid")
 
-        model_state = gr.State(value=initial_model)
-
         # Full audio transcription section
         with gr.Column(visible=False) as full_audio_section:
             full_audio = gr.Audio(type="filepath", show_download_button=True, label="Upload Audio File")
@@ -343,8 +288,8 @@ def launch_demo():
         # Full transcription logic
         full_transcribe_btn.click(
             fn=load_model_and_predict_full_audio,
-            inputs=[model_name, full_audio, model_state, full_textgrid_tier, phone_aligned, full_alignment_tier],
-            outputs=[full_prediction, full_textgrid_contents, model_state],
+            inputs=[model_name, full_audio, full_textgrid_tier, phone_aligned, full_alignment_tier],
+            outputs=[full_prediction, full_textgrid_contents],
         )
 
         full_textgrid_contents.change(
@@ -388,11 +333,10 @@ def launch_demo():
                 interval_textgrid_file,
                 tier_names,
                 target_tier,
-                model_state,
                 phone_aligned,
                 interval_alignment_tier,
             ],
-            outputs=[interval_result, model_state],
+            outputs=[interval_result],
         )
 
         interval_result.change(
@@ -428,12 +372,11 @@ def launch_demo():
             inputs=[
                 model_name,
                 multiple_full_audio,
-                model_state,
                 multiple_full_textgrid_tier,
                 phone_aligned,
                 multiple_alignment_tier,
             ],
-            outputs=[multiple_full_table, multiple_full_zip_download_btn, model_state],
+            outputs=[multiple_full_table, multiple_full_zip_download_btn],
         )
 
         multiple_full_reset_btn.click(
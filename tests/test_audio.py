@@ -0,0 +1,135 @@
+"""Unit tests for audio module"""
+
+import librosa
+import numpy as np
+import pytest
+import soundfile
+
+from autoipaalign.core import audio
+from autoipaalign.core.audio import (
+    AudioFile,
+    DecodedAudio,
+    audio_duration,
+    decode_audio,
+    load_audio,
+    open_for_intervals,
+)
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.textgrid_io import TextGridContainer
+
+
+@pytest.fixture
+def audio_path(shared_datadir):
+    return shared_datadir / "test1.wav"
+
+
+def test_load_audio_matches_librosa(audio_path):
+    """Test files at the target sampling rate are read without resampling, as librosa would read them"""
+    expected, _ = librosa.load(audio_path, sr=16000)
+    np.testing.assert_array_equal(load_audio(audio_path, 16000), expected)
+
+
+def test_load_audio_interval_matches_librosa(audio_path):
+    """Test intervals are read by seeking to the same samples librosa reads"""
+    expected, _ = librosa.load(audio_path, sr=16000, offset=0.51, duration=1.2)
+    np.testing.assert_array_equal(load_audio(audio_path, 16000, (0.51, 1.71)), expected)
+
+
+def test_load_audio_resample(audio_path):
+    """Test resampling uses the chosen resampler"""
+    expected, _ = librosa.load(audio_path, sr=8000)
+    np.testing.assert_allclose(load_audio(audio_path, 8000), expected, atol=1e-6)
+
+    fast = load_audio(audio_path, 8000, resample_type="soxr_lq")
+    assert len(fast) == len(expected)
+    assert not np.array_equal(fast, expected)
+
+
+def test_load_audio_stereo_to_mono(audio_path, tmp_path):
+    """Test channels are averaged to mono"""
+    y, sr = soundfile.read(audio_path, dtype="float32")
+    stereo_path = tmp_path / "stereo.wav"
+    soundfile.write(stereo_path, np.stack([y, np.zeros_like(y)], axis=1), sr, subtype="FLOAT")
+
+    np.testing.assert_allclose(load_audio(stereo_path, sr), y / 2, atol=1e-7)
+
+
+def test_load_audio_falls_back_to_librosa(mocker, audio_path):
+    """Test formats soundfile can't read are decoded with librosa"""
+    mocker.patch(
+        "autoipaalign.core.audio.soundfile.SoundFile", side_effect=soundfile.LibsndfileError(1, "Unsupported format")
+    )
+    librosa_load = mocker.patch(
+        "autoipaalign.core.audio.librosa.load", return_value=(np.zeros((2, 8000), dtype=np.float32), 16000)
+    )
+    mocker.patch("autoipaalign.core.audio.librosa.get_duration", return_value=3.0)
+
+    audio = decode_audio(audio_path, 16000, (1.0, 1.5))
+
+    librosa_load.assert_called_once_with(audio_path, sr=None, mono=False, offset=1.0, duration=0.5)
+    assert audio.samples.shape == (8000,)
+    assert audio.native_duration == 3.0
+    assert audio.num_channels == 2
+
+
+def test_decode_audio_file_info(audio_path):
+    """Test decoded audio records the file's sampling rate, duration and channels"""
+    info = soundfile.info(audio_path)
+
+    audio = decode_audio(audio_path, 8000, (0.5, 1.0))
+
+    assert audio.sampling_rate == 8000
+    assert audio.native_sampling_rate == info.samplerate
+    assert audio.native_duration == info.frames / info.samplerate
+    assert audio.num_channels == 1
+    assert audio.duration == pytest.approx(0.5)
+    assert audio.path == audio_path
+    assert audio_duration(audio) == audio_duration(audio_path) == audio.native_duration
+
+
+def test_decoded_audio_interval_samples():
+    """Test intervals are sliced from the samples in seconds from the start of the decoded audio"""
+    audio = DecodedAudio(np.arange(100, dtype=np.float32), 10, 10, 10.0, 1)
+
+    np.testing.assert_array_equal(audio.interval_samples((2.0, 3.5)), np.arange(20, 35))
+    np.testing.assert_array_equal(audio.interval_samples(None), audio.samples)
+    assert len(audio.interval_samples((9.5, 12.0))) == 5
+
+
+def test_audio_file_reads_intervals(audio_path):
+    """Test intervals read by seeking in an open file are the same as intervals loaded on their own"""
+    with AudioFile(audio_path, 8000) as audio_file:
+        for interval in [(1.0, 1.5), (0.2, 0.4), (1.9, 2.5)]:
+            np.testing.assert_array_equal(audio_file.read(interval), load_audio(audio_path, 8000, interval))
+        assert audio_file.native_duration == soundfile.info(audio_path).duration
+
+
+def test_open_for_intervals_by_coverage(audio_path):
+    """Test sparse intervals are read by seeking and dense intervals from one decode of the file"""
+    with open_for_intervals(audio_path, [(0.1, 0.3), (1.0, 1.2)], 16000) as audio:
+        assert isinstance(audio, AudioFile)
+    with open_for_intervals(audio_path, [(0.0, 1.0), (1.0, 2.0)], 16000) as audio:
+        assert isinstance(audio, DecodedAudio)
+        np.testing.assert_array_equal(audio.interval_samples((1.0, 2.0)), load_audio(audio_path, 16000, (1.0, 2.0)))
+
+
+def test_transcription_decodes_file_once(mocker, audio_path):
+    """Test transcribing a file in windows and building its TextGrid opens the file once"""
+    ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0)
+    ctc.forward_batch.side_effect = lambda arrays: [np.ones(len(a) // 320, dtype=np.int64) for a in arrays]
+    ctc.collapse.side_effect = lambda token_ids: [len(ids) for ids in token_ids]
+    ctc.text.side_effect = lambda collapsed: f"{collapsed} frames"
+    ctc.chars.return_value = []
+    ctc.timestamps.return_value = []
+    mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(ctc, None, 0))
+    read_soundfile = mocker.patch("autoipaalign.core.audio._read_soundfile", wraps=audio._read_soundfile)
+    file_info = mocker.patch("autoipaalign.core.audio.soundfile.info", wraps=soundfile.info)
+    asr = ASRPipeline("test-model", engine="direct", chunk_length_s=1.0, batch_size=2)
+
+    tg = TextGridContainer.from_audio_with_predict_transcription(audio_path, "ipa", asr, add_phones=True)
+
+    read_soundfile.assert_called_once()
+    file_info.assert_not_called()
+    assert ctc.forward_batch.call_count > 1
+    assert tg.text_grid.get_tier_by_name("ipa").end_time == soundfile.info(audio_path).duration
@@ -0,0 +1,90 @@
+"""Unit tests for audio_cache module"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from autoipaalign.core import audio_cache
+from autoipaalign.core.audio import DecodedAudio, decode_audio
+from autoipaalign.core.audio_cache import AudioCache
+from autoipaalign.core.speech_recognition import ASRPipeline
+
+
+@pytest.fixture
+def audio_path(shared_datadir):
+    return shared_datadir / "test1.wav"
+
+
+def test_audio_cache_decodes_once(mocker, tmp_path, audio_path):
+    """Test a file is decoded once and read back memory-mapped with the same samples and file information"""
+    decode = mocker.patch("autoipaalign.core.audio_cache.decode_audio", wraps=audio_cache.decode_audio)
+    cache = AudioCache(tmp_path / "cache", max_bytes=10_000_000)
+
+    first = cache.decode(audio_path, 8000)
+    second = cache.decode(audio_path, 8000)
+
+    decode.assert_called_once_with(audio_path, 8000, resample_type="soxr_hq")
+    assert isinstance(second.samples, np.memmap)
+    np.testing.assert_array_equal(second.samples, decode_audio(audio_path, 8000).samples)
+    assert (second.native_sampling_rate, second.native_duration, second.num_channels, second.path) == (
+        first.native_sampling_rate,
+        first.native_duration,
+        first.num_channels,
+        audio_path,
+    )
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_audio_cache_key(tmp_path, audio_path):
+    """Test keys depend on the file's path, modification time and size and the decoding settings"""
+    cache = AudioCache(tmp_path / "cache", max_bytes=10_000_000)
+    copy_path = tmp_path / "copy.wav"
+    shutil.copy(audio_path, copy_path)
+
+    key = cache.key(copy_path, 16000, "soxr_hq")
+    assert cache.key(copy_path, 8000, "soxr_hq") != key
+    assert cache.key(copy_path, 16000, "soxr_lq") != key
+    assert cache.key(audio_path, 16000, "soxr_hq") != key
+    os.utime(copy_path, ns=(0, 0))
+    assert cache.key(copy_path, 16000, "soxr_hq") != key
+
+
+def test_audio_cache_evicts_least_recently_used(tmp_path):
+    """Test the oldest entries and their file information are deleted when the cache is over its size limit"""
+    cache = AudioCache(tmp_path, max_bytes=10_000_000)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, DecodedAudio(np.zeros(1000, dtype=np.float32), 16000, 16000, 1000 / 16000, 1))
+        os.utime(tmp_path / f"{key}.npy", ns=(i * 10**9, i * 10**9))
+    # Reading "a" makes it the most recently used
+    cache.get("a")
+    entry_size = (tmp_path / "a.npy").stat().st_size
+
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "a.npy", "c.json", "c.npy"]
+    assert cache.get("b") is None
+
+
+def test_asr_pipeline_reads_intervals_from_audio_cache(mocker, tmp_path, audio_path):
+    """Test a pipeline with an audio cache decodes a file once for all of its intervals"""
+    decode = mocker.patch("autoipaalign.core.audio_cache.decode_audio", wraps=audio_cache.decode_audio)
+    asr = ASRPipeline("test-model", engine="direct", audio_cache_dir=tmp_path / "cache")
+
+    first = asr._load(audio_path, (0.5, 1.0))
+    second = asr._load(audio_path, (1.0, 1.5))
+    with asr.open_for_intervals(audio_path, [(0.5, 1.0)]) as audio:
+        opened = audio.interval_samples((0.5, 1.0))
+
+    decode.assert_called_once()
+    np.testing.assert_array_equal(first, decode_audio(audio_path, 16000, (0.5, 1.0)).samples)
+    np.testing.assert_array_equal(second, decode_audio(audio_path, 16000, (1.0, 1.5)).samples)
+    np.testing.assert_array_equal(opened, first)
+
+
+def test_audio_cache_max_bytes_must_be_positive(tmp_path):
+    with pytest.raises(ValueError, match="must be positive"):
+        AudioCache(tmp_path, max_bytes=0)
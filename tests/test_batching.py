@@ -0,0 +1,81 @@
+"""Unit tests for batching module"""
+
+import pytest
+
+from autoipaalign.core.batching import PaddingStats, bucket_by_length, fixed_size_batches, restore_order
+
+
+def test_fixed_size_batches():
+    """Test items are grouped in input order"""
+    assert fixed_size_batches(5, 2) == [[0, 1], [2, 3], [4]]
+    assert fixed_size_batches(2, 0) == [[0], [1]]
+    assert fixed_size_batches(0, 4) == []
+
+
+def test_bucket_by_length_respects_budget():
+    """Test batches are sorted by length and padded size stays under the budget"""
+    lengths = [100, 1000, 120, 900, 110, 950]
+    batches = bucket_by_length(lengths, max_batch_samples=2000)
+
+    assert batches == [[1, 5], [3, 2], [4, 0]]
+    for batch in batches:
+        assert len(batch) * max(lengths[i] for i in batch) <= 2000
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+
+
+def test_bucket_by_length_long_item_alone():
+    """Test that an item longer than the budget gets its own batch"""
+    batches = bucket_by_length([50, 5000, 60], max_batch_samples=1000)
+    assert batches == [[1], [2, 0]]
+
+
+def test_bucket_by_length_max_batch_size():
+    """Test the optional cap on items per batch"""
+    batches = bucket_by_length([10, 10, 10, 10, 10], max_batch_samples=1000, max_batch_size=2)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_bucket_by_length_invalid_budget():
+    with pytest.raises(ValueError, match="must be positive"):
+        bucket_by_length([10], max_batch_samples=0)
+
+
+def test_restore_order():
+    """Test per-batch results go back to original item order"""
+    batches = [[1, 5], [3, 0, 4, 2]]
+    batch_results = [["b", "f"], ["d", "a", "e", "c"]]
+    assert restore_order(batches, batch_results) == ["a", "b", "c", "d", "e", "f"]
+
+
+def test_restore_order_mismatch():
+    with pytest.raises(ValueError, match="has 1 results"):
+        restore_order([[0, 1]], [["a"]])
+
+
+def test_padding_stats():
+    """Test padding efficiency across batches"""
+    stats = PaddingStats()
+    assert stats.efficiency == 1.0
+
+    stats.add_batch([100, 50])
+    stats.add_batch([30])
+    stats.add_batch([])
+
+    assert stats.num_batches == 2
+    assert stats.num_items == 3
+    assert stats.real_samples == 180
+    assert stats.padded_samples == 230
+    assert stats.efficiency == pytest.approx(180 / 230)
+    assert "padding efficiency 78.3%" in str(stats)
+
+
+def test_padding_stats_merge():
+    """Test totals of another PaddingStats are added"""
+    stats = PaddingStats()
+    stats.add_batch([100, 50])
+    other = PaddingStats()
+    other.add_batch([30])
+
+    stats.merge(other)
+
+    assert stats == PaddingStats(num_batches=2, num_items=3, real_samples=180, padded_samples=230)
@@ -1,12 +1,27 @@
 """Unit tests for CLI module"""
 
+from pathlib import Path
+import threading
+import time
 import zipfile
 
 import pytest
 import tgt.io3
-
-from autoipaalign.core.cli import Transcribe, TranscribeIntervals, OutputConfig
+import tyro
+
+from autoipaalign.core.audio import decode_audio
+from autoipaalign.core.cli import (
+    BenchmarkQuantization,
+    ExportOnnx,
+    Merge,
+    OutputConfig,
+    Transcribe,
+    TranscribeIntervals,
+    TranscribeSweep,
+)
+from autoipaalign.core.journal import journal_path
 from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.textgrid_io import TextGridContainer
 
 
 @pytest.fixture
@@ -14,7 +29,11 @@ def mock_asr_pipeline(mocker):
     """Create a mock ASR pipeline"""
     mock_pipeline = mocker.Mock(spec=ASRPipeline)
     mock_pipeline.model_name = "test-model"
+    mock_pipeline.batch_size = 1
+    mock_pipeline.max_batch_samples = None
+    mock_pipeline.logit_cache = None
     mock_pipeline._model_pipe = mocker.Mock()
+    mock_pipeline.decode.side_effect = lambda audio_path: decode_audio(audio_path, 16000)
     mock_pipeline.predict.return_value = "test transcription"
     return mock_pipeline
 
@@ -84,6 +103,214 @@ def test_transcribe_run_zip(mock_asr_pipeline, tmp_path, shared_datadir):
     assert tg.tiers[0].intervals[0].end_time == 2.2798125
 
 
+def test_transcribe_run_batched(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test Transcribe.run() with batch_size > 1 predicts files together"""
+    audio_paths = []
+    for name in ["a", "b", "c"]:
+        audio_path = tmp_path / f"{name}.wav"
+        audio_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+        audio_paths.append(audio_path)
+    mock_asr_pipeline.batch_size = 2
+    mock_asr_pipeline.predict_batch.side_effect = lambda audio: [f"transcription {a.path.stem}" for a in audio]
+    transcribe = Transcribe(
+        asr=mock_asr_pipeline,
+        audio_paths=audio_paths,
+        output_target=tmp_path / "output",
+        output=OutputConfig(transcription_tier_name="ipa"),
+    )
+
+    transcribe.run()
+
+    # Two batches: [a, b] and [c]
+    assert mock_asr_pipeline.predict_batch.call_count == 2
+    mock_asr_pipeline.predict.assert_not_called()
+
+    for name in ["a", "b", "c"]:
+        tg = tgt.io3.read_textgrid(tmp_path / "output" / f"{name}.TextGrid")
+        assert tg.tiers[0].intervals[0].text == f"transcription {name}"
+        assert tg.tiers[0].intervals[0].end_time == 2.2798125
+
+
+def test_transcribe_run_writes_each_file_when_transcribed(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test Transcribe.run() writes each TextGrid before transcribing the next file"""
+    audio_paths = []
+    for name in ["a", "b"]:
+        audio_path = tmp_path / f"{name}.wav"
+        audio_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+        audio_paths.append(audio_path)
+    output_target = tmp_path / "output"
+    written_before_predict = []
+
+    def predict(audio):
+        written_before_predict.append(sorted(p.name for p in output_target.glob("*.TextGrid")))
+        return "test transcription"
+
+    mock_asr_pipeline.predict.side_effect = predict
+    Transcribe(asr=mock_asr_pipeline, audio_paths=audio_paths, output_target=output_target).run()
+
+    assert written_before_predict == [[], ["a.TextGrid"]]
+    assert (output_target / "b.TextGrid").exists()
+
+
+def test_transcribe_run_manifest_and_directory(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test Transcribe.run() finds audio in directories and manifests and names and times TextGrids from the manifest"""
+    corpus = tmp_path / "corpus"
+    (corpus / "sub").mkdir(parents=True)
+    for name in ["a.wav", "sub/b.wav"]:
+        (corpus / name).write_bytes((shared_datadir / "test1.wav").read_bytes())
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("audio_path,output_name,start,end\ncorpus/a.wav,a_second,1.0,2.0\n")
+    mock_asr_pipeline.predict.side_effect = lambda audio, interval=None: f"{interval}"
+    output_target = tmp_path / "output"
+
+    Transcribe(
+        asr=mock_asr_pipeline, audio_paths=[corpus], manifest=manifest, output_target=output_target, input_block_size=2
+    ).run()
+
+    assert sorted(p.relative_to(output_target).as_posix() for p in output_target.rglob("*.TextGrid")) == [
+        "a.TextGrid",
+        "a_second.TextGrid",
+        "sub/b.TextGrid",
+    ]
+    tier = tgt.io3.read_textgrid(output_target / "a_second.TextGrid").get_tier_by_name("ipa")
+    assert [(i.start_time, i.end_time, i.text) for i in tier.intervals] == [(1.0, 2.0, "(1.0, 2.0)")]
+    assert tier.end_time == 2.2798125
+    tier = tgt.io3.read_textgrid(output_target / "sub" / "b.TextGrid").get_tier_by_name("ipa")
+    assert tier.intervals[0].text == "None"
+
+
+@pytest.mark.parametrize("zipped", [False, True])
+def test_transcribe_run_nested_files_with_the_same_name(mock_asr_pipeline, tmp_path, shared_datadir, zipped):
+    """Test files of the same name in different subdirectories are written to TextGrids at their relative paths"""
+    corpus = tmp_path / "corpus"
+    for name in ["dr1/spk1/sa1.wav", "dr2/spk2/sa1.wav"]:
+        (corpus / name).parent.mkdir(parents=True)
+        (corpus / name).write_bytes((shared_datadir / "test1.wav").read_bytes())
+    mock_asr_pipeline.predict.side_effect = lambda audio: audio.path.parent.name
+    output_target = tmp_path / ("output.zip" if zipped else "output")
+
+    Transcribe(asr=mock_asr_pipeline, audio_paths=[corpus], output_target=output_target, zipped=zipped).run()
+
+    extract_path = output_target
+    if zipped:
+        extract_path = tmp_path / "extract"
+        with zipfile.ZipFile(output_target) as zipf:
+            zipf.extractall(extract_path)
+    for name in ["dr1/spk1/sa1.TextGrid", "dr2/spk2/sa1.TextGrid"]:
+        tier = tgt.io3.read_textgrid(extract_path / name).get_tier_by_name("ipa")
+        assert tier.intervals[0].text == name.split("/")[1]
+
+
+def test_transcribe_run_same_output_name_fails(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test inputs that would write the same TextGrid stop the run instead of replacing it"""
+    for name in ["dr1/sa1.wav", "dr2/sa1.wav"]:
+        (tmp_path / name).parent.mkdir()
+        (tmp_path / name).write_bytes((shared_datadir / "test1.wav").read_bytes())
+
+    with pytest.raises(ValueError, match="sa1.TextGrid"):
+        Transcribe(
+            asr=mock_asr_pipeline, audio_paths=[tmp_path / "dr1", tmp_path / "dr2"], output_target=tmp_path / "output"
+        ).run()
+
+
+def test_transcribe_run_requires_inputs(mock_asr_pipeline, tmp_path):
+    with pytest.raises(ValueError, match="audio paths"):
+        Transcribe(asr=mock_asr_pipeline, output_target=tmp_path / "output").run()
+
+
+@pytest.mark.parametrize("zipped", [False, True])
+def test_transcribe_run_resume(mock_asr_pipeline, tmp_path, shared_datadir, zipped):
+    """Test Transcribe.run() with resume only transcribes files that were not finished with the same settings"""
+    audio_paths = []
+    for name in ["a", "b", "c"]:
+        audio_path = tmp_path / f"{name}.wav"
+        audio_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+        audio_paths.append(audio_path)
+    output_target = tmp_path / ("output.zip" if zipped else "output")
+    transcribed = []
+
+    def predict(audio):
+        transcribed.append(audio.path.stem)
+        return "test transcription"
+
+    mock_asr_pipeline.predict.side_effect = predict
+    Transcribe(
+        asr=mock_asr_pipeline, audio_paths=audio_paths[:2], output_target=output_target, zipped=zipped, resume=True
+    ).run()
+    # Changed audio is transcribed again
+    audio_paths[1].write_bytes(audio_paths[1].read_bytes() + b"\0\0")
+    transcribed.clear()
+
+    Transcribe(
+        asr=mock_asr_pipeline, audio_paths=audio_paths, output_target=output_target, zipped=zipped, resume=True
+    ).run()
+    assert transcribed == ["b", "c"]
+
+    # Files transcribed with other settings are transcribed again
+    transcribed.clear()
+    Transcribe(
+        asr=mock_asr_pipeline,
+        audio_paths=audio_paths,
+        output_target=output_target,
+        zipped=zipped,
+        output=OutputConfig(transcription_tier_name="other"),
+        resume=True,
+    ).run()
+    assert transcribed == ["a", "b", "c"]
+
+    if zipped:
+        with zipfile.ZipFile(output_target) as zipf:
+            names = zipf.namelist()
+    else:
+        names = [p.name for p in output_target.glob("*.TextGrid")]
+    assert sorted(names) == ["a.TextGrid", "b.TextGrid", "c.TextGrid"]
+
+
+@pytest.mark.parametrize("zipped", [False, True])
+def test_transcribe_run_without_resume_keeps_no_journal(mocker, mock_asr_pipeline, tmp_path, shared_datadir, zipped):
+    """Test a run without resume doesn't open a journal or leave one next to the output"""
+    completion_journal = mocker.patch("autoipaalign.core.cli.CompletionJournal")
+    output_target = tmp_path / ("output.zip" if zipped else "output")
+
+    Transcribe(
+        asr=mock_asr_pipeline, audio_paths=[shared_datadir / "test1.wav"], output_target=output_target, zipped=zipped
+    ).run()
+
+    completion_journal.assert_not_called()
+    assert not journal_path(output_target, zipped).exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data", output_target.name]
+
+
+def test_transcribe_run_shards_and_merge(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test shards transcribe disjoint inputs into their own targets, which merge combines"""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name in ["a", "b", "c"]:
+        (corpus / f"{name}.wav").write_bytes((shared_datadir / "test1.wav").read_bytes())
+    output_target = tmp_path / "output.zip"
+
+    for shard_index in range(2):
+        Transcribe(
+            asr=mock_asr_pipeline,
+            audio_paths=[corpus],
+            output_target=output_target,
+            zipped=True,
+            shard_index=shard_index,
+            num_shards=2,
+        ).run()
+    shard_targets = [tmp_path / "output.shard-0-of-2.zip", tmp_path / "output.shard-1-of-2.zip"]
+    shard_names = []
+    for shard_target in shard_targets:
+        with zipfile.ZipFile(shard_target) as zipf:
+            shard_names.append(zipf.namelist())
+    Merge(shard_targets=shard_targets, output_target=output_target, zipped=True).run()
+
+    assert mock_asr_pipeline.predict.call_count == 3
+    assert sorted(len(names) for names in shard_names) == [1, 2]
+    with zipfile.ZipFile(output_target) as zipf:
+        assert sorted(zipf.namelist()) == ["a.TextGrid", "b.TextGrid", "c.TextGrid"]
+
+
 def test_transcribe_intervals_run(mock_asr_pipeline, tmp_path, shared_datadir):
     """Test TranscribeIntervals.run()"""
     # Intervals predict one at a time
@@ -94,8 +321,8 @@ def test_transcribe_intervals_run(mock_asr_pipeline, tmp_path, shared_datadir):
     output_config = OutputConfig(transcription_tier_name="ipa")
     transcribe_intervals = TranscribeIntervals(
         asr=mock_asr_pipeline,
-        audio_path=audio_path,
-        textgrid_path=textgrid_path,
+        audio_paths=[audio_path],
+        textgrid_paths=[textgrid_path],
         output_target=tmp_path,
         source_tier="words",
         output=output_config,
@@ -131,8 +358,8 @@ def test_transcribe_intervals_run_error_handling(mock_asr_pipeline, tmp_path, mo
     output_config = OutputConfig(transcription_tier_name="ipa")
     transcribe_intervals = TranscribeIntervals(
         asr=mock_asr_pipeline,
-        audio_path=audio_path,
-        textgrid_path=textgrid_path,
+        audio_paths=[audio_path],
+        textgrid_paths=[textgrid_path],
         output_target=tmp_path,
         source_tier="words",
         output=output_config,
@@ -151,3 +378,176 @@ def test_transcribe_intervals_run_error_handling(mock_asr_pipeline, tmp_path, mo
     assert ipa_tier.start_time == 0
     assert ipa_tier.end_time == 2.273
     assert all("[Error]" in interval.text for interval in ipa_tier.intervals)
+
+
+def test_transcribe_intervals_run_pairs(mocker, mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test TranscribeIntervals.run() pairs audio and TextGrids by basename, and a failing pair doesn't stop others
+    but fails the run"""
+    audio_dir = tmp_path / "audio"
+    textgrid_dir = tmp_path / "textgrids"
+    audio_dir.mkdir()
+    textgrid_dir.mkdir()
+    for name in ["a", "b", "c"]:
+        (audio_dir / f"{name}.wav").write_bytes((shared_datadir / "test1.wav").read_bytes())
+    (textgrid_dir / "a.TextGrid").write_bytes((shared_datadir / "test1.TextGrid").read_bytes())
+    # b's TextGrid has no words tier, and c has no TextGrid
+    TextGridContainer.from_audio_and_transcription(audio_dir / "b.wav", "other", "").write_textgrid(
+        textgrid_dir, Path("b.wav")
+    )
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        '{"audio_path": "audio/c.wav", "textgrid_path": "textgrids/a.TextGrid", "output_name": "c_a"}\n'
+    )
+    output_target = tmp_path / "output"
+    mocker.patch("autoipaalign.core.cli.pipeline_settings", return_value={})
+    mocker.patch("autoipaalign.core.cli.ASRPipeline", return_value=mock_asr_pipeline)
+
+    with pytest.raises(RuntimeError, match="2 pairs: .*b.wav with .*b.TextGrid, .*c.wav, which has no TextGrid"):
+        TranscribeIntervals(
+            asr=mock_asr_pipeline,
+            audio_paths=[audio_dir],
+            textgrid_paths=[textgrid_dir],
+            manifest=manifest,
+            output_target=output_target,
+            source_tier="words",
+            jobs=2,
+        ).run()
+
+    assert sorted(p.name for p in output_target.iterdir()) == ["a.TextGrid", "c_a.TextGrid"]
+    tg = tgt.io3.read_textgrid(output_target / "c_a.TextGrid")
+    assert len(tg.get_tier_by_name("ipa").intervals) == 11
+
+
+def test_transcribe_intervals_run_jobs_use_own_pipelines(mocker, mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test pairs transcribed at once in threads never share a pipeline"""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name in ["a", "b", "c", "d", "e", "f"]:
+        (corpus / f"{name}.wav").write_bytes((shared_datadir / "test1.wav").read_bytes())
+        (corpus / f"{name}.TextGrid").write_bytes((shared_datadir / "test1.TextGrid").read_bytes())
+    pipelines = [mock_asr_pipeline]
+    in_use = set()
+    shared = []
+    lock = threading.Lock()
+
+    def predict_with(pipeline):
+        def predict(*args, **kwargs):
+            with lock:
+                if pipeline in in_use:
+                    shared.append(pipeline)
+                in_use.add(pipeline)
+            time.sleep(0.001)
+            with lock:
+                in_use.discard(pipeline)
+            return "test transcription"
+
+        return predict
+
+    def new_pipeline(**settings):
+        pipeline = mocker.Mock(spec=ASRPipeline, batch_size=1, max_batch_samples=None, logit_cache=None)
+        pipelines.append(pipeline)
+        pipeline.predict.side_effect = predict_with(pipeline)
+        return pipeline
+
+    mock_asr_pipeline.predict.side_effect = predict_with(mock_asr_pipeline)
+    mocker.patch("autoipaalign.core.cli.pipeline_settings", return_value={})
+    mocker.patch("autoipaalign.core.cli.ASRPipeline", side_effect=new_pipeline)
+
+    TranscribeIntervals(
+        asr=mock_asr_pipeline,
+        audio_paths=[corpus],
+        output_target=tmp_path / "output",
+        source_tier="words",
+        jobs=3,
+    ).run()
+
+    assert len(pipelines) == 3
+    assert shared == []
+    assert sum(pipeline.predict.call_count for pipeline in pipelines) == 6 * 11
+    assert len(list((tmp_path / "output").iterdir())) == 6
+
+
+def test_transcribe_intervals_single_pair_flags(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test the flags of the single pair transcribe-intervals used to take still transcribe files of any names"""
+    audio_path = tmp_path / "audio.wav"
+    textgrid_path = tmp_path / "annot.TextGrid"
+    audio_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+    textgrid_path.write_bytes((shared_datadir / "test1.TextGrid").read_bytes())
+    args = ["--audio-path", str(audio_path), "--textgrid-path", str(textgrid_path)]
+    args += ["--output-target", str(tmp_path / "output"), "--source-tier", "words"]
+
+    transcribe_intervals = tyro.cli(TranscribeIntervals, args=args)
+    transcribe_intervals.asr = mock_asr_pipeline
+    transcribe_intervals.run()
+
+    tg = tgt.io3.read_textgrid(tmp_path / "output" / "audio.TextGrid")
+    assert len(tg.get_tier_by_name("ipa").intervals) == 11
+
+
+def test_transcribe_intervals_audio_without_textgrid_fails(mock_asr_pipeline, tmp_path, shared_datadir):
+    """Test an audio file with no TextGrid to pair it with fails the run"""
+    audio_path = tmp_path / "audio.wav"
+    audio_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+
+    with pytest.raises(RuntimeError, match="audio.wav, which has no TextGrid"):
+        TranscribeIntervals(
+            asr=mock_asr_pipeline, audio_paths=[audio_path], output_target=tmp_path / "output", source_tier="words"
+        ).run()
+    mock_asr_pipeline.predict.assert_not_called()
+
+
+def test_transcribe_sweep_run(mocker, tmp_path, shared_datadir):
+    """Test TranscribeSweep.run() writes one TextGrid per file with the tiers of every model, or one target per model"""
+    audio_path = shared_datadir / "test1.wav"
+    mocker.patch(
+        "autoipaalign.core.cli.sweep_models",
+        side_effect=lambda audio_paths, model_names, *args, **kwargs: {
+            model_name: [TextGridContainer.from_audio_and_transcription(audio_path, "ipa", model_name)]
+            for model_name in model_names
+        },
+    )
+
+    TranscribeSweep([audio_path], tmp_path / "combined", model_names=["org/model-a", "model-b"]).run()
+    TranscribeSweep(
+        [audio_path], tmp_path / "per_model", model_names=["org/model-a", "model-b"], per_model_targets=True
+    ).run()
+
+    tg = tgt.io3.read_textgrid(tmp_path / "combined" / "test1.TextGrid")
+    assert tg.get_tier_names() == ["ipa_model-a", "ipa_model-b"]
+    assert tg.get_tier_by_name("ipa_model-a").intervals[0].text == "org/model-a"
+    tg = tgt.io3.read_textgrid(tmp_path / "per_model" / "model-b" / "test1.TextGrid")
+    assert tg.get_tier_names() == ["ipa"]
+    assert tg.get_tier_by_name("ipa").intervals[0].text == "model-b"
+
+
+def test_export_onnx_run(mocker, tmp_path):
+    """Test ExportOnnx.run() exports each model and reports failures after trying all of them"""
+    mock_export = mocker.patch("autoipaalign.core.cli.export_onnx")
+    mock_export.side_effect = [tmp_path / "a.onnx", Exception("Export error"), tmp_path / "c.onnx"]
+    export = ExportOnnx(model_names=["model-a", "model-b", "model-c"])
+
+    with pytest.raises(RuntimeError, match="Failed to export 1 of 3 models: model-b"):
+        export.run()
+
+    assert [c.args[0] for c in mock_export.call_args_list] == ["model-a", "model-b", "model-c"]
+
+
+def test_benchmark_quantization_run_with_references(mocker, shared_datadir):
+    """Test BenchmarkQuantization.run() reads the reference tier of the TextGrid matching each audio file"""
+    mock_benchmark = mocker.patch("autoipaalign.core.cli.benchmark_quantization")
+    benchmark = BenchmarkQuantization(
+        audio_paths=[shared_datadir / "test1.wav"],
+        model_name="test-model",
+        reference_dir=shared_datadir,
+        reference_tier="words",
+    )
+
+    benchmark.run()
+
+    mock_benchmark.assert_called_once()
+    model_name, audio_paths, references = mock_benchmark.call_args.args
+    assert model_name == "test-model"
+    assert audio_paths == [shared_datadir / "test1.wav"]
+    assert len(references) == 1
+    assert references[0].startswith("not it")
+    assert "  " not in references[0]
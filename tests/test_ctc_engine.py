@@ -0,0 +1,41 @@
+"""Unit tests for ctc_engine module"""
+
+import numpy as np
+
+from autoipaalign.core.ctc_engine import greedy_ctc_collapse
+
+
+def test_greedy_ctc_collapse():
+    """Test repeated tokens are merged and blanks removed, with frame spans for each token"""
+    (collapsed,) = greedy_ctc_collapse([np.array([0, 3, 3, 0, 0, 4, 3, 3, 0])], blank_id=0)
+
+    assert collapsed.token_ids.tolist() == [3, 4, 3]
+    assert collapsed.start_frames.tolist() == [1, 5, 6]
+    assert collapsed.end_frames.tolist() == [3, 6, 8]
+    assert len(collapsed) == 3
+
+
+def test_greedy_ctc_collapse_repeat_separated_by_blank():
+    """Test the same token on both sides of a blank is emitted twice"""
+    (collapsed,) = greedy_ctc_collapse([np.array([5, 5, 1, 5])], blank_id=1)
+
+    assert collapsed.token_ids.tolist() == [5, 5]
+    assert collapsed.start_frames.tolist() == [0, 3]
+    assert collapsed.end_frames.tolist() == [2, 4]
+
+
+def test_greedy_ctc_collapse_batch():
+    """Test runs do not continue across inputs in a batch and frames are relative to each input"""
+    token_ids = [np.array([2, 2]), np.array([], dtype=np.int64), np.array([0, 0]), np.array([2, 0, 7])]
+
+    collapsed = greedy_ctc_collapse(token_ids, blank_id=0)
+
+    assert [c.token_ids.tolist() for c in collapsed] == [[2], [], [], [2, 7]]
+    assert [c.start_frames.tolist() for c in collapsed] == [[0], [], [], [0, 2]]
+    assert [c.end_frames.tolist() for c in collapsed] == [[2], [], [], [1, 3]]
+
+
+def test_greedy_ctc_collapse_empty():
+    collapsed = greedy_ctc_collapse([np.array([], dtype=np.int64)], blank_id=0)
+    assert len(collapsed) == 1
+    assert len(collapsed[0]) == 0
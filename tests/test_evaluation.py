@@ -0,0 +1,74 @@
+"""Unit tests for evaluation module"""
+
+import pytest
+
+from autoipaalign.core.evaluation import (
+    QuantizationReport,
+    benchmark_quantization,
+    character_error_rate,
+    edit_distance,
+)
+
+
+@pytest.mark.parametrize(
+    "hypothesis,reference,expected",
+    [
+        ("", "", 0),
+        ("abc", "abc", 0),
+        ("", "abc", 3),
+        ("abc", "", 3),
+        ("kitten", "sitting", 3),
+        (["t", "ʃ", "a"], ["tʃ", "a"], 2),
+    ],
+)
+def test_edit_distance(hypothesis, reference, expected):
+    assert edit_distance(hypothesis, reference) == expected
+
+
+def test_character_error_rate_ignores_whitespace():
+    assert character_error_rate(["n ɑ t", "ɪt"], ["nɑt", "ɪ t"]) == 0.0
+
+
+def test_character_error_rate_over_all_transcriptions():
+    # One substitution in the first reference and one deletion in the second, over 5 reference characters
+    assert character_error_rate(["nɪt", "ɪ"], ["nɑt", "ɪt"]) == pytest.approx(2 / 5)
+
+
+def test_character_error_rate_requires_matching_lengths():
+    with pytest.raises(ValueError):
+        character_error_rate(["a"], ["a", "b"])
+
+
+def test_benchmark_quantization_requires_audio_paths(mocker):
+    """Test no audio is an error before any model is loaded"""
+    from_pretrained = mocker.patch("autoipaalign.core.evaluation.CTCEngine.from_pretrained")
+
+    with pytest.raises(ValueError, match="audio paths"):
+        benchmark_quantization("test-model", [])
+    from_pretrained.assert_not_called()
+
+
+def test_quantization_report():
+    report = QuantizationReport(
+        model_name="test-model",
+        num_files=2,
+        audio_seconds=10.0,
+        fp32_size_bytes=400_000_000,
+        int8_size_bytes=100_000_000,
+        fp32_seconds=4.0,
+        int8_seconds=2.0,
+        fp32_cer=0.1,
+        int8_cer=0.125,
+    )
+
+    assert report.speedup == 2.0
+    assert report.size_reduction == 4.0
+    text = str(report)
+    assert "400.0 MB fp32, 100.0 MB int8 (4.00x smaller)" in text
+    assert "(2.00x faster)" in text
+    assert "10.00% fp32, 12.50% int8 (+2.50%)" in text
+
+
+def test_quantization_report_without_references():
+    report = QuantizationReport("test-model", 1, 1.0, 4, 1, 1.0, 1.0)
+    assert "Character error rate" not in str(report)
@@ -0,0 +1,194 @@
+"""Unit tests for inputs module"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from autoipaalign.core.inputs import (
+    InputAudio,
+    check_unique_names,
+    iter_audio_files,
+    iter_audio_inputs,
+    iter_blocks,
+    iter_inputs,
+    pair_with_textgrids,
+    read_manifest,
+)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Directory tree of audio and other files"""
+    for name in ["b/2.wav", "b/1.FLAC", "a.wav", "notes.txt", ".hidden/3.wav", "c/d/4.mp3"]:
+        path = tmp_path / "corpus" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return tmp_path / "corpus"
+
+
+def test_iter_audio_files_directory(corpus):
+    """Test directories are searched recursively in name order for audio files, skipping hidden ones"""
+    found = [p.relative_to(corpus).as_posix() for p in iter_audio_files([corpus])]
+
+    assert found == ["a.wav", "b/1.FLAC", "b/2.wav", "c/d/4.mp3"]
+
+
+def test_iter_audio_files_is_lazy(corpus):
+    """Test later directories are only listed once earlier files have been taken"""
+    files = iter_audio_files([corpus])
+    assert next(files) == corpus / "a.wav"
+
+    (corpus / "c" / "5.wav").write_bytes(b"")
+
+    assert [p.name for p in files] == ["1.FLAC", "2.wav", "5.wav", "4.mp3"]
+
+
+def test_iter_audio_files_glob_and_files(corpus, tmp_path):
+    """Test glob patterns are expanded, while files and missing paths are passed on as given"""
+    found = list(iter_audio_files([str(corpus / "**" / "*.wav"), corpus / "notes.txt", tmp_path / "missing.wav"]))
+
+    assert sorted(found[:2]) == [corpus / "a.wav", corpus / "b" / "2.wav"]
+    assert found[2:] == [corpus / "notes.txt", tmp_path / "missing.wav"]
+
+
+def test_iter_audio_inputs_named_by_relative_path(tmp_path):
+    """Test files of the same name in different subdirectories get TextGrids named after their relative paths"""
+    corpus = tmp_path / "corpus"
+    for name in ["dr1/spk1/sa1.wav", "dr2/spk2/sa1.wav"]:
+        (corpus / name).parent.mkdir(parents=True)
+        (corpus / name).write_bytes(b"")
+
+    from_directory = [item.textgrid_name for item in iter_audio_inputs([corpus])]
+    from_glob = [item.textgrid_name for item in iter_audio_inputs([str(corpus / "dr*" / "**" / "*.wav")])]
+    given = [item.textgrid_name for item in iter_audio_inputs([corpus / "dr1" / "spk1" / "sa1.wav"])]
+
+    assert from_directory == ["dr1/spk1/sa1.TextGrid", "dr2/spk2/sa1.TextGrid"]
+    assert sorted(from_glob) == ["dr1/spk1/sa1.TextGrid", "dr2/spk2/sa1.TextGrid"]
+    assert given == ["sa1.TextGrid"]
+
+
+def test_check_unique_names(tmp_path):
+    """Test inputs are passed on until one would write the same TextGrid as an earlier one"""
+    inputs = check_unique_names(
+        [InputAudio(tmp_path / "dr1" / "sa1.wav"), InputAudio(tmp_path / "sa2.wav"), InputAudio(tmp_path / "sa1.wav")]
+    )
+
+    assert next(inputs) == InputAudio(tmp_path / "dr1" / "sa1.wav")
+    assert next(inputs) == InputAudio(tmp_path / "sa2.wav")
+    with pytest.raises(ValueError, match="sa1.TextGrid"):
+        next(inputs)
+
+
+def test_read_manifest_csv(tmp_path):
+    """Test CSV rows give inputs with paths relative to the manifest, output names and intervals"""
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "audio_path,output_name,start,end\na.wav,,,\nsub/b.wav,b_utt1,1.5,2.0\n/abs/c.wav,c.1,,\n", encoding="utf-8"
+    )
+
+    inputs = list(read_manifest(manifest))
+
+    assert inputs == [
+        InputAudio(tmp_path / "a.wav"),
+        InputAudio(tmp_path / "sub" / "b.wav", "b_utt1", (1.5, 2.0)),
+        InputAudio(Path("/abs/c.wav"), "c.1"),
+    ]
+    assert [item.textgrid_name for item in inputs] == ["a.TextGrid", "b_utt1.TextGrid", "c.1.TextGrid"]
+
+
+def test_read_manifest_json_lines(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    rows = [{"audio_path": "a.wav"}, {"audio_path": "a.wav", "output_name": "a_2", "start": 2, "end": 3.5}]
+    manifest.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n")
+
+    assert list(read_manifest(manifest)) == [
+        InputAudio(tmp_path / "a.wav"),
+        InputAudio(tmp_path / "a.wav", "a_2", (2.0, 3.5)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "row, message",
+    [
+        ("b.wav,1.0,", "start and end must be given together"),
+        (",1.0,2.0", "audio_path is missing"),
+        ("b.wav,2.0,1.0", "is not after start"),
+        ("b.wav,x,1.0", "could not convert"),
+    ],
+)
+def test_read_manifest_invalid_row(tmp_path, row, message):
+    """Test invalid rows are reported with their line number"""
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(f"audio_path,start,end\na.wav,,\n{row}\n")
+
+    with pytest.raises(ValueError, match=f"line 3 .*{message}"):
+        list(read_manifest(manifest))
+
+
+def test_iter_inputs(corpus, tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("audio_path\nother.wav\n")
+
+    inputs = list(iter_inputs([corpus / "b"], manifest))
+
+    assert inputs == [
+        InputAudio(corpus / "b" / "1.FLAC", "1"),
+        InputAudio(corpus / "b" / "2.wav", "2"),
+        InputAudio(tmp_path / "other.wav"),
+    ]
+
+
+def test_iter_blocks():
+    assert list(iter_blocks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_blocks([], 2)) == []
+    with pytest.raises(ValueError):
+        list(iter_blocks([1], 0))
+
+
+def test_pair_with_textgrids(tmp_path):
+    """Test audio files are paired with TextGrids of the same basename, from directories or next to the audio, and
+    passed on without a TextGrid otherwise"""
+    for name in ["audio/s01.wav", "audio/s02.wav", "audio/s03.wav", "audio/s02.TextGrid", "tg/s01.TextGrid"]:
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"")
+    audio_inputs = [InputAudio(path) for path in sorted((tmp_path / "audio").glob("*.wav"))]
+
+    assert list(pair_with_textgrids(audio_inputs, [tmp_path / "tg"])) == [
+        InputAudio(tmp_path / "audio" / "s01.wav", textgrid_path=tmp_path / "tg" / "s01.TextGrid"),
+        InputAudio(tmp_path / "audio" / "s02.wav"),
+        InputAudio(tmp_path / "audio" / "s03.wav"),
+    ]
+    assert list(pair_with_textgrids(audio_inputs)) == [
+        InputAudio(tmp_path / "audio" / "s01.wav"),
+        InputAudio(tmp_path / "audio" / "s02.wav", textgrid_path=tmp_path / "audio" / "s02.TextGrid"),
+        InputAudio(tmp_path / "audio" / "s03.wav"),
+    ]
+
+
+def test_pair_with_textgrids_nested(tmp_path):
+    """Test nested audio files are paired with the TextGrids at the same relative path"""
+    for name in ["audio/dr1/sa1.wav", "audio/dr2/sa1.wav", "tg/dr1/sa1.TextGrid", "tg/dr2/sa1.TextGrid"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+
+    pairs = list(pair_with_textgrids(iter_audio_inputs([tmp_path / "audio"]), [tmp_path / "tg"]))
+
+    assert pairs == [
+        InputAudio(
+            tmp_path / "audio" / "dr1" / "sa1.wav", "dr1/sa1", textgrid_path=tmp_path / "tg" / "dr1" / "sa1.TextGrid"
+        ),
+        InputAudio(
+            tmp_path / "audio" / "dr2" / "sa1.wav", "dr2/sa1", textgrid_path=tmp_path / "tg" / "dr2" / "sa1.TextGrid"
+        ),
+    ]
+
+
+def test_read_manifest_textgrid_path(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("audio_path,textgrid_path\na.wav,tg/a.TextGrid\n")
+
+    assert list(read_manifest(manifest)) == [
+        InputAudio(tmp_path / "a.wav", textgrid_path=tmp_path / "tg" / "a.TextGrid")
+    ]
@@ -0,0 +1,84 @@
+"""Unit tests for journal module"""
+
+import os
+
+from autoipaalign.core.inputs import InputAudio
+from autoipaalign.core.journal import CompletionJournal, journal_path
+
+
+def test_journal_path(tmp_path):
+    assert journal_path(tmp_path / "out", is_zip=False) == tmp_path / "out" / ".autoipaalign-journal.jsonl"
+    assert journal_path(tmp_path / "out.zip", is_zip=True) == tmp_path / "out.zip.journal.jsonl"
+
+
+def test_completion_journal_survives_reopening(tmp_path):
+    """Test recorded files are finished when the journal is opened again with the same settings"""
+    audio_path = tmp_path / "a.wav"
+    audio_path.write_bytes(b"audio")
+    item = InputAudio(audio_path)
+    path = tmp_path / "journal.jsonl"
+
+    with CompletionJournal(path, {"model_name": "m"}) as journal:
+        assert journal.remaining([item]) == [0]
+        journal.record(item)
+        assert journal.is_finished(item)
+
+    with CompletionJournal(path, {"model_name": "m"}) as journal:
+        assert journal.is_finished(item)
+        assert journal.remaining([item], has_output=lambda item: False) == [0]
+    with CompletionJournal(path, {"model_name": "other"}) as journal:
+        assert not journal.is_finished(item)
+
+
+def test_completion_journal_intervals(tmp_path):
+    """Test intervals of the same file are finished separately by output name and interval"""
+    audio_path = tmp_path / "a.wav"
+    audio_path.write_bytes(b"audio")
+    first = InputAudio(audio_path, "a_1", (0.0, 1.0))
+    second = InputAudio(audio_path, "a_2", (1.0, 2.0))
+
+    with CompletionJournal(tmp_path / "journal.jsonl", {}) as journal:
+        journal.record(first)
+        assert journal.remaining([first, second, InputAudio(audio_path)]) == [1, 2]
+        assert not journal.is_finished(InputAudio(audio_path, "a_1", (0.0, 1.5)))
+
+
+def test_completion_journal_checks_modification_time_and_size(tmp_path):
+    """Test files whose modification time or size changed are not finished"""
+    audio_path = tmp_path / "a.wav"
+    audio_path.write_bytes(b"audio")
+    item = InputAudio(audio_path)
+    journal = CompletionJournal(tmp_path / "journal.jsonl", {})
+    journal.record(item)
+
+    assert journal.is_finished(item)
+
+    stat = os.stat(audio_path)
+    os.utime(audio_path, ns=(0, 0))
+    assert not journal.is_finished(item)
+    os.utime(audio_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert journal.is_finished(item)
+    audio_path.write_bytes(b"longer audio")
+    os.utime(audio_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert not journal.is_finished(item)
+    journal.close()
+
+
+def test_completion_journal_ignores_cut_off_line(tmp_path):
+    """Test a line cut off by a killed job is skipped and later records are still read"""
+    audio_path = tmp_path / "a.wav"
+    audio_path.write_bytes(b"audio")
+    path = tmp_path / "journal.jsonl"
+    with CompletionJournal(path, {}) as journal:
+        journal.record(InputAudio(audio_path))
+    with open(path, "a") as f:
+        f.write('{"audio": "/cut')
+
+    other_path = tmp_path / "b.wav"
+    other_path.write_bytes(b"other")
+    with CompletionJournal(path, {}) as journal:
+        assert journal.is_finished(InputAudio(audio_path))
+        journal.record(InputAudio(other_path))
+
+    with CompletionJournal(path, {}) as journal:
+        assert journal.remaining([InputAudio(audio_path), InputAudio(other_path)]) == []
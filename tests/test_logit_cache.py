@@ -0,0 +1,87 @@
+"""Unit tests for logit_cache module"""
+
+import os
+
+import numpy as np
+import pytest
+
+from autoipaalign.core import speech_recognition
+from autoipaalign.core.ctc_engine import CTCEngine
+from autoipaalign.core.logit_cache import LogitCache
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.speech_recognition import ASRPipeline
+
+
+def test_logit_cache_put_get(tmp_path):
+    """Test token ids round trip through the cache and misses return None"""
+    cache = LogitCache(tmp_path / "cache", max_bytes=1_000_000)
+    token_ids = np.array([0, 5, 5, 0, 40000])
+
+    assert cache.get("missing") is None
+    cache.put("key", token_ids)
+
+    np.testing.assert_array_equal(cache.get("key"), token_ids)
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_logit_cache_key(tmp_path, shared_datadir):
+    """Test keys depend on audio contents and other parts, not on the file path"""
+    cache = LogitCache(tmp_path / "cache", max_bytes=1_000_000)
+    audio_path = shared_datadir / "test1.wav"
+    copy_path = tmp_path / "copy.wav"
+    copy_path.write_bytes(audio_path.read_bytes())
+
+    key = cache.key(audio_path, model="a", interval=None)
+    assert cache.key(copy_path, model="a", interval=None) == key
+    assert cache.key(audio_path, model="b", interval=None) != key
+    assert cache.key(audio_path, model="a", interval=(0.0, 1.0)) != key
+
+    y = np.zeros(100, dtype=np.float32)
+    assert cache.key(y, model="a") == cache.key(y.copy(), model="a")
+    assert cache.key(y, model="a") != cache.key(np.ones(100, dtype=np.float32), model="a")
+
+
+def test_asr_pipeline_cache_hit_does_not_load_model(mocker, tmp_path, shared_datadir):
+    """Test audio already in the cache is decoded with the tokenizer alone, without loading the model"""
+
+    def fake_ctc():
+        ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0)
+        ctc.forward_batch.side_effect = lambda arrays: [np.ones(len(a) // 320, dtype=np.int64) for a in arrays]
+        ctc.collapse.side_effect = lambda token_ids: [len(ids) for ids in token_ids]
+        ctc.text.side_effect = lambda collapsed: f"{collapsed} frames"
+        return ctc
+
+    get = mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(fake_ctc(), None, 0))
+    decoder_from_pretrained = mocker.patch.object(CTCEngine, "decoder_from_pretrained", return_value=fake_ctc())
+    mocker.patch.object(speech_recognition, "model_revision", return_value="abc123")
+    audio_path = shared_datadir / "test1.wav"
+
+    first = ASRPipeline("test-model", engine="direct", cache_dir=tmp_path / "cache").predict_batch([audio_path])
+    second = ASRPipeline("test-model", engine="direct", cache_dir=tmp_path / "cache").predict_batch([audio_path])
+
+    assert second == first
+    get.assert_called_once()
+    decoder_from_pretrained.assert_called_once_with("test-model")
+
+
+def test_logit_cache_evicts_least_recently_used(tmp_path):
+    """Test the oldest entries are deleted when the cache is over its size limit"""
+    cache = LogitCache(tmp_path, max_bytes=1_000_000)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, np.arange(1000))
+        os.utime(tmp_path / f"{key}.npz", ns=(i * 10**9, i * 10**9))
+    # Reading "a" makes it the most recently used
+    cache.get("a")
+    entry_size = (tmp_path / "a.npz").stat().st_size
+
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.npz", "c.npz"]
+    assert cache.get("b") is None
+
+
+def test_logit_cache_max_bytes_must_be_positive(tmp_path):
+    with pytest.raises(ValueError, match="must be positive"):
+        LogitCache(tmp_path, max_bytes=0)
@@ -0,0 +1,128 @@
+"""Unit tests for model_registry module"""
+
+import pytest
+
+from autoipaalign.core import model_registry
+from autoipaalign.core.model_registry import LoadedModel, ModelKey, ModelRegistry, current_rss_bytes
+from autoipaalign.core.speech_recognition import ASRPipeline
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_models(mocker):
+    """Replace model loading with fake models of 100 MB, tracking resident memory as the sum of loaded models"""
+    loaded = {}
+
+    def fake_load(key):
+        model = LoadedModel(ctc=mocker.Mock(), model_pipe=None, size_bytes=100 * MB)
+        loaded[key] = model
+        return model
+
+    mocker.patch.object(model_registry, "load_model", side_effect=fake_load)
+    return loaded
+
+
+def test_get_reuses_loaded_model(fake_models):
+    """Test a model is loaded once per key"""
+    registry = ModelRegistry()
+    key = ModelKey("model-a")
+
+    first = registry.get(key)
+    second = registry.get(ModelKey("model-a"))
+
+    assert first is second
+    assert model_registry.load_model.call_count == 1
+    assert registry.hits == 1
+    assert registry.misses == 1
+    assert registry.get(ModelKey("model-a", engine="direct")) is not first
+
+
+def test_max_models_evicts_least_recently_used(fake_models):
+    registry = ModelRegistry(max_models=2)
+    a, b, c = ModelKey("model-a"), ModelKey("model-b"), ModelKey("model-c")
+
+    registry.get(a)
+    registry.get(b)
+    registry.get(a)
+    registry.get(c)
+
+    assert a in registry
+    assert b not in registry
+    assert c in registry
+    assert len(registry) == 2
+
+
+def test_memory_budget_evicts_least_recently_used(mocker, fake_models):
+    """Test models are unloaded until resident memory minus unloaded models is within the budget"""
+    registry = ModelRegistry(max_rss_mb=250)
+    mocker.patch.object(
+        model_registry, "current_rss_bytes", side_effect=lambda: sum(m.size_bytes for m in registry._models.values())
+    )
+    a, b, c = ModelKey("model-a"), ModelKey("model-b"), ModelKey("model-c")
+
+    registry.get(a)
+    registry.get(b)
+    registry.get(c)
+
+    assert list(registry._models) == [b, c]
+
+
+def test_memory_budget_keeps_new_model(mocker, fake_models):
+    """Test the model that was just loaded is kept even if it alone is over the budget"""
+    registry = ModelRegistry(max_rss_mb=50)
+    mocker.patch.object(model_registry, "current_rss_bytes", return_value=None)
+
+    registry.get(ModelKey("model-a"))
+    registry.get(ModelKey("model-b"))
+
+    assert list(registry._models) == [ModelKey("model-b")]
+
+
+def test_clear(fake_models):
+    registry = ModelRegistry()
+    registry.get(ModelKey("model-a"))
+    registry.clear()
+    assert len(registry) == 0
+
+
+def test_discard(fake_models):
+    registry = ModelRegistry()
+    registry.get(ModelKey("model-a"))
+    registry.get(ModelKey("model-b"))
+    registry.discard(ModelKey("model-a"))
+    registry.discard(ModelKey("model-c"))
+    assert ModelKey("model-a") not in registry
+    assert ModelKey("model-b") in registry
+
+
+def test_invalid_max_models():
+    with pytest.raises(ValueError):
+        ModelRegistry(max_models=0)
+
+
+def test_model_key_invalid_options():
+    with pytest.raises(ValueError, match="Unknown engine"):
+        ModelKey("model-a", engine="other")
+    with pytest.raises(ValueError, match="quantization"):
+        ModelKey("model-a", engine="onnx", quantize=True)
+
+
+def test_current_rss_bytes():
+    rss = current_rss_bytes()
+    assert rss is None or rss > 0
+
+
+def test_asr_pipeline_loads_model_on_first_use(mocker):
+    """Test creating an ASRPipeline checks its settings without loading the model"""
+    mock_get = mocker.patch.object(model_registry.MODEL_REGISTRY, "get")
+
+    asr = ASRPipeline("model-a", engine="direct")
+    assert not mock_get.called
+
+    asr.load()
+    asr.load()
+    mock_get.assert_called_once_with(ModelKey("model-a", -1, "direct", False))
+
+    with pytest.raises(ValueError):
+        ASRPipeline("model-a", engine="onnx", quantize=True)
@@ -0,0 +1,28 @@
+"""Unit tests for onnx_engine module"""
+
+import os
+
+from autoipaalign.core.onnx_engine import ONNX_DIR_NAME, ONNX_FILE_NAME, is_onnx_export_current, onnx_path
+
+
+def test_onnx_path_local_model(tmp_path):
+    """Test exports of local models are saved inside the model directory"""
+    assert onnx_path(str(tmp_path)) == tmp_path / ONNX_DIR_NAME / ONNX_FILE_NAME
+
+
+def test_is_onnx_export_current(tmp_path):
+    """Test an export is only current if it is newer than every model file"""
+    (tmp_path / "config.json").write_text("{}")
+    os.utime(tmp_path / "config.json", ns=(10**9, 10**9))
+    assert not is_onnx_export_current(str(tmp_path))
+
+    export = tmp_path / ONNX_DIR_NAME / ONNX_FILE_NAME
+    export.parent.mkdir()
+    export.write_bytes(b"")
+    os.utime(export, ns=(2 * 10**9, 2 * 10**9))
+    assert is_onnx_export_current(str(tmp_path))
+
+    # Updating the model weights makes the export stale
+    (tmp_path / "model.safetensors").write_bytes(b"")
+    os.utime(tmp_path / "model.safetensors", ns=(3 * 10**9, 3 * 10**9))
+    assert not is_onnx_export_current(str(tmp_path))
@@ -0,0 +1,220 @@
+"""Unit tests for parallel module"""
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from autoipaalign.core import parallel
+from autoipaalign.core.audio import decode_audio
+from autoipaalign.core.batching import PaddingStats
+from autoipaalign.core.parallel import ProcessPoolTranscriber, WorkerStats, pipeline_settings
+from autoipaalign.core.speech_recognition import ASRPipeline, TranscriptionWithTimestamps
+from autoipaalign.core.vad import VadStats
+
+
+@pytest.fixture
+def audio_paths(tmp_path, shared_datadir):
+    """Copies of the test audio under different names"""
+    paths = []
+    for name in ["a", "b", "c", "d"]:
+        path = tmp_path / f"{name}.wav"
+        path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def mock_asr_pipeline(mocker):
+    """Create a mock ASR pipeline that transcribes each file as its name"""
+    mock_pipeline = mocker.Mock(spec=ASRPipeline)
+    mock_pipeline.batch_size = 1
+    mock_pipeline.max_batch_samples = None
+    mock_pipeline.padding_stats = PaddingStats()
+    mock_pipeline.vad_stats = VadStats()
+    mock_pipeline.decode.side_effect = lambda audio_path: decode_audio(audio_path, 16000)
+    mock_pipeline.predict.side_effect = lambda audio: audio.path.stem
+    mock_pipeline.predict_with_timestamps.side_effect = lambda audio: TranscriptionWithTimestamps(audio.path.stem, [])
+    return mock_pipeline
+
+
+@pytest.fixture
+def inline_workers(mocker, mock_asr_pipeline):
+    """Run worker tasks in threads of this process, with the mock pipeline as every worker's ASRPipeline"""
+    mocker.patch.object(parallel, "pipeline_settings", return_value={})
+    mocker.patch.object(parallel, "ASRPipeline", return_value=mock_asr_pipeline)
+    mocker.patch("torch.set_num_threads")
+    mocker.patch.object(parallel.logging, "basicConfig")
+    mocker.patch.object(
+        parallel,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context, initializer, initargs: ThreadPoolExecutor(
+            max_workers, initializer=initializer, initargs=initargs
+        ),
+    )
+    yield
+    parallel._worker_asr = None
+    parallel._worker_error = None
+    parallel._worker_started = None
+
+
+def test_pipeline_settings():
+    """Test only constructor arguments are copied"""
+    asr = object.__new__(ASRPipeline)
+    asr.model_name = "test-model"
+    asr.device = -1
+    for name in [
+        "sampling_rate",
+        "resample_type",
+        "batch_size",
+        "max_batch_samples",
+        "chunk_length_s",
+        "stride_length_s",
+        "engine",
+        "quantize",
+        "vad",
+        "vad_threshold_db",
+        "vad_min_silence_s",
+        "cache_dir",
+        "cache_max_mb",
+    ]:
+        setattr(asr, name, None)
+
+    settings = pipeline_settings(asr)
+
+    assert settings["model_name"] == "test-model"
+    assert "padding_stats" not in settings
+    assert "logit_cache" not in settings
+
+
+def test_worker_stats():
+    stats = WorkerStats(pid=1, num_files=4, audio_seconds=20.0, busy_seconds=2.0)
+    assert stats.files_per_second == 2.0
+    assert stats.realtime_factor == 10.0
+    assert str(stats) == "worker 1: 4 files, 20.0s of audio in 2.0s (2.00 files/s, 10.0x real time)"
+    assert WorkerStats(pid=1).files_per_second == 0.0
+
+
+def test_transcribe_keeps_input_order(inline_workers, mock_asr_pipeline, audio_paths):
+    """Test TextGrids come back in input order with throughput recorded"""
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa")
+
+    assert [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids] == ["a", "b", "c", "d"]
+    assert sum(stats.num_files for stats in transcriber.worker_stats.values()) == 4
+    assert transcriber.transcribe([], "ipa") == []
+    mock_asr_pipeline.load.assert_called()
+
+
+def test_transcribe_worker_load_error(mocker, inline_workers, mock_asr_pipeline, audio_paths):
+    """Test a worker that fails to load its model gives error transcriptions"""
+    mocker.patch.object(parallel, "ASRPipeline", side_effect=OSError("Model not found"))
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa")
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids]
+    assert texts == ["[Error]: Worker could not load the model: Model not found"] * 4
+
+
+def test_transcribe_worker_model_load_error(inline_workers, mock_asr_pipeline, audio_paths):
+    """Test the model is loaded when a worker starts, and failing to load it gives error transcriptions"""
+    mock_asr_pipeline.load.side_effect = OSError("Out of memory")
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa")
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids]
+    assert texts == ["[Error]: Worker could not load the model: Out of memory"] * 4
+    mock_asr_pipeline.predict.assert_not_called()
+
+
+def test_transcribe_worker_crash_only_affects_its_file(mocker, inline_workers, mock_asr_pipeline, audio_paths):
+    """Test files in flight when a worker crashes are retried alone and only the crashing file gets an error"""
+    transcribe_task = parallel._transcribe_task
+
+    def crash_on_b(task_id, paths, *options):
+        if any(path.stem == "b" for path in paths):
+            raise BrokenProcessPool("Worker died")
+        return transcribe_task(task_id, paths, *options)
+
+    mocker.patch.object(parallel, "_transcribe_task", side_effect=crash_on_b)
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa", add_phones=True)
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids]
+    assert texts == ["a", "[Error]: Worker process crashed while transcribing this file", "c", "d"]
+    assert text_grids[1].get_tier_names() == ["ipa", "phone"]
+
+
+def test_transcribe_worker_crash_retries_waiting_tasks_together(mocker, inline_workers, mock_asr_pipeline, audio_paths):
+    """Test only the task that was running when the pool broke is run alone, and tasks that were waiting
+    share one new pool"""
+    transcribe_task = parallel._transcribe_task
+    attempts = []
+
+    def crash_pool_on_b(task_id, paths, *options):
+        attempts.append(paths[0].stem)
+        if paths[0].stem == "b":
+            parallel._worker_started.put(task_id)
+            raise BrokenProcessPool("Worker died")
+        if paths[0].stem == "c" and attempts.count("c") == 1:
+            # Cancelled by the broken pool before a worker started it
+            raise BrokenProcessPool("Worker died")
+        return transcribe_task(task_id, paths, *options)
+
+    mocker.patch.object(parallel, "_transcribe_task", side_effect=crash_pool_on_b)
+    new_pool = mocker.spy(ProcessPoolTranscriber, "_new_pool")
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa")
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids]
+    assert texts == ["a", "[Error]: Worker process crashed while transcribing this file", "c", "d"]
+    assert [call.args[1] for call in new_pool.call_args_list] == [2, 2, 1]
+    assert attempts.count("b") == 2
+    assert attempts.count("c") == 2
+
+
+def test_transcribe_corrupt_file(inline_workers, mock_asr_pipeline, audio_paths):
+    """Test a file that can't be read gets an error TextGrid without stopping the other files"""
+    audio_paths[1].write_bytes(b"not audio")
+    # Sizing batches reads every file's duration in the worker, so the corrupt file's task fails as a whole
+    mock_asr_pipeline.max_batch_samples = 10**9
+    mock_asr_pipeline.sampling_rate = 16000
+    transcriber = ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1)
+
+    text_grids = transcriber.transcribe(audio_paths, "ipa", add_phones=True)
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids]
+    assert texts[0] == "a"
+    assert texts[1].startswith("[Error]:")
+    assert texts[2:] == ["c", "d"]
+    assert text_grids[1].get_tier_names() == ["ipa", "phone"]
+    assert text_grids[1].text_grid.end_time == 0
+
+
+def test_transcriber_keeps_workers_between_calls(mocker, inline_workers, mock_asr_pipeline, audio_paths):
+    """Test later calls reuse the worker pool until the transcriber is closed, and intervals reach the workers"""
+    new_pool = mocker.spy(ProcessPoolTranscriber, "_new_pool")
+    mock_asr_pipeline.predict.side_effect = lambda audio, interval=None: (
+        audio.path.stem if interval is None else f"{Path(audio).stem} {interval}"
+    )
+
+    with ProcessPoolTranscriber(mock_asr_pipeline, jobs=2, threads_per_job=1) as transcriber:
+        first = transcriber.transcribe(audio_paths[:2], "ipa")
+        second = transcriber.transcribe(audio_paths[2:], "ipa", intervals=[(0.5, 1.0), None])
+
+    assert new_pool.call_count == 1
+    assert transcriber._pool is None
+    assert [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in first] == ["a", "b"]
+    texts = [[i.text for i in tg.text_grid.get_tier_by_name("ipa").intervals] for tg in second]
+    assert texts == [["c (0.5, 1.0)"], ["d"]]
+
+
+def test_invalid_jobs(mock_asr_pipeline):
+    with pytest.raises(ValueError):
+        ProcessPoolTranscriber(mock_asr_pipeline, jobs=0)
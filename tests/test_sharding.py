@@ -0,0 +1,53 @@
+"""Unit tests for sharding module"""
+
+from pathlib import Path
+
+import pytest
+
+from autoipaalign.core.inputs import InputAudio
+from autoipaalign.core.sharding import assign_shards, check_shard, select_shard, shard_target_path
+
+
+def test_assign_shards_balances_durations():
+    """Test items are assigned longest first to the shard with the least audio"""
+    durations = [10.0, 1.0, 7.0, 3.0, 3.0, 6.0]
+    keys = ["a", "b", "c", "d", "e", "f"]
+
+    shards = assign_shards(durations, keys, 2)
+
+    totals = [sum(d for d, s in zip(durations, shards) if s == shard) for shard in range(2)]
+    assert totals == [16.0, 14.0]
+    assert shards == [0, 1, 1, 0, 0, 1]
+
+
+def test_select_shard_is_disjoint_and_independent_of_order(tmp_path):
+    """Test every input is in exactly one shard, whatever order the inputs were listed in"""
+    inputs = [InputAudio(tmp_path / f"{i}.wav", interval=(0.0, 1.0 + i % 3)) for i in range(10)]
+
+    shards = [select_shard(inputs, shard_index, 3) for shard_index in range(3)]
+    reversed_shards = [select_shard(reversed(inputs), shard_index, 3) for shard_index in range(3)]
+
+    assert sorted(item.audio_path.name for shard in shards for item in shard) == sorted(
+        item.audio_path.name for item in inputs
+    )
+    assert [set(shard) for shard in shards] == [set(shard) for shard in reversed_shards]
+    assert [sum(item.interval[1] for item in shard) for shard in shards] == [7.0, 6.0, 6.0]
+
+
+def test_select_shard_reads_durations(shared_datadir, tmp_path):
+    """Test durations come from audio headers, and unreadable files count as empty"""
+    inputs = [InputAudio(shared_datadir / "test1.wav"), InputAudio(tmp_path / "missing.wav")]
+
+    assert select_shard(inputs, 0, 2) == inputs[:1]
+    assert select_shard(inputs, 1, 2) == inputs[1:]
+
+
+def test_shard_target_path():
+    assert shard_target_path(Path("out"), 3, 16, is_zip=False) == Path("out.shard-3-of-16")
+    assert shard_target_path(Path("a/out.zip"), 0, 2, is_zip=True) == Path("a/out.shard-0-of-2.zip")
+
+
+@pytest.mark.parametrize("shard_index, num_shards", [(0, 0), (2, 2), (-1, 2)])
+def test_check_shard_invalid(shard_index, num_shards):
+    with pytest.raises(ValueError):
+        check_shard(shard_index, num_shards)
@@ -0,0 +1,105 @@
+"""Unit tests for speech_recognition module"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile
+
+from autoipaalign.core.ctc_engine import CTCEngine
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.speech_recognition import DEFAULT_STREAM_CHUNK_LENGTH_S, ASRPipeline
+from autoipaalign.core.windowing import compute_windows, window_lengths_in_samples
+
+TOKENS = ["<pad>", "|", "a", "b", "ə", "ʃ"]
+
+
+class FakeTokenizer:
+    """CTC tokenizer for TOKENS, with the padding token as blank"""
+
+    pad_token_id = 0
+    unk_token = "<unk>"
+    word_delimiter_token = "|"
+    clean_up_tokenization_spaces = False
+
+    def __len__(self):
+        return len(TOKENS)
+
+    def convert_ids_to_tokens(self, ids):
+        return [TOKENS[i] for i in ids]
+
+
+class FakeCTCEngine(CTCEngine):
+    """CTC engine whose model reads the token id of each frame from the audio samples, so a frame has the same
+    output whichever window it is run in"""
+
+    def __init__(self):
+        config = SimpleNamespace(inputs_to_logits_ratio=320, vocab_size=len(TOKENS))
+        super().__init__(None, SimpleNamespace(sampling_rate=16000), FakeTokenizer(), config=config)
+
+    def forward_batch(self, arrays):
+        return [np.rint(a[::320] * 100).astype(np.int64) for a in arrays]
+
+
+@pytest.fixture
+def fake_ctc(mocker):
+    ctc = FakeCTCEngine()
+    mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(ctc, None, 0))
+    return ctc
+
+
+def write_token_audio(path, duration_s, chunk_length_s, stride_length_s):
+    """Write audio that FakeCTCEngine transcribes as random runs of tokens, with a character over every boundary
+    between the kept frames of long-form windows.
+
+    Returns:
+        Indices of the frames where the kept part of a window starts
+    """
+    num_samples = int(duration_s * 16000)
+    rng = np.random.default_rng(0)
+    token_ids = np.repeat(rng.integers(0, len(TOKENS), num_samples // 320), rng.integers(1, 30, num_samples // 320))
+    token_ids = token_ids[: num_samples // 320]
+    chunk_length, stride_length = window_lengths_in_samples(chunk_length_s, stride_length_s, 16000, 320)
+    boundaries = [w.keep_start // 320 for w in compute_windows(num_samples, chunk_length, stride_length)[1:]]
+    for boundary in boundaries:
+        token_ids[boundary - 4 : boundary + 4] = TOKENS.index("ʃ")
+    soundfile.write(path, np.repeat(token_ids / 100, 320).astype(np.float32), 16000, subtype="FLOAT")
+    return boundaries
+
+
+@pytest.mark.parametrize("chunk_length_s, stride_length_s", [(30.0, None), (10.0, 1.5)])
+def test_predict_with_timestamps_long_form_matches_single_pass(fake_ctc, tmp_path, chunk_length_s, stride_length_s):
+    """Test windows are stitched without their overlaps, with timestamps from the start of the file"""
+    audio_path = tmp_path / "long.wav"
+    boundaries = write_token_audio(audio_path, 95, chunk_length_s, stride_length_s)
+    asr = ASRPipeline(
+        "test-model", engine="direct", chunk_length_s=chunk_length_s, stride_length_s=stride_length_s, batch_size=2
+    )
+
+    long_form = asr.predict_with_timestamps(audio_path)
+    single_pass = ASRPipeline("test-model", engine="direct").predict_with_timestamps(audio_path)
+
+    assert long_form == single_pass
+    assert len(single_pass.chunks) > 100
+    # The character over each window boundary is one chunk, not split between the windows
+    for boundary in boundaries:
+        assert any(start < boundary / 50 < end for start, end in (c.timestamp for c in long_form.chunks))
+
+
+@pytest.mark.parametrize("chunk_length_s, stride_length_s", [(None, None), (10.0, 1.5)])
+def test_stream_matches_long_form(fake_ctc, tmp_path, chunk_length_s, stride_length_s):
+    """Test streamed chunks are the chunks of long-form transcription with the same windows, including characters
+    that run across window boundaries"""
+    audio_path = tmp_path / "long.wav"
+    window_length_s = chunk_length_s if chunk_length_s is not None else DEFAULT_STREAM_CHUNK_LENGTH_S
+    boundaries = write_token_audio(audio_path, 95, window_length_s, stride_length_s)
+    asr = ASRPipeline("test-model", engine="direct", chunk_length_s=chunk_length_s, stride_length_s=stride_length_s)
+    long_form = ASRPipeline(
+        "test-model", engine="direct", chunk_length_s=window_length_s, stride_length_s=stride_length_s
+    ).predict_with_timestamps(audio_path)
+
+    streamed = list(asr.stream(audio_path))
+
+    assert streamed == long_form.chunks
+    for boundary in boundaries:
+        assert any(start < boundary / 50 < end for start, end in (c.timestamp for c in streamed))
@@ -0,0 +1,114 @@
+"""Unit tests for sweep module"""
+
+import numpy as np
+import pytest
+
+from autoipaalign.core import audio_cache, sweep
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.sweep import combine_model_text_grids, model_tier_name, sweep_models
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_models(mocker):
+    """Replace the model registry with fake 100 MB models whose transcription is the model name"""
+
+    def fake_model(key):
+        ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0)
+        ctc.forward_batch.side_effect = lambda arrays: [np.ones(len(a) // 320, dtype=np.int64) for a in arrays]
+        ctc.collapse.side_effect = lambda token_ids: list(token_ids)
+        ctc.text.return_value = key.model_name
+        ctc.chars.return_value = []
+        ctc.timestamps.return_value = []
+        return LoadedModel(ctc, None, 100 * MB)
+
+    get = mocker.patch.object(MODEL_REGISTRY, "get", side_effect=fake_model)
+    mocker.patch.object(MODEL_REGISTRY, "discard")
+    return get
+
+
+@pytest.fixture
+def audio_paths(shared_datadir, tmp_path):
+    second_path = tmp_path / "test2.wav"
+    second_path.write_bytes((shared_datadir / "test1.wav").read_bytes())
+    return [shared_datadir / "test1.wav", second_path]
+
+
+def test_sweep_models_decodes_each_file_once(mocker, fake_models, audio_paths):
+    """Test every model transcribes every file from audio decoded once, and models are unloaded when done"""
+    decode = mocker.patch("autoipaalign.core.audio_cache.decode_audio", wraps=audio_cache.decode_audio)
+    new_pipeline = mocker.patch.object(sweep, "ASRPipeline", wraps=ASRPipeline)
+    asr = ASRPipeline("unused", engine="direct", batch_size=2)
+
+    text_grids_by_model = sweep_models(
+        audio_paths, ["org/model-a", "org/model-b", "model-c"], asr, "ipa", model_jobs=2, max_rss_mb=1000
+    )
+
+    assert decode.call_count == len(audio_paths)
+    assert list(text_grids_by_model) == ["org/model-a", "org/model-b", "model-c"]
+    for model_name, text_grids in text_grids_by_model.items():
+        assert [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids] == [model_name] * 2
+    assert MODEL_REGISTRY.discard.call_count == 3
+    # Decoded audio was kept in a temporary directory without a size limit
+    assert asr.audio_cache_dir is None
+    assert all(call.kwargs["audio_cache_max_mb"] is None for call in new_pipeline.call_args_list)
+
+
+def test_sweep_models_load_error(mocker, fake_models, audio_paths):
+    """Test a model that can't be loaded only gives error transcriptions for its own tiers"""
+    fake_model = fake_models.side_effect
+
+    def fail_to_load_missing(key):
+        if key.model_name == "missing":
+            raise OSError("no such model")
+        return fake_model(key)
+
+    fake_models.side_effect = fail_to_load_missing
+    asr = ASRPipeline("unused", engine="direct")
+
+    text_grids_by_model = sweep_models(audio_paths[:1], ["missing", "model-a"], asr, "ipa")
+    (tg,) = combine_model_text_grids(text_grids_by_model)
+
+    assert tg.get_tier_names() == [model_tier_name("ipa", "missing"), model_tier_name("ipa", "model-a")]
+    assert tg.text_grid.get_tier_by_name("ipa_missing").intervals[0].text == "[Error]: no such model"
+    assert tg.text_grid.get_tier_by_name("ipa_model-a").intervals[0].text == "model-a"
+
+
+def test_sweep_models_load_error_with_unreadable_audio(fake_models, audio_paths, tmp_path):
+    """Test a model that can't be loaded gives error transcriptions for unreadable files without stopping the sweep"""
+    fake_models.side_effect = OSError("no such model")
+    corrupt_path = tmp_path / "corrupt.wav"
+    corrupt_path.write_bytes(b"not audio")
+    asr = ASRPipeline("unused", engine="direct")
+
+    text_grids_by_model = sweep_models([audio_paths[0], corrupt_path], ["missing"], asr, "ipa")
+
+    text_grids = text_grids_by_model["missing"]
+    assert [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in text_grids] == [
+        "[Error]: no such model"
+    ] * 2
+    assert text_grids[0].text_grid.end_time > 0
+    assert text_grids[1].text_grid.end_time == 0
+
+
+def test_sweep_models_measures_memory_after_load_error(mocker, fake_models, audio_paths):
+    """Test models run one at a time until one loads, so the memory budget applies after a failed first model"""
+    fake_model = fake_models.side_effect
+
+    def fail_to_load_missing(key):
+        if key.model_name == "missing":
+            raise OSError("no such model")
+        return fake_model(key)
+
+    fake_models.side_effect = fail_to_load_missing
+    thread_pool = mocker.patch.object(sweep, "ThreadPoolExecutor", wraps=sweep.ThreadPoolExecutor)
+    asr = ASRPipeline("unused", engine="direct")
+
+    text_grids_by_model = sweep_models(
+        audio_paths[:1], ["missing", "model-a", "model-b", "model-c"], asr, "ipa", model_jobs=3, max_rss_mb=150
+    )
+
+    assert list(text_grids_by_model) == ["missing", "model-a", "model-b", "model-c"]
+    assert thread_pool.call_args.kwargs["max_workers"] == 1
@@ -1,19 +1,35 @@
 """Unit tests for textgrid_io module"""
 
+from contextlib import nullcontext
 from pathlib import Path
 import zipfile
 
+import numpy as np
 import pytest
 import tgt.core
 import tgt.io3
 
-from autoipaalign.core.textgrid_io import TextGridContainer, write_textgrids_to_target
+from autoipaalign.core.audio import DecodedAudio
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.textgrid_io import (
+    TextGridContainer,
+    TextGridWriter,
+    merge_textgrid_targets,
+    write_textgrids_to_target,
+)
 from autoipaalign.core.speech_recognition import (
+    ASRPipeline,
     TranscriptionChunk,
+    TranscriptionSegment,
     TranscriptionWithTimestamps,
 )
 
 
+def decode_to_silence(audio_path):
+    """Stand-in for ASRPipeline.decode that doesn't read the file"""
+    return DecodedAudio(np.zeros(16000, dtype=np.float32), 16000, 16000, 1.0, 1, audio_path)
+
+
 @pytest.fixture
 def sample_textgrid():
     """Create a sample TextGrid for testing"""
@@ -72,7 +88,7 @@ def test_from_textgrid_file(temp_textgrid_file):
 
 def test_from_audio_and_transcription(mocker):
     """Test creating TextGrid from audio and transcription"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
 
     result = TextGridContainer.from_audio_and_transcription(
         audio_in="/path/to/audio.wav",
@@ -97,10 +113,6 @@ def test_from_audio_and_transcription(mocker):
 
 def test_from_textgrid_with_predict_intervals(mocker, temp_textgrid_file):
     """Test creating TextGrid with mock ASR predictions"""
-    mocker.patch(
-        "autoipaalign.core.textgrid_io.librosa.load",
-        return_value=([0.1, 0.2, 0.3], 16000),
-    )
 
     mock_pipeline = mocker.Mock()
     mock_pipeline.predict.return_value = "həloʊ"
@@ -134,12 +146,103 @@ def test_from_textgrid_with_predict_intervals(mocker, temp_textgrid_file):
     assert mock_pipeline.predict.call_count == 2
 
 
-def test_from_audio_with_predict_transcription(mocker):
-    mocker.patch(
-        "autoipaalign.core.textgrid_io.librosa.load",
-        return_value=([0.1, 0.2, 0.3], 16000),
+def test_from_textgrid_with_predict_intervals_opens_audio_once(mocker, temp_textgrid_file):
+    """Test every interval is predicted from the audio opened once for all intervals"""
+    mock_pipeline = mocker.Mock()
+    opened_audio = mocker.sentinel.opened_audio
+    mock_pipeline.open_for_intervals.return_value = nullcontext(opened_audio)
+    mock_pipeline.predict.return_value = "həloʊ"
+
+    TextGridContainer.from_textgrid_with_predict_intervals(
+        "/path/to/audio.wav", temp_textgrid_file, "words", "ipa", mock_pipeline
+    )
+
+    mock_pipeline.open_for_intervals.assert_called_once_with("/path/to/audio.wav", [(0, 2.5), (2.5, 5.0)])
+    assert mock_pipeline.predict.call_args_list == [
+        mocker.call(opened_audio, (0, 2.5)),
+        mocker.call(opened_audio, (2.5, 5.0)),
+    ]
+
+
+def test_from_textgrid_with_predict_intervals_batched(mocker, temp_textgrid_file):
+    """Test intervals are predicted in one batch and phone chunks are shifted to each interval's start"""
+    mock_pipeline = mocker.Mock(sampling_rate=16000)
+    opened_audio = mocker.sentinel.opened_audio
+    mock_pipeline.open_for_intervals.return_value = nullcontext(opened_audio)
+    mock_pipeline.predict_batch_with_timestamps.side_effect = lambda audios, intervals: [
+        TranscriptionWithTimestamps(text=f"{start}", chunks=[TranscriptionChunk(text="h", timestamp=(0.5, 1.0))])
+        for start, _ in intervals
+    ]
+
+    result = TextGridContainer.from_textgrid_with_predict_intervals(
+        "/path/to/audio.wav", temp_textgrid_file, "words", "ipa", mock_pipeline, add_phones=True, batch_size=2
+    )
+
+    mock_pipeline.predict_batch_with_timestamps.assert_called_once()
+    mock_pipeline.predict_with_timestamps.assert_not_called()
+    audios, intervals = mock_pipeline.predict_batch_with_timestamps.call_args.args
+    assert audios == [opened_audio, opened_audio]
+    assert sorted(intervals) == [(0, 2.5), (2.5, 5.0)]
+    assert [i.text for i in result.text_grid.get_tier_by_name("ipa").intervals] == ["0.0", "2.5"]
+    phones = result.text_grid.get_tier_by_name("phone").intervals
+    assert [(p.start_time, p.end_time) for p in phones] == [(0.5, 1.0), (3.0, 3.5)]
+
+
+def test_from_textgrid_with_predict_intervals_batch_error(mocker, temp_textgrid_file):
+    """Test the intervals of a failed batch are predicted one at a time, so only the failing interval gets an error"""
+    mock_pipeline = mocker.Mock(sampling_rate=16000)
+    mock_pipeline.predict_batch.side_effect = ValueError("bad batch")
+    mock_pipeline.predict.side_effect = ["həloʊ", ValueError("bad interval")]
+
+    result = TextGridContainer.from_textgrid_with_predict_intervals(
+        "/path/to/audio.wav", temp_textgrid_file, "words", "ipa", mock_pipeline, max_batch_samples=200000
+    )
+
+    mock_pipeline.predict_batch.assert_called_once()
+    ipa_tier = result.text_grid.get_tier_by_name("ipa")
+    assert [i.text for i in ipa_tier.intervals] == ["həloʊ", "[Error]: bad interval"]
+
+
+def test_from_textgrid_with_predict_intervals_full_pass(mocker, temp_textgrid_file):
+    """Test the model runs once over the whole file and each interval is decoded from its own frames"""
+    ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0, sampling_rate=16000)
+    ctc.forward_batch.side_effect = lambda arrays: [np.arange(1, len(a) // 320 + 1) for a in arrays]
+    ctc.collapse.side_effect = lambda token_ids: list(token_ids)
+    ctc.text.side_effect = lambda ids: f"{ids[0]}-{ids[-1]}"
+    ctc.chars.return_value = ["x"]
+    ctc.timestamps.side_effect = lambda ids, frame_offset: [(frame_offset / 50, (frame_offset + len(ids)) / 50)]
+    mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(ctc, None, 0))
+    audio = DecodedAudio(np.zeros(80000, dtype=np.float32), 16000, 16000, 5.0, 1, "/path/to/audio.wav")
+    mocker.patch("autoipaalign.core.speech_recognition.open_for_intervals", return_value=nullcontext(audio))
+    asr = ASRPipeline("test-model", engine="direct")
+
+    result = TextGridContainer.from_textgrid_with_predict_intervals(
+        "/path/to/audio.wav", temp_textgrid_file, "words", "ipa", asr, add_phones=True, full_pass=True
     )
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+
+    ctc.forward_batch.assert_called_once()
+    assert [len(a) for a in ctc.forward_batch.call_args.args[0]] == [80000]
+    assert [i.text for i in result.text_grid.get_tier_by_name("ipa").intervals] == ["1-125", "126-250"]
+    phones = result.text_grid.get_tier_by_name("phone").intervals
+    assert [(p.start_time, p.end_time) for p in phones] == [(0, 2.5), (2.5, 5.0)]
+
+
+def test_from_textgrid_with_predict_intervals_full_pass_error(mocker, temp_textgrid_file):
+    """Test intervals are predicted on their own if the pass over the whole file fails"""
+    mock_pipeline = mocker.Mock(sampling_rate=16000)
+    mock_pipeline.predict_intervals.side_effect = MemoryError("too long")
+    mock_pipeline.predict.return_value = "həloʊ"
+
+    result = TextGridContainer.from_textgrid_with_predict_intervals(
+        "/path/to/audio.wav", temp_textgrid_file, "words", "ipa", mock_pipeline, full_pass=True
+    )
+
+    assert [i.text for i in result.text_grid.get_tier_by_name("ipa").intervals] == ["həloʊ", "həloʊ"]
+    assert mock_pipeline.predict.call_count == 2
+
+
+def test_from_audio_with_predict_transcription(mocker):
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
     mock_pipeline = mocker.Mock()
     mock_pipeline.predict.return_value = "hello"
     tg = TextGridContainer.from_audio_with_predict_transcription(
@@ -157,6 +260,157 @@ def test_from_audio_with_predict_transcription(mocker):
     assert interval.end_time == 5.5
 
 
+def test_from_audio_batch_with_predict_transcription(mocker):
+    """Test batched TextGrid creation keeps input order and groups files by batch size"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.decode.side_effect = decode_to_silence
+    mock_pipeline.predict_batch.side_effect = lambda audio: [Path(a.path).stem for a in audio]
+    audio_paths = ["/path/to/a.wav", "/path/to/b.wav", "/path/to/c.wav"]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        audio_paths, "transcription", mock_pipeline, batch_size=2
+    )
+
+    assert len(result) == 3
+    assert [tg.text_grid.get_tier_by_name("transcription").intervals[0].text for tg in result] == ["a", "b", "c"]
+    assert all(tg.text_grid.get_tier_by_name("transcription").intervals[0].end_time == 5.5 for tg in result)
+    assert mock_pipeline.predict_batch.call_count == 2
+    mock_pipeline.predict.assert_not_called()
+
+
+def test_from_audio_batch_with_predict_transcription_and_phones(mocker):
+    """Test batched TextGrid creation with phone tiers"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.predict_batch_with_timestamps.return_value = [
+        TranscriptionWithTimestamps(text="h", chunks=[TranscriptionChunk(text="h", timestamp=(0.0, 1.0))]),
+        TranscriptionWithTimestamps(text="ə", chunks=[TranscriptionChunk(text="ə", timestamp=(1.0, 2.0))]),
+    ]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        ["/path/to/a.wav", "/path/to/b.wav"],
+        "ipa",
+        mock_pipeline,
+        add_phones=True,
+        phone_tier_name="phones",
+        batch_size=2,
+    )
+
+    assert [tg.get_tier_names() for tg in result] == [["ipa", "phones"], ["ipa", "phones"]]
+    phone_tier = result[1].text_grid.get_tier_by_name("phones")
+    assert len(phone_tier.intervals) == 1
+    assert phone_tier.intervals[0].text == "ə"
+    assert phone_tier.intervals[0].start_time == 1.0
+    assert phone_tier.intervals[0].end_time == 2.0
+
+
+def test_from_audio_batch_with_predict_transcription_bucketed(mocker):
+    """Test files are grouped by duration under the sample budget and returned in input order"""
+    durations = {"a": 1.0, "b": 10.0, "c": 1.5, "d": 9.0}
+    mocker.patch(
+        "autoipaalign.core.textgrid_io.audio_duration",
+        side_effect=lambda audio: durations[Path(audio.path if isinstance(audio, DecodedAudio) else audio).stem],
+    )
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.sampling_rate = 100
+    mock_pipeline.decode.side_effect = decode_to_silence
+    mock_pipeline.predict_batch.side_effect = lambda audio: [Path(a.path).stem for a in audio]
+    audio_paths = [f"/path/to/{name}.wav" for name in durations]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        audio_paths, "ipa", mock_pipeline, max_batch_samples=2000
+    )
+
+    # Long files are predicted together, then short files together
+    batches = [[Path(a.path).stem for a in c.args[0]] for c in mock_pipeline.predict_batch.call_args_list]
+    assert batches == [["b", "d"], ["c", "a"]]
+    assert [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in result] == ["a", "b", "c", "d"]
+
+
+def test_from_audio_batch_with_predict_transcription_intervals(mocker):
+    """Test files with an interval only have it read and get a transcription interval at its times"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.0)
+    mock_pipeline = mocker.Mock(sampling_rate=16000)
+    mock_pipeline.decode.side_effect = decode_to_silence
+    mock_pipeline.predict_batch_with_timestamps.side_effect = lambda audio, intervals: [
+        TranscriptionWithTimestamps(text="hi", chunks=[TranscriptionChunk(text="h", timestamp=(0.5, 1.0))])
+        for _ in audio
+    ]
+    audio_paths = ["/path/to/a.wav", "/path/to/b.wav"]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        audio_paths, "ipa", mock_pipeline, add_phones=True, batch_size=2, intervals=[None, (2.0, 3.0)]
+    )
+
+    # Only the file without an interval is decoded whole
+    mock_pipeline.decode.assert_called_once_with("/path/to/a.wav")
+    assert mock_pipeline.predict_batch_with_timestamps.call_args.args[0][1] == "/path/to/b.wav"
+    assert mock_pipeline.predict_batch_with_timestamps.call_args.kwargs == {"intervals": [None, (2.0, 3.0)]}
+    whole, interval = [tg.text_grid for tg in result]
+    assert [(i.start_time, i.end_time, i.text) for i in whole.get_tier_by_name("ipa").intervals] == [(0, 5.0, "hi")]
+    assert [(i.start_time, i.end_time, i.text) for i in interval.get_tier_by_name("ipa").intervals] == [
+        (2.0, 3.0, "hi")
+    ]
+    assert interval.get_tier_by_name("ipa").end_time == 5.0
+    assert [(p.start_time, p.end_time) for p in interval.get_tier_by_name("phone").intervals] == [(2.5, 3.0)]
+
+
+def test_from_audio_batch_with_predict_transcription_batch_error(mocker):
+    """Test that a failed batch falls back to per-file prediction so errors stay with their file"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.predict_batch.side_effect = RuntimeError("Batch failed")
+    mock_pipeline.predict.side_effect = ["hello", OSError("Audio not accessible")]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        ["/path/to/a.wav", "/path/to/b.wav"], "ipa", mock_pipeline, batch_size=2
+    )
+
+    texts = [tg.text_grid.get_tier_by_name("ipa").intervals[0].text for tg in result]
+    assert texts == ["hello", "[Error]: Audio not accessible"]
+    assert mock_pipeline.predict.call_count == 2
+
+
+def test_from_audio_with_predict_transcription_segmented(mocker):
+    """Test segmented transcription adds one interval per segment and phones from all segments"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.predict_segments.return_value = [
+        TranscriptionSegment(
+            "hə", (0.5, 1.5), [TranscriptionChunk("h", (0.6, 0.7)), TranscriptionChunk("ə", (0.8, 1.0))]
+        ),
+        TranscriptionSegment(
+            "lo", (3.0, 4.0), [TranscriptionChunk("l", (3.1, 3.2)), TranscriptionChunk("o", (3.4, 3.6))]
+        ),
+    ]
+
+    result = TextGridContainer.from_audio_batch_with_predict_transcription(
+        ["/path/to/a.wav"], "ipa", mock_pipeline, add_phones=True, batch_size=4, segment=True, max_segment_length_s=10
+    )
+
+    mock_pipeline.decode.assert_called_once_with("/path/to/a.wav")
+    mock_pipeline.predict_segments.assert_called_once_with(mock_pipeline.decode.return_value, 10)
+    mock_pipeline.predict_batch_with_timestamps.assert_not_called()
+    ipa_tier = result[0].text_grid.get_tier_by_name("ipa")
+    assert [(i.start_time, i.end_time, i.text) for i in ipa_tier.intervals] == [(0.5, 1.5, "hə"), (3.0, 4.0, "lo")]
+    assert ipa_tier.end_time == 5.5
+    phone_tier = result[0].text_grid.get_tier_by_name("phone")
+    assert [i.text for i in phone_tier.intervals] == ["h", "ə", "l", "o"]
+
+
+def test_from_audio_with_predict_transcription_segmented_error(mocker):
+    """Test a segmentation error gives the whole file an error interval"""
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
+    mock_pipeline = mocker.Mock()
+    mock_pipeline.predict_segments.side_effect = OSError("Audio not accessible")
+
+    tg = TextGridContainer.from_audio_with_predict_transcription("/path/to/a.wav", "ipa", mock_pipeline, segment=True)
+
+    intervals = tg.text_grid.get_tier_by_name("ipa").intervals
+    assert [(i.start_time, i.end_time, i.text) for i in intervals] == [(0, 5.5, "[Error]: Audio not accessible")]
+
+
 def test_write_textgrids_to_directory(sample_textgrid, tmp_path):
     """Test writing TextGrids to directory"""
     audio_paths = [Path("test1.wav"), Path("test2.wav")]
@@ -205,6 +459,78 @@ def test_write_textgrids_to_target_no_overwrite(sample_textgrid, tmp_path):
         write_textgrids_to_target(audio_paths, text_grids, target, is_zip=True, is_overwrite=False)
 
 
+def test_textgrid_writer_zip_stages_until_closed(sample_textgrid, tmp_path):
+    """Test TextGrids for a zip file are on disk before the writer is closed and moved into the zip file after"""
+    target = tmp_path / "output.zip"
+    staging_dir = tmp_path / "output.zip.partial"
+
+    with TextGridWriter(target, is_zip=True) as writer:
+        writer.write(Path("test1.wav"), TextGridContainer(sample_textgrid))
+        writer.write(Path("test2.wav"), TextGridContainer(sample_textgrid))
+        assert sorted(p.name for p in staging_dir.iterdir()) == ["test1.TextGrid", "test2.TextGrid"]
+        assert not target.exists()
+
+    assert writer.num_written == 2
+    assert not staging_dir.exists()
+    with zipfile.ZipFile(target, "r") as zipf:
+        assert zipf.namelist() == ["test1.TextGrid", "test2.TextGrid"]
+
+
+def test_textgrid_writer_zip_append(sample_textgrid, tmp_path):
+    """Test appending to a zip file keeps its TextGrids, replaces rewritten ones and adds ones left staged"""
+    target = tmp_path / "output.zip"
+    write_textgrids_to_target(
+        [Path("test1.wav"), Path("test2.wav")], [TextGridContainer(sample_textgrid)] * 2, target, is_zip=True
+    )
+    # Left staged by a run that was killed
+    staging_dir = tmp_path / "output.zip.partial"
+    staging_dir.mkdir()
+    (staging_dir / "test3.TextGrid").write_text("staged")
+    replacement = TextGridContainer(sample_textgrid)
+    replacement.text_grid.get_tier_by_name("words").intervals[0].text = "replaced"
+
+    with TextGridWriter(target, is_zip=True, is_overwrite=False, append=True) as writer:
+        assert writer.has_output("test1.TextGrid")
+        assert writer.has_output("test3.TextGrid")
+        assert not writer.has_output("test4.TextGrid")
+        writer.write(Path("test2.wav"), replacement)
+        writer.write(Path("test4.wav"), TextGridContainer(sample_textgrid))
+        writer.write_named("dr1/test4.TextGrid", TextGridContainer(sample_textgrid))
+
+    with zipfile.ZipFile(target, "r") as zipf:
+        assert sorted(zipf.namelist()) == [
+            "dr1/test4.TextGrid",
+            "test1.TextGrid",
+            "test2.TextGrid",
+            "test3.TextGrid",
+            "test4.TextGrid",
+        ]
+        assert "replaced" in zipf.read("test2.TextGrid").decode()
+        assert "replaced" not in zipf.read("test1.TextGrid").decode()
+        assert zipf.read("test3.TextGrid") == b"staged"
+
+
+def test_merge_textgrid_targets(sample_textgrid, tmp_path):
+    """Test TextGrids of directories and zip files are combined, keeping the first of the same name"""
+    tg = TextGridContainer(sample_textgrid)
+    write_textgrids_to_target([Path("a.wav"), Path("b.wav")], [tg, tg], tmp_path / "shard0")
+    write_textgrids_to_target([Path("c.wav"), Path("a.wav")], [tg, tg], tmp_path / "shard1.zip", is_zip=True)
+    (tmp_path / "shard0" / "notes.txt").write_text("not a TextGrid")
+    with TextGridWriter(tmp_path / "shard0", append=True) as writer:
+        writer.write_named("dr1/a.TextGrid", tg)
+
+    num_copied = merge_textgrid_targets(
+        [tmp_path / "shard0", tmp_path / "shard1.zip"], tmp_path / "merged.zip", is_zip=True
+    )
+
+    assert num_copied == 4
+    with zipfile.ZipFile(tmp_path / "merged.zip") as zipf:
+        assert sorted(zipf.namelist()) == ["a.TextGrid", "b.TextGrid", "c.TextGrid", "dr1/a.TextGrid"]
+        assert zipf.read("a.TextGrid") == (tmp_path / "shard0" / "a.TextGrid").read_bytes()
+    with pytest.raises(FileNotFoundError):
+        merge_textgrid_targets([tmp_path / "missing"], tmp_path / "merged")
+
+
 def test_create_phone_tier_from_chunks():
     """Test creating a phone tier from transcription chunks"""
     chunks = [
@@ -230,7 +556,7 @@ def test_create_phone_tier_from_chunks():
 
 def test_from_audio_with_predict_transcription_and_phones(mocker):
     """Test creating TextGrid with both transcription and phone tiers"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
 
     mock_pipeline = mocker.Mock()
     mock_result = TranscriptionWithTimestamps(
@@ -287,7 +613,7 @@ def test_from_audio_with_predict_transcription_and_phones(mocker):
 
 def test_from_textgrid_with_predict_intervals_and_phones(mocker, temp_textgrid_file):
     """Test creating TextGrid with interval predictions and phone tier"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.0)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.0)
 
     mock_pipeline = mocker.Mock()
     # For simplicity, assume ASR returns this for both intervals in the word tier
@@ -354,7 +680,7 @@ def test_from_textgrid_with_predict_intervals_and_phones(mocker, temp_textgrid_f
 
 def test_from_audio_with_predict_transcription_error_no_phones(mocker):
     """Test error handling during transcription when add_phones=False"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
 
     mock_pipeline = mocker.Mock()
     mock_pipeline.predict.side_effect = RuntimeError("Model failed to load")
@@ -378,7 +704,7 @@ def test_from_audio_with_predict_transcription_error_no_phones(mocker):
 
 def test_from_audio_with_predict_transcription_error_with_phones(mocker):
     """Test error handling during transcription when add_phones=True"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
 
     mock_pipeline = mocker.Mock()
     mock_pipeline.predict_with_timestamps.side_effect = RuntimeError("Timestamp extraction failed")
@@ -476,7 +802,7 @@ def test_from_textgrid_with_predict_intervals_runtime_error_ignored(mocker, temp
 
 def test_from_textgrid_with_predict_intervals_error_with_phones(mocker, temp_textgrid_file):
     """Test error handling during interval transcription when add_phones=True"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.0)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.0)
 
     mock_pipeline = mocker.Mock()
     # First interval succeeds with phone chunks
@@ -542,7 +868,7 @@ def test_from_textgrid_with_predict_intervals_error_with_phones(mocker, temp_tex
 
 def test_from_audio_with_predict_transcription_empty_phone_chunks(mocker):
     """Test handling when predict_with_timestamps returns empty chunks"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.5)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.5)
 
     mock_pipeline = mocker.Mock()
     # Model returns transcription but no phone chunks
@@ -577,7 +903,7 @@ def test_from_audio_with_predict_transcription_empty_phone_chunks(mocker):
 
 def test_from_textgrid_with_predict_intervals_empty_phone_chunks(mocker, temp_textgrid_file):
     """Test handling when predict_with_timestamps returns empty chunks during interval transcription"""
-    mocker.patch("autoipaalign.core.textgrid_io.librosa.get_duration", return_value=5.0)
+    mocker.patch("autoipaalign.core.textgrid_io.audio_duration", return_value=5.0)
 
     mock_pipeline = mocker.Mock()
     # Both intervals return transcription but no phone chunks
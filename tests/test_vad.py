@@ -0,0 +1,143 @@
+"""Unit tests for vad module"""
+
+import librosa
+import numpy as np
+import pytest
+
+from autoipaalign.core.model_registry import MODEL_REGISTRY, LoadedModel
+from autoipaalign.core.speech_recognition import ASRPipeline
+from autoipaalign.core.vad import VadStats, speech_regions
+
+SAMPLING_RATE = 16000
+
+
+@pytest.fixture
+def speech(shared_datadir):
+    y, _ = librosa.load(shared_datadir / "test1.wav", sr=SAMPLING_RATE)
+    return y
+
+
+def silence(seconds: float) -> np.ndarray:
+    """Quiet background noise"""
+    return np.random.default_rng(0).normal(0, 0.001, int(seconds * SAMPLING_RATE)).astype(np.float32)
+
+
+def test_speech_regions_skip_silence(speech):
+    """Test silence between speech is skipped and regions are padded and aligned"""
+    y = np.concatenate([silence(3), speech, silence(3), speech, silence(3)])
+
+    regions = speech_regions(y, SAMPLING_RATE, pad_s=0.2, align_to=320)
+
+    speech_start = 3 * SAMPLING_RATE
+    second_start = speech_start + len(speech) + 3 * SAMPLING_RATE
+    assert len(regions) == 2
+    (start1, end1), (start2, end2) = regions
+    assert speech_start - 0.2 * SAMPLING_RATE <= start1 <= speech_start
+    assert speech_start + len(speech) <= end1 <= speech_start + len(speech) + 0.2 * SAMPLING_RATE + 320
+    assert second_start - 0.2 * SAMPLING_RATE <= start2 <= second_start
+    assert all(start % 320 == 0 for start, _ in regions)
+
+
+@pytest.mark.parametrize("snr_db", [20, 30])
+def test_speech_regions_skip_noise(speech, snr_db):
+    """Test background noise at a realistic signal-to-noise ratio, under the speech too, is skipped"""
+    y = np.concatenate([np.zeros(3 * SAMPLING_RATE), speech, np.zeros(3 * SAMPLING_RATE)])
+    noise_std = np.sqrt(np.mean(np.square(speech))) / 10 ** (snr_db / 20)
+    y = (y + np.random.default_rng(0).normal(0, noise_std, len(y))).astype(np.float32)
+
+    regions = speech_regions(y, SAMPLING_RATE, pad_s=0.2)
+
+    speech_start = 3 * SAMPLING_RATE
+    assert len(regions) == 1
+    ((start, end),) = regions
+    assert speech_start - 0.5 * SAMPLING_RATE <= start <= speech_start
+    assert speech_start + len(speech) <= end <= speech_start + len(speech) + 0.5 * SAMPLING_RATE
+    assert (end - start) / len(y) < 0.4
+
+
+def test_speech_regions_keep_all_speech(speech):
+    """Test audio that is all speech is kept whole"""
+    assert speech_regions(speech, SAMPLING_RATE) == [(0, len(speech))]
+
+
+def test_speech_regions_merge_short_pauses(speech):
+    """Test pauses shorter than min_silence_s stay within one region"""
+    y = np.concatenate([silence(1), speech, silence(0.3), speech, silence(1)])
+
+    assert len(speech_regions(y, SAMPLING_RATE, min_silence_s=0.5, pad_s=0)) == 1
+    assert len(speech_regions(y, SAMPLING_RATE, min_silence_s=0.1, pad_s=0)) >= 2
+
+
+def test_speech_regions_max_length(speech):
+    """Test long regions are split into aligned pieces of about equal length"""
+    regions = speech_regions(speech, SAMPLING_RATE, align_to=320, max_length=320 * 50)
+
+    assert regions[0][0] == 0
+    assert regions[-1][1] == len(speech)
+    assert all(end - start <= 320 * 50 for start, end in regions)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(regions, regions[1:]))
+
+
+def test_speech_regions_no_speech():
+    assert speech_regions(np.zeros(SAMPLING_RATE, dtype=np.float32), SAMPLING_RATE) == []
+    assert speech_regions(silence(2), SAMPLING_RATE) == []
+    assert speech_regions(np.array([], dtype=np.float32), SAMPLING_RATE) == []
+
+
+def test_vad_stats():
+    stats = VadStats()
+    assert stats.skipped_fraction == 0.0
+
+    stats.add(total_samples=1000, speech_samples=400)
+    other = VadStats()
+    other.add(total_samples=1000, speech_samples=1000)
+    stats.merge(other)
+
+    assert stats.num_inputs == 2
+    assert stats.skipped_fraction == pytest.approx(0.3)
+    assert str(stats) == "2 inputs, skipped 30.0% of audio as silence"
+
+
+def test_asr_pipeline_runs_model_on_speech_only(mocker, speech):
+    """Test model outputs for speech regions are placed at their frames and other frames are blank"""
+    ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0)
+    ctc.forward_batch.side_effect = lambda arrays: [np.ones(len(a) // 320, dtype=np.int64) for a in arrays]
+    mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(ctc, None, 0))
+    asr = ASRPipeline("test-model", engine="direct", vad=True, batch_size=4)
+    y = np.concatenate([silence(2), speech, silence(2)])
+
+    (token_ids,) = asr._forward_arrays([y], ["test"])
+
+    regions = speech_regions(y, SAMPLING_RATE, align_to=320)
+    expected = np.zeros(len(token_ids), dtype=np.int64)
+    for start, end in regions:
+        expected[start // 320 : end // 320] = 1
+    np.testing.assert_array_equal(token_ids, expected)
+    assert sum(len(a) for a in ctc.forward_batch.call_args.args[0]) == sum(end - start for start, end in regions)
+    assert asr.vad_stats.num_inputs == 1
+    assert asr.vad_stats.skipped_fraction > 0.5
+
+
+def test_asr_pipeline_predict_segments(mocker, speech, tmp_path):
+    """Test segments are found at pauses, batched together and timestamped from the start of the audio"""
+    ctc = mocker.Mock(inputs_to_logits_ratio=320, blank_id=0)
+    ctc.forward_batch.side_effect = lambda arrays: [np.ones(len(a) // 320, dtype=np.int64) for a in arrays]
+    ctc.collapse.side_effect = lambda token_ids: [len(ids) for ids in token_ids]
+    ctc.text.side_effect = lambda collapsed: f"{collapsed} frames"
+    ctc.chars.return_value = []
+    ctc.timestamps.return_value = []
+    mocker.patch.object(MODEL_REGISTRY, "get", return_value=LoadedModel(ctc, None, 0))
+    y = np.concatenate([silence(2), speech, silence(2), speech, silence(2)])
+    audio_path = tmp_path / "two_utterances.wav"
+    mocker.patch("autoipaalign.core.speech_recognition.load_audio", return_value=y)
+    asr = ASRPipeline("test-model", engine="direct", vad=True, batch_size=4)
+
+    segments = asr.predict_segments(audio_path)
+
+    regions = speech_regions(y, SAMPLING_RATE, align_to=320, max_length=20 * SAMPLING_RATE)
+    assert len(segments) == 2
+    assert [s.timestamp for s in segments] == [(start / SAMPLING_RATE, end / SAMPLING_RATE) for start, end in regions]
+    assert [s.text for s in segments] == [f"{(end - start) // 320} frames" for start, end in regions]
+    ctc.forward_batch.assert_called_once()
+    # Segments are already speech, so voice activity detection is not run on them again
+    assert asr.vad_stats.num_inputs == 0
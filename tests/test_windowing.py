@@ -0,0 +1,48 @@
+"""Unit tests for windowing module"""
+
+import pytest
+
+from autoipaalign.core.windowing import AudioWindow, compute_windows, num_frames, window_lengths_in_samples
+
+
+def test_window_lengths_in_samples():
+    """Test conversion to samples aligned to the model frame size"""
+    assert window_lengths_in_samples(10, 2, 16000, align_to=320) == (160000, 32000)
+    # 1.01s is 16160 samples, rounded to 50.5 -> 50 frames of 320 samples
+    assert window_lengths_in_samples(10, 1.01, 16000, align_to=320) == (160000, 16000)
+    # Default stride is a sixth of the window
+    assert window_lengths_in_samples(6, None, 16000) == (96000, 16000)
+
+
+def test_window_lengths_in_samples_stride_too_long():
+    with pytest.raises(ValueError, match="more than twice the stride"):
+        window_lengths_in_samples(4, 2, 16000)
+
+
+def test_compute_windows():
+    """Test that kept regions of the windows cover the audio once with no gaps"""
+    windows = compute_windows(250, chunk_length=100, stride_length=20)
+
+    assert windows == [
+        AudioWindow(start=0, end=100, stride_left=0, stride_right=20),
+        AudioWindow(start=60, end=160, stride_left=20, stride_right=20),
+        AudioWindow(start=120, end=220, stride_left=20, stride_right=20),
+        AudioWindow(start=180, end=250, stride_left=20, stride_right=0),
+    ]
+    assert windows[0].keep_start == 0
+    for previous, window in zip(windows, windows[1:]):
+        assert previous.keep_end == window.keep_start
+    assert windows[-1].keep_end == 250
+
+
+def test_compute_windows_short_audio():
+    """Test audio no longer than one window is a single window without strides"""
+    assert compute_windows(100, chunk_length=100, stride_length=20) == [
+        AudioWindow(start=0, end=100, stride_left=0, stride_right=0)
+    ]
+    assert compute_windows(0, chunk_length=100, stride_length=20) == []
+
+
+def test_num_frames():
+    assert num_frames(640, 320) == 2
+    assert num_frames(641, 320) == 3